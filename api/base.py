@@ -29,6 +29,7 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 # built-in modules
+import concurrent.futures
 import datetime as dt
 
 # third-party modules
@@ -37,12 +38,457 @@ import pandas as pd
 
 # customized modules
 import data.config as config
-import data.driver.mysql as mysql
+import data.driver.codec   as codec
+import data.driver.mongodb as mongodb
+import data.driver.mysql   as mysql
 
 
 TICK_DEFAULT_START_DATE = '20150101'
 TICK_DATE_FORMAT        = '%Y%m%d'
 
+# granularity of the date-bucketed daily data documents
+BUCKET_YEAR  = 'year'
+BUCKET_MONTH = 'month'
+
+DAILY_DATA_BUCKET = BUCKET_YEAR
+DAILY_DATA_DATE_FORMAT = '%Y-%m-%d'
+
+# number of securities in one $in query and number of threads decoding the buckets
+DAILY_DATA_BATCH_SIZE     = 200
+DAILY_DATA_DECODE_WORKERS = 4
+
+# layout of the multi-security daily data
+LAYOUT_LONG = 'long'
+LAYOUT_WIDE = 'wide'
+
+# maximum number of securities in one bin data query, and number of tables queried
+# in parallel
+BIN_DATA_CHUNK_SIZE  = 100
+BIN_DATA_MAX_WORKERS = 1
+
+# prices in the bin data tables are stored as integers of price * BIN_PRICE_SCALE
+BIN_PRICE_SCALE = 10000
+
+# chunking of the streamed bin data, by trade date windows or by number of rows
+CHUNK_DAY   = 'day'
+CHUNK_MONTH = 'month'
+
+# decimal places a float64 column keeps when narrowed to float32 by compactFrame
+COMPACT_FLOAT_DECIMALS = 4
+
+
+def getBucketStart( date, bucket=DAILY_DATA_BUCKET ):
+    '''Get the start of the bucket holding the given date.
+
+Parameters
+----------
+date : datetime.date
+    data date;
+bucket : str
+    bucket granularity, year or month.
+
+Returns
+-------
+bucketStart : datetime.datetime
+    the first day of the bucket.
+
+Exceptions
+----------
+    raise Exception when the bucket granularity is not recognized.
+    '''
+    if bucket == BUCKET_YEAR:
+        bucketStart = dt.datetime( date.year, 1, 1 )
+    elif bucket == BUCKET_MONTH:
+        bucketStart = dt.datetime( date.year, date.month, 1 )
+    else:
+        raise Exception( 'Unrecognized bucket {b:s}.'.format( b=str( bucket ) ) )
+
+    return bucketStart
+
+
+def _filterDailyData( dfs, startDate, endDate, dateColumn ):
+    '''Concatenate the decoded buckets of one instrument and filter by date.
+
+Parameters
+----------
+dfs : list of pandas.DataFrame
+    decoded buckets;
+startDate : datetime.date
+    start date inclusively;
+endDate : datetime.date
+    end date inclusively;
+dateColumn : str
+    column name of the trade date in the format %Y-%m-%d.
+
+Returns
+-------
+dailyData : pandas.DataFrame
+    daily data in the date range sorted by the trade date.
+    '''
+    dailyData = pd.concat( dfs, ignore_index=True )
+    dailyData.sort_values( dateColumn, inplace=True, kind='mergesort' )
+
+    # Filtered by date
+    startDateStr = startDate.strftime( DAILY_DATA_DATE_FORMAT )
+    endDateStr   = endDate.strftime( DAILY_DATA_DATE_FORMAT )
+    dateFilter   = ( dailyData[ dateColumn ] >= startDateStr ) & \
+            ( dailyData[ dateColumn ] <= endDateStr )
+    dailyData = dailyData[ dateFilter ]
+    dailyData.reset_index( drop=True, inplace=True )
+
+    return dailyData
+
+
+def getBucketedDailyData( collection, query, startDate, endDate, dateColumn='tradeDate' ):
+    '''Get daily data from the date-bucketed collection. Only the buckets overlapping
+the date range are fetched from MongoDB.
+
+Parameters
+----------
+collection : pymongo.collection.Collection
+    collection holding the bucketed daily data;
+query : dict
+    query to identify the instrument, e.g. { 'SecID': secId };
+startDate : datetime.date
+    start date of the daily data queried inclusively;
+endDate : datetime.date
+    end date of the daily data queried inclusively;
+dateColumn : str
+    column name of the trade date in the format %Y-%m-%d.
+
+Returns
+-------
+dailyData : pandas.DataFrame or None
+    requested daily data sorted by the trade date or None if the instrument
+    has no bucket at all.
+    '''
+    bucketQuery = dict( query )
+    bucketQuery[ 'StartDate' ] = { '$lte': dt.datetime.combine( endDate, dt.datetime.min.time() ) }
+    bucketQuery[ 'EndDate' ]   = { '$gte': dt.datetime.combine( startDate, dt.datetime.min.time() ) }
+    cursor = collection.find( bucketQuery, projection=[ 'Data' ],
+            sort=[ ( 'StartDate', mongodb.pymongo.ASCENDING ) ] )
+
+    dfs = [ codec.decodeFrame( item[ 'Data' ] ) for item in cursor ]
+    if len( dfs ) > 0:
+        dailyData = _filterDailyData( dfs, startDate, endDate, dateColumn )
+    elif collection.find_one( query, projection=[ '_id' ] ) is not None:
+        # the instrument is known but has no data in the date range
+        dailyData = pd.DataFrame( columns=[ dateColumn ] )
+    else:
+        dailyData = None
+
+    return dailyData
+
+
+def getBucketedDailyDataBatch( collection, secIds, startDate, endDate,
+        batchSize=DAILY_DATA_BATCH_SIZE, maxWorkers=DAILY_DATA_DECODE_WORKERS,
+        dateColumn='tradeDate' ):
+    '''Get daily data of many securities from the date-bucketed collection with one
+$in query per batch of securities. The buckets are decoded in parallel.
+
+Parameters
+----------
+collection : pymongo.collection.Collection
+    collection holding the bucketed daily data;
+secIds : list of str
+    security identifiers;
+startDate : datetime.date
+    start date of the daily data queried inclusively;
+endDate : datetime.date
+    end date of the daily data queried inclusively;
+batchSize : int
+    maximum number of securities in one query;
+maxWorkers : int
+    number of threads decoding the buckets;
+dateColumn : str
+    column name of the trade date in the format %Y-%m-%d.
+
+Returns
+-------
+dailyData : dict
+    requested daily data keyed by the security identifier. Securities without any
+    bucket at all are left out.
+    '''
+    secIds    = list( secIds )
+    startTime = dt.datetime.combine( startDate, dt.datetime.min.time() )
+    endTime   = dt.datetime.combine( endDate, dt.datetime.min.time() )
+
+    items = []
+    for i in range( 0, len( secIds ), batchSize ):
+        cursor = collection.find( { 'SecID': { '$in': secIds[ i : i + batchSize ] },
+                                    'StartDate': { '$lte': endTime },
+                                    'EndDate': { '$gte': startTime } },
+                projection=[ 'SecID', 'StartDate', 'Data' ] )
+        items.extend( cursor )
+
+    with concurrent.futures.ThreadPoolExecutor( max_workers=maxWorkers ) as executor:
+        dfs = list( executor.map( lambda item: codec.decodeFrame( item[ 'Data' ] ), items ) )
+
+    buckets = {}
+    for item, df in zip( items, dfs ):
+        buckets.setdefault( item[ 'SecID' ], [] ).append( ( item[ 'StartDate' ], df ) )
+
+    dailyData = {}
+    for secId, secBuckets in buckets.items():
+        secBuckets.sort( key=lambda b: b[ 0 ] )
+        dailyData[ secId ] = _filterDailyData( [ df for _, df in secBuckets ],
+                startDate, endDate, dateColumn )
+
+    # securities known but without data in the date range
+    missing = [ secId for secId in secIds if secId not in dailyData ]
+    for i in range( 0, len( missing ), batchSize ):
+        for secId in collection.distinct( 'SecID', { 'SecID': { '$in': missing[ i : i + batchSize ] } } ):
+            dailyData[ secId ] = pd.DataFrame( columns=[ dateColumn ] )
+
+    return dailyData
+
+
+def combineDailyData( dailyData, secIds, fields=None, layout=LAYOUT_LONG,
+        dateColumn='tradeDate', secColumn='secID' ):
+    '''Combine the daily data of many securities into one DataFrame.
+
+Parameters
+----------
+dailyData : dict
+    daily data keyed by the security identifier, None for unknown securities;
+secIds : list of str
+    security identifiers in the requested order;
+fields : list of str or None
+    data columns to keep, None for all;
+layout : str
+    long for one row per ( trade date, security ) or wide for one column per
+    ( field, security );
+dateColumn : str
+    column name of the trade date;
+secColumn : str
+    column name of the security identifier.
+
+Returns
+-------
+combined : pandas.DataFrame
+    long frame indexed by ( trade date, security ) or wide frame indexed by the
+    trade date, where `combined[ field ]` is the date x security matrix of a field.
+
+Exceptions
+----------
+    raise Exception when the layout is not recognized.
+    '''
+    if layout not in ( LAYOUT_LONG, LAYOUT_WIDE ):
+        raise Exception( 'Unrecognized layout {l:s}.'.format( l=str( layout ) ) )
+
+    frames = []
+    for secId in secIds:
+        df = dailyData.get( secId )
+        if df is not None and len( df ) > 0:
+            df = df.copy()
+            df[ secColumn ] = secId
+            frames.append( df )
+
+    if len( frames ) > 0:
+        combined = pd.concat( frames, ignore_index=True, sort=False )
+    else:
+        combined = pd.DataFrame( columns=[ dateColumn, secColumn ] )
+
+    if fields is not None:
+        combined = combined.reindex( columns=[ dateColumn, secColumn ] +
+                [ f for f in fields if f not in ( dateColumn, secColumn ) ] )
+
+    combined.set_index( [ dateColumn, secColumn ], inplace=True )
+    combined.sort_index( inplace=True )
+    if layout == LAYOUT_WIDE:
+        combined = combined.unstack( secColumn )
+
+    return combined
+
+
+def updateBucketedDailyData( collection, query, data, lastModified, extraFields=None,
+        bucket=DAILY_DATA_BUCKET, dateColumn='tradeDate' ):
+    '''Append daily data into the date-bucketed collection. Rows are merged into the
+existing buckets and the new rows take precedence on the same trade date.
+
+Parameters
+----------
+collection : pymongo.collection.Collection
+    collection holding the bucketed daily data;
+query : dict
+    fields to identify the instrument, e.g. { 'SecID': secId, 'Country': 'CN' };
+data : pandas.DataFrame
+    daily data to write;
+lastModified : datetime.datetime
+    modification time of the records;
+extraFields : dict or None
+    additional fields stored in every bucket, e.g. { 'Product': product };
+bucket : str
+    bucket granularity, year or month;
+dateColumn : str
+    column name of the trade date in the format %Y-%m-%d.
+
+Returns
+-------
+nBuckets : int
+    number of buckets written.
+    '''
+    tradeDates = pd.to_datetime( data[ dateColumn ], format=DAILY_DATA_DATE_FORMAT )
+    if bucket == BUCKET_YEAR:
+        bucketKeys = tradeDates.dt.year * 100 + 1
+    else:
+        bucketKeys = tradeDates.dt.year * 100 + tradeDates.dt.month
+
+    nBuckets = 0
+    for bucketKey, bucketData in data.groupby( bucketKeys.values ):
+        bucketKey   = int( bucketKey )
+        bucketStart = dt.datetime( bucketKey // 100, bucketKey % 100, 1 )
+        bucketQuery = dict( query )
+        bucketQuery[ 'Bucket' ] = bucketStart
+
+        existing = collection.find_one( bucketQuery, projection=[ 'Data' ] )
+        if existing is not None:
+            bucketData = pd.concat( [ codec.decodeFrame( existing[ 'Data' ] ), bucketData ],
+                    ignore_index=True )
+            bucketData = bucketData.drop_duplicates( [ dateColumn ], keep='last' )
+        bucketData = bucketData.sort_values( dateColumn, kind='mergesort' )
+        bucketData.reset_index( drop=True, inplace=True )
+
+        record = dict( bucketQuery )
+        if extraFields is not None:
+            record.update( extraFields )
+        record[ 'StartDate' ] = dt.datetime.strptime( bucketData[ dateColumn ].iloc[ 0 ],
+                DAILY_DATA_DATE_FORMAT )
+        record[ 'EndDate' ]   = dt.datetime.strptime( bucketData[ dateColumn ].iloc[ -1 ],
+                DAILY_DATA_DATE_FORMAT )
+        record[ 'Data' ]         = codec.encodeFrame( bucketData )
+        record[ 'LastModified' ] = lastModified
+
+        collection.replace_one( bucketQuery, record, upsert=True )
+        nBuckets += 1
+
+    return nBuckets
+
+
+def getBinDataDocuments( collection, secId, startDate, endDate ):
+    '''Get the daily bin data records of an instrument without decoding them.
+
+Parameters
+----------
+collection : pymongo.collection.Collection
+    collection holding one bin data record per instrument per day;
+secId : str
+    security identifier;
+startDate : datetime.date
+    start date inclusively;
+endDate : datetime.date
+    end date inclusively.
+
+Returns
+-------
+documents : list of dict
+    records with the `Date` and the encoded `Data`, sorted by date.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on a date.
+    '''
+    cursor = collection.find( { 'SecID': secId, 'Date': {
+            '$gte': dt.datetime.combine( startDate, dt.datetime.min.time() ),
+            '$lte': dt.datetime.combine( endDate, dt.datetime.min.time() ) } },
+            projection=[ 'Date', 'Data' ], sort=[ ( 'Date', mongodb.pymongo.ASCENDING ) ] )
+
+    documents = list( cursor )
+    for prev, item in zip( documents, documents[ 1 : ] ):
+        if prev[ 'Date' ] == item[ 'Date' ]:
+            raise Exception( 'Duplicated records on {d:s} found.'.format(
+                d=str( item[ 'Date' ].date() ) ) )
+
+    return documents
+
+
+def compactFrame( data, idColumns=(), dateColumns=(), floatDecimals=COMPACT_FLOAT_DECIMALS ):
+    '''Convert the frame to compact dtypes: the identifier columns to categoricals, the
+%Y%m%d date strings to int32 and the float64 columns to float32 when every value is
+unchanged at floatDecimals decimal places after the round trip.
+
+Parameters
+----------
+data : pandas.DataFrame
+    frame to convert;
+idColumns : list of str
+    identifier columns, absent ones ignored;
+dateColumns : list of str
+    date columns in the format %Y%m%d, absent ones or ones with missing values kept;
+floatDecimals : int or None
+    decimal places to preserve in float32, None to keep float64.
+
+Returns
+-------
+data : pandas.DataFrame
+    converted frame.
+    '''
+    columns = {}
+    for column in data.columns:
+        values = data[ column ]
+        if column in idColumns:
+            columns[ column ] = values.astype( 'category' )
+        elif column in dateColumns and values.dtype.kind not in 'iu':
+            dates = pd.to_numeric( values, errors='coerce' )
+            if not dates.isnull().any():
+                columns[ column ] = dates.astype( np.int32 )
+        elif floatDecimals is not None and values.dtype == np.float64:
+            narrowed = values.to_numpy().astype( np.float32 )
+            if np.array_equal( np.round( narrowed.astype( np.float64 ), floatDecimals ),
+                    np.round( values.to_numpy(), floatDecimals ), equal_nan=True ):
+                columns[ column ] = pd.Series( narrowed, index=data.index )
+
+    return data.assign( **columns ) if len( columns ) > 0 else data
+
+
+def getMemoryUsage( data ):
+    '''Get the memory held by a frame, including the objects of the object columns.
+
+Parameters
+----------
+data : pandas.DataFrame
+    frame to measure.
+
+Returns
+-------
+nBytes : int
+    memory usage in bytes.
+    '''
+    return int( data.memory_usage( index=True, deep=True ).sum() )
+
+
+def _getDateWindows( startDate, endDate, chunk ):
+    '''Split the date range into windows of a day or a calendar month.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+chunk : str
+    day or month.
+
+Returns
+-------
+windows : list of tuple
+    ( windowStart, windowEnd ) in the format %Y%m%d inclusively.
+    '''
+    curDate = dt.datetime.strptime( startDate, TICK_DATE_FORMAT ).date()
+    endDate = dt.datetime.strptime( endDate, TICK_DATE_FORMAT ).date()
+
+    windows = []
+    while curDate <= endDate:
+        if chunk == CHUNK_DAY:
+            windowEnd = curDate
+        else:
+            nextMonth = ( curDate.replace( day=28 ) + dt.timedelta( 4 ) ).replace( day=1 )
+            windowEnd = min( nextMonth - dt.timedelta( 1 ), endDate )
+        windows.append( ( curDate.strftime( TICK_DATE_FORMAT ), windowEnd.strftime( TICK_DATE_FORMAT ) ) )
+        curDate = windowEnd + dt.timedelta( 1 )
+
+    return windows
+
 
 class BinDataSource( object ):
     '''Get bin data from the database.
@@ -71,12 +517,14 @@ databaseName : str
         self.refData = pd.read_sql( refDataSql, self.refConn )
         # indexed by security identifier
         self.refData.set_index( 'sec_id', inplace=True )
-        self.refConn.dispose()
 
 
     def getBinData( self, secIds, startDate=TICK_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( TICK_DATE_FORMAT ), binSize=1 ):
-        '''Get bin data for the given instrument
+            endDate=dt.date.today().strftime( TICK_DATE_FORMAT ), binSize=1,
+            chunkSize=BIN_DATA_CHUNK_SIZE, maxWorkers=BIN_DATA_MAX_WORKERS,
+            compact=False, fixedPoint=False ):
+        '''Get bin data for the given instrument. Securities in the same table are
+queried together with one IN query per chunk.
 
 Parameters
 ----------
@@ -85,7 +533,18 @@ secIds : set of str
 startDate : str
     start data date in the format %Y%m%d inclusively;
 endDate : str
-    end data date in the format %Y%m%d inclusively.
+    end data date in the format %Y%m%d inclusively;
+binSize : int
+    number of minute in a bin;
+chunkSize : int
+    maximum number of securities in one query;
+maxWorkers : int
+    number of queries run in parallel;
+compact : bool
+    whether to return the compact schema, see `_normalizeBinData`;
+fixedPoint : bool
+    whether to keep the prices as int32 of price * BIN_PRICE_SCALE in the compact
+    schema.
 
 Returns
 -------
@@ -122,38 +581,230 @@ fullDf : pandas.DataFrame
 * lastModified -- str
     last modification time.
 indexed by secId, which is a str representation of the securities identifier;
+rows are ordered by the given securities then by the K-line score.
+
+Exceptions
+----------
+    raise Exception when a security is not found in the reference data.
         '''
-        dfs = []
+        secIds = list( secIds )
+        sqls   = self._getBinDataSqls( secIds, startDate, endDate, binSize, chunkSize )
+
+        readSql = lambda query: pd.read_sql( query[ 0 ], self.binConn, params=query[ 1 ] )
+        if maxWorkers > 1 and len( sqls ) > 1:
+            with concurrent.futures.ThreadPoolExecutor( max_workers=maxWorkers ) as executor:
+                dfs = list( executor.map( readSql, sqls ) )
+        else:
+            dfs = [ readSql( query ) for query in sqls ]
+
+        fullDf = self._sortBinData( pd.concat( dfs ), secIds )
+
+        return self._normalizeBinData( fullDf, secIds, compact=compact, fixedPoint=fixedPoint )
+
+
+    def iterBinData( self, secIds, startDate=TICK_DEFAULT_START_DATE,
+            endDate=dt.date.today().strftime( TICK_DATE_FORMAT ), binSize=1,
+            chunk=CHUNK_DAY, chunkSize=BIN_DATA_CHUNK_SIZE, compact=False, fixedPoint=False ):
+        '''Stream bin data for the given instruments in trade date order, so that the
+memory is bounded by the chunk instead of the requested date range.
+
+Parameters
+----------
+secIds : set of str
+    All instrument identifiers concerned;
+startDate : str
+    start data date in the format %Y%m%d inclusively;
+endDate : str
+    end data date in the format %Y%m%d inclusively;
+binSize : int
+    number of minute in a bin;
+chunk : str or int
+    day or month to yield the data of one trade date window at a time, ordered by
+    the given securities within a trade date, or a number of rows to yield from a
+    server-side cursor over all the tables, ordered by the security identifier
+    within a trade date;
+chunkSize : int
+    maximum number of securities in one query;
+compact : bool
+    whether to yield the compact schema, see `_normalizeBinData`;
+fixedPoint : bool
+    whether to keep the prices as int32 of price * BIN_PRICE_SCALE in the compact
+    schema.
+
+Returns
+-------
+binData : generator of pandas.DataFrame
+    bin data chunks in the same schema as `getBinData`, empty chunks are skipped.
+
+Exceptions
+----------
+    raise Exception when a security is not found in the reference data or the chunk
+    is not recognized.
+        '''
+        secIds = list( secIds )
+        if chunk in ( CHUNK_DAY, CHUNK_MONTH ):
+            for windowStart, windowEnd in _getDateWindows( startDate, endDate, chunk ):
+                sqls = self._getBinDataSqls( secIds, windowStart, windowEnd, binSize, chunkSize )
+                df   = pd.concat( [ pd.read_sql( sql, self.binConn, params=params ) for sql, params in sqls ] )
+                if len( df ) > 0:
+                    yield self._normalizeBinData( self._sortBinData( df, secIds, byDate=True ),
+                            secIds, compact=compact, fixedPoint=fixedPoint )
+        elif isinstance( chunk, int ) and chunk > 0:
+            sqls = self._getBinDataSqls( secIds, startDate, endDate, binSize, chunkSize, union=True )
+            sql, params = mysql.buildUnionSql( sqls, orderBy=[ 'tradedate', 'sec_id', 'kl_score' ] )
+            with self.binConn.connect() as conn:
+                conn = conn.execution_options( stream_results=True )
+                for df in pd.read_sql( sql, conn, params=params, chunksize=chunk ):
+                    yield self._normalizeBinData( df, secIds, compact=compact,
+                            fixedPoint=fixedPoint )
+        else:
+            raise Exception( 'Unrecognized chunk {c:s}.'.format( c=str( chunk ) ) )
+
+
+    def _getBinDataSqls( self, secIds, startDate, endDate, binSize, chunkSize, union=False ):
+        '''Build the bin data queries with the securities grouped by their table.
+
+Parameters
+----------
+secIds : list of str
+    All instrument identifiers concerned;
+startDate : str
+    start data date in the format %Y%m%d inclusively;
+endDate : str
+    end data date in the format %Y%m%d inclusively;
+binSize : int
+    number of minute in a bin;
+chunkSize : int
+    maximum number of securities in one query;
+union : bool
+    whether the parameter names are made unique to combine the queries.
+
+Returns
+-------
+sqls : list of tuple
+    ( statement, parameters ) of each query.
+
+Exceptions
+----------
+    raise Exception when a security is not found in the reference data.
+        '''
+        # group the securities by the table holding their data
+        tables = {}
         for secId in secIds:
-            tableName = self.refData.ix[ secId ]
-            if len( tableName ) < 1:
+            if secId not in self.refData.index:
                 raise Exception( 'Cannot get data for {secId:s}.'.format( secId=secId ) )
-            else:
-                tableName = tableName.table_name
+            tableName = '_'.join( [ 'kline', self.refData.loc[ secId, 'table_name' ] ] )
+            tables.setdefault( tableName, [] ).append( secId )
+
+        sqls = []
+        for tableName, tableSecIds in tables.items():
+            for i in range( 0, len( tableSecIds ), chunkSize ):
+                sqls.append( mysql.buildBinDataSqlWithSecIds( tableName, tableSecIds[ i : i + chunkSize ],
+                        startDate, endDate, binSize, suffix=str( len( sqls ) ) if union else '' ) )
+
+        return sqls
 
-            tableName = '_'.join( [ 'kline', tableName ] )
-            sql = mysql.buildBinDataSql( tableName, secId, startDate, endDate, binSize )
-            df  = pd.read_sql( sql, self.binConn )
-            df.sort_values( by=[ 'kl_score' ], inplace=True )
 
-            dfs.append( df )
+    def _sortBinData( self, fullDf, secIds, byDate=False ):
+        '''Order the raw bin data by the requested securities, then the K-line score.
 
-        fullDf = pd.concat( dfs )
+Parameters
+----------
+fullDf : pandas.DataFrame
+    raw bin data from the database;
+secIds : list of str
+    securities in the requested order;
+byDate : bool
+    whether to order by the trade date first.
 
+Returns
+-------
+fullDf : pandas.DataFrame
+    ordered raw bin data.
+        '''
+        secOrder = { secId.upper(): i for i, secId in enumerate( secIds ) }
+        keys     = [ fullDf.kl_score.values, fullDf.sec_id.str.upper().map( secOrder ).values ]
+        if byDate:
+            keys.append( fullDf.tradedate.values )
+
+        return fullDf.iloc[ np.lexsort( keys ) ]
+
+
+    def _normalizeBinData( self, fullDf, secIds, compact=False, fixedPoint=False ):
+        '''Normalize the raw bin data to the output schema of `getBinData` with
+vectorized conversions.
+
+Parameters
+----------
+fullDf : pandas.DataFrame
+    raw bin data from the database;
+secIds : list of str
+    requested securities, the categories of secId in the compact schema;
+compact : bool
+    whether to convert to the compact schema;
+fixedPoint : bool
+    whether to keep the prices as int32 of price * BIN_PRICE_SCALE in the compact
+    schema.
+
+Notes
+-----
+The compact schema is indexed by timestamp, datetime64, with column
+* secId -- category
+    upper-case security identifier;
+* tradeDate -- int32
+    trade date as %Y%m%d;
+* seqNo, periodId, mainFlag -- int32
+* exchange -- category
+* openPrice, closePrice, highPrice, lowPrice -- float64 or int32
+    price, or price * BIN_PRICE_SCALE with `fixedPoint`, when the scale is also
+    stored in `attrs[ 'priceScale' ]`;
+* volume, volumeSum -- int64
+* turnover, turnoverSum -- float64
+* lastModified -- str
+
+Returns
+-------
+fullDf : pandas.DataFrame
+    bin data with the normalized column names, prices and dates indexed by secId,
+    or by timestamp in the compact schema.
+        '''
         fullDf.columns = [ 'tradeDate', 'timestamp', 'seqNo', 'periodId', 'exchange', 'secId',
                 'mainFlag', 'openPrice', 'closePrice', 'highPrice', 'lowPrice', 'volume',
                 'turnover', 'volumeSum', 'turnoverSum', 'lastModified' ]
-        # normalize the price and volume
-        fullDf.secId = fullDf.secId.apply( lambda s: s.upper() )
-        fullDf.openPrice  /= 10000
-        fullDf.closePrice /= 10000
-        fullDf.highPrice  /= 10000
-        fullDf.lowPrice   /= 10000
-
-        # set trade date, timestamp string
-        fullDf.tradeDate = fullDf.tradeDate.apply( lambda d: str( int( d ) ) )
-        fullDf.timestamp = fullDf.timestamp.apply( lambda d: str( int( d ) ) )
-
-        fullDf.set_index( 'secId', inplace=True )
+        prices    = [ 'openPrice', 'closePrice', 'highPrice', 'lowPrice' ]
+        secId     = fullDf.secId.str.upper()
+        tradeDate = fullDf.tradeDate.astype( np.int64 )
+        timestamp = fullDf.timestamp.astype( np.int64 )
+
+        if not compact:
+            # normalize the price and volume
+            fullDf.secId = secId
+            fullDf[ prices ] = fullDf[ prices ] / BIN_PRICE_SCALE
+
+            # set trade date, timestamp string
+            fullDf.tradeDate = tradeDate.astype( str )
+            fullDf.timestamp = timestamp.astype( str )
+
+            fullDf.set_index( 'secId', inplace=True )
+        else:
+            # categories must be unique, the securities may repeat in a different case
+            fullDf.secId     = pd.Categorical( secId,
+                    categories=list( dict.fromkeys( s.upper() for s in secIds ) ) )
+            fullDf.exchange  = fullDf.exchange.astype( 'category' )
+            fullDf.tradeDate = tradeDate.astype( np.int32 )
+            fullDf.timestamp = pd.to_datetime( timestamp.astype( str ), format='%Y%m%d%H%M%S' )
+            for column in [ 'seqNo', 'periodId', 'mainFlag' ]:
+                fullDf[ column ] = fullDf[ column ].astype( np.int32 )
+            for column in [ 'volume', 'volumeSum' ]:
+                fullDf[ column ] = fullDf[ column ].astype( np.int64 )
+
+            if fixedPoint:
+                fullDf[ prices ] = fullDf[ prices ].astype( np.int32 )
+            else:
+                fullDf[ prices ] = fullDf[ prices ] / BIN_PRICE_SCALE
+
+            fullDf.set_index( 'timestamp', inplace=True )
+            if fixedPoint:
+                fullDf.attrs[ 'priceScale' ] = BIN_PRICE_SCALE
 
         return fullDf
@@ -0,0 +1,608 @@
+'''Daily data blocks sliced by binary search, with pre-pivoted field matrices, and the
+sliding window of blocks used by `data.api.stocks.CachedWindSource`.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import collections
+import concurrent.futures
+import datetime as dt
+import os
+
+# third-party modules
+import numpy  as np
+import pandas as pd
+
+# customized modules
+import data.api.base as base
+import data.api.shared as shared
+import data.api.snapshot as snapshot
+
+BLOCK_DATE_FORMAT = '%Y%m%d'
+
+# what the blocks do when the field matrices exceed the memory budget
+BUDGET_RAISE = 'raise'
+BUDGET_SPILL = 'spill'
+
+
+def toSharedLabels( labels ):
+    '''Convert labels to an array that can be memory-mapped, fixed-width strings if
+they are all strings.
+
+Parameters
+----------
+labels : array-like
+    labels, e.g. the categories of a coded column.
+
+Returns
+-------
+labels : numpy.ndarray
+    fixed-width unicode array, or an object array for other labels.
+    '''
+    labels = np.asarray( labels, dtype=object )
+    if all( isinstance( label, str ) for label in labels ):
+        return labels.astype( str ) if len( labels ) > 0 else np.empty( 0, dtype='U1' )
+
+    return labels
+
+
+class DailyDataBlock( object ):
+    '''Daily data sorted by ( TRADE_DT, S_INFO_WINDCODE ) with the indexes to slice it
+by binary search.
+    '''
+
+    def __init__( self, data, isSorted=False ):
+        '''Sort the daily data and build the indexes.
+
+Parameters
+----------
+data : pandas.DataFrame
+    daily data with TRADE_DT and S_INFO_WINDCODE;
+isSorted : bool
+    whether the data is already sorted with a default index, kept without a copy.
+        '''
+        super( DailyDataBlock, self ).__init__()
+
+        if isSorted:
+            self.data = data
+        else:
+            self.data = data.sort_values( [ 'TRADE_DT', 'S_INFO_WINDCODE' ], kind='mergesort' )
+            self.data.reset_index( drop=True, inplace=True )
+
+        # trade dates for searchsorted and integer codes of the securities
+        self.dates = self.data.TRADE_DT.to_numpy( dtype=str )
+        self.secCodes, self.secIds = pd.factorize( self.data.S_INFO_WINDCODE, sort=True )
+
+        # shared axes of the date x security matrices and the cells with a row
+        self.dateCodes, self.dateAxis = pd.factorize( self.dates, sort=True )
+        self.dateAxis = np.asarray( self.dateAxis, dtype=str )
+        self.present  = np.zeros( ( len( self.dateAxis ), len( self.secIds ) ), dtype=bool )
+        self.present[ self.dateCodes, self.secCodes ] = True
+
+        # field matrices built on first use
+        self.matrices = {}
+        self.setBudget( None )
+
+
+    def getRange( self, startDate, endDate ):
+        '''Get the row range of the dates.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively.
+
+Returns
+-------
+rowRange : tuple of int
+    ( first row, last row + 1 ).
+        '''
+        return ( int( self.dates.searchsorted( startDate, side='left' ) ),
+                 int( self.dates.searchsorted( endDate, side='right' ) ) )
+
+
+    def select( self, startDate, endDate, secIds=None, columns=None ):
+        '''Select the rows in the date range of the given securities.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+secIds : list of str or None
+    securities to keep, None for all;
+columns : list of str or None
+    columns to keep, None for all.
+
+Returns
+-------
+data : pandas.DataFrame
+    selected rows sorted by ( TRADE_DT, S_INFO_WINDCODE ).
+        '''
+        first, last = self.getRange( startDate, endDate )
+        data = self.data.iloc[ first : last ]
+        if secIds is not None:
+            codes = self.secIds.get_indexer( secIds )
+            data  = data[ np.isin( self.secCodes[ first : last ], codes[ codes >= 0 ] ) ]
+        if columns is not None:
+            data = data[ columns ]
+
+        return data
+
+
+    def setBudget( self, memoryBudget, onBudgetExceeded=BUDGET_RAISE, spillDir=None ):
+        '''Set the memory budget the field matrices are built within.
+
+Parameters
+----------
+memoryBudget : int or None
+    bytes the block may take, see `getMemoryUsage`, None for no limit;
+onBudgetExceeded : str
+    BUDGET_RAISE to raise beyond the budget, BUDGET_SPILL to build the matrices
+    memory-mapped instead;
+spillDir : str or None
+    directory of the spilled matrices, None for the temporary directory.
+        '''
+        self.memoryBudget     = memoryBudget
+        self.onBudgetExceeded = onBudgetExceeded
+        self.spillDir         = spillDir
+
+
+    def getMemoryUsage( self ):
+        '''Get the memory held by the data, the indexes and the field matrices built.
+
+Returns
+-------
+nBytes : int
+    memory usage in bytes.
+        '''
+        arrays = [ self.dates, self.secCodes, self.dateCodes, self.dateAxis, self.present ] + \
+                list( self.matrices.values() )
+
+        return base.getMemoryUsage( self.data ) + sum( a.nbytes for a in arrays )
+
+
+    def hasMatrix( self, field ):
+        '''Whether the field can be served as a float matrix.
+
+Parameters
+----------
+field : str
+    name of the field.
+
+Returns
+-------
+numeric : bool
+    True if the field is a numeric column.
+        '''
+        return field in self.matrices or ( field in self.data.columns and
+                pd.api.types.is_numeric_dtype( self.data[ field ] ) and
+                not pd.api.types.is_bool_dtype( self.data[ field ] ) )
+
+
+    def getMatrix( self, field ):
+        '''Get the date x security float matrix of a numeric field, built on first use.
+
+Parameters
+----------
+field : str
+    name of the numeric field.
+
+Returns
+-------
+matrix : numpy.ndarray
+    values on the axes dateAxis x secIds, NaN where no row exists.
+        '''
+        matrix = self.matrices.get( field )
+        if matrix is None:
+            # compact float32 fields stay float32
+            dtype  = np.float32 if self.data[ field ].dtype == np.float32 else np.float64
+            matrix = self._allocateMatrix( dtype )
+            matrix[ ... ] = np.nan
+            matrix[ self.dateCodes, self.secCodes ] = self.data[ field ].to_numpy( dtype=dtype )
+            matrix.flags.writeable = False
+            self.matrices[ field ] = matrix
+
+        return matrix
+
+
+    def _allocateMatrix( self, dtype ):
+        '''Allocate a date x security matrix within the memory budget.
+
+Parameters
+----------
+dtype : numpy.dtype
+    type of the values.
+
+Returns
+-------
+matrix : numpy.ndarray
+    uninitialized matrix, memory-mapped if spilled.
+
+Exceptions
+----------
+    raise Exception when the matrix exceeds the memory budget with BUDGET_RAISE.
+        '''
+        nBytes = int( np.prod( self.present.shape ) ) * np.dtype( dtype ).itemsize
+        if self.memoryBudget is None or self.getMemoryUsage() + nBytes <= self.memoryBudget:
+            return np.empty( self.present.shape, dtype=dtype )
+        if self.onBudgetExceeded != BUDGET_SPILL:
+            raise Exception( 'Field matrix of {n:d} bytes exceeds the memory budget of {b:d} bytes.'.format(
+                    n=nBytes, b=self.memoryBudget ) )
+
+        # the mapped file remains usable once the directory is removed
+        path = shared.createSharedDirectory( root=self.spillDir )
+        try:
+            matrix = np.lib.format.open_memmap( os.path.join( path, 'matrix.npy' ), mode='w+',
+                    dtype=dtype, shape=self.present.shape )
+        finally:
+            shared.releaseSharedDirectory( path )
+
+        return matrix
+
+
+    def getDateValues( self, dates ):
+        '''Convert dates of the date axis to the type of the TRADE_DT column.
+
+Parameters
+----------
+dates : numpy.ndarray
+    dates in the format %Y%m%d as strings.
+
+Returns
+-------
+dates : numpy.ndarray
+    dates as integers in the compact data, as they are otherwise.
+        '''
+        if self.data.TRADE_DT.dtype.kind in 'iu':
+            return dates.astype( self.data.TRADE_DT.dtype )
+
+        return dates
+
+
+    def getSecCodes( self, secIds ):
+        '''Get the sorted codes of the known securities.
+
+Parameters
+----------
+secIds : list of str
+    securities identifiers.
+
+Returns
+-------
+codes : numpy.ndarray
+    codes on the security axis in ascending order.
+        '''
+        codes = self.secIds.get_indexer( secIds )
+        return np.unique( codes[ codes >= 0 ] )
+
+
+    def pivot( self, startDate, endDate, secIds, fields ):
+        '''Get numeric fields as a date x security frame over the field matrices.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+secIds : list of str
+    securities concerned;
+fields : list of str
+    numeric fields.
+
+Returns
+-------
+data : pandas.DataFrame
+    the same frame as `DataFrame.pivot` on the selected rows. The values of a single
+    field over all the securities in the range are a view of its matrix.
+        '''
+        first = int( self.dateAxis.searchsorted( startDate, side='left' ) )
+        last  = int( self.dateAxis.searchsorted( endDate, side='right' ) )
+        codes = self.getSecCodes( secIds )
+
+        # keep the dates and securities with at least one row, as pivot does
+        present  = self.present[ first : last ]
+        if len( codes ) < len( self.secIds ):
+            present = present[ :, codes ]
+        rowMask  = present.any( axis=1 )
+        colMask  = present.any( axis=0 )
+        rows     = slice( first, last ) if rowMask.all() else np.flatnonzero( rowMask ) + first
+        allSecs  = len( codes ) == len( self.secIds ) and colMask.all()
+        codes    = codes[ colMask ]
+
+        index   = pd.Index( self.getDateValues( self.dateAxis[ rows ] ), name='TRADE_DT' )
+        columns = pd.MultiIndex.from_product( [ fields, self.secIds[ codes ] ],
+                names=[ None, 'S_INFO_WINDCODE' ] )
+        values  = []
+        for field in fields:
+            matrix = self.getMatrix( field )[ rows ]
+            values.append( matrix if allSecs else matrix[ :, codes ] )
+
+        values = values[ 0 ] if len( values ) == 1 else np.hstack( values )
+        return pd.DataFrame( values, index=index, columns=columns, copy=False )
+
+
+    def onDate( self, dataDate, secIds, fields ):
+        '''Get numeric fields of the securities on a date from the field matrices.
+
+Parameters
+----------
+dataDate : str
+    trade date in the format %Y%m%d;
+secIds : list of str
+    securities concerned;
+fields : list of str
+    numeric fields.
+
+Returns
+-------
+data : pandas.DataFrame
+    TRADE_DT and the fields indexed by S_INFO_WINDCODE for the securities with a row.
+        '''
+        codes = self.getSecCodes( secIds )
+        row   = int( self.dateAxis.searchsorted( dataDate, side='left' ) )
+        if row < len( self.dateAxis ) and self.dateAxis[ row ] == dataDate:
+            codes = codes[ self.present[ row, codes ] ]
+        else:
+            codes = codes[ : 0 ]
+
+        data = pd.DataFrame( { 'TRADE_DT': self.getDateValues( np.repeat( dataDate, len( codes ) ) ) },
+                index=pd.Index( self.secIds[ codes ], name='S_INFO_WINDCODE' ) )
+        for field in fields:
+            if field not in data.columns:
+                data[ field ] = self.getMatrix( field )[ row, codes ] if len( codes ) > 0 else np.nan
+
+        return data
+
+
+    def share( self, path, fields=None ):
+        '''Write the block into a shared directory, see `data.api.shared`.
+
+Parameters
+----------
+path : str
+    shared directory;
+fields : list of str or None
+    numeric fields whose matrices are shared as well, None for all numeric fields.
+
+Returns
+-------
+handle : dict
+    picklable description of the block to pass to `attach`.
+        '''
+        if fields is None:
+            fields = [ f for f in self.data.columns if self.hasMatrix( f ) ]
+
+        arrays  = { 'dates': self.dates, 'secCodes': self.secCodes, 'dateCodes': self.dateCodes,
+                    'dateAxis': self.dateAxis, 'present': self.present,
+                    'secIds': toSharedLabels( self.secIds ) }
+        columns = []
+        for i, name in enumerate( self.data.columns ):
+            kind, values, categories = snapshot.encodeColumn( self.data[ name ] )
+            arrays[ 'column{i:d}'.format( i=i ) ] = values
+            if kind == snapshot.COLUMN_CODES:
+                arrays[ 'categories{i:d}'.format( i=i ) ] = toSharedLabels( categories )
+            columns.append( ( name, kind ) )
+        for i, field in enumerate( fields ):
+            arrays[ 'matrix{i:d}'.format( i=i ) ] = self.getMatrix( field )
+
+        shared.shareArrays( path, arrays )
+
+        return { 'path': path, 'columns': columns, 'fields': list( fields ),
+                 'arrays': list( arrays ) }
+
+
+    @classmethod
+    def attach( cls, handle ):
+        '''Attach a block shared by `share`. The columns, the indexes and the shared
+matrices are read-only views of the shared files, the coded columns being categoricals
+over the shared codes.
+
+Parameters
+----------
+handle : dict
+    description of the block from `share`.
+
+Returns
+-------
+block : DailyDataBlock
+    block over the shared data.
+        '''
+        arrays = shared.attachArrays( handle[ 'path' ], handle[ 'arrays' ] )
+
+        block  = cls.__new__( cls )
+        data   = {}
+        for i, ( name, kind ) in enumerate( handle[ 'columns' ] ):
+            values = arrays[ 'column{i:d}'.format( i=i ) ]
+            data[ name ] = values if kind == snapshot.COLUMN_VALUES else \
+                    pd.Categorical.from_codes( values, arrays[ 'categories{i:d}'.format( i=i ) ] )
+        block.data      = pd.DataFrame( data, copy=False )
+        block.dates     = arrays[ 'dates' ]
+        block.secCodes  = arrays[ 'secCodes' ]
+        block.secIds    = pd.Index( arrays[ 'secIds' ] )
+        block.dateCodes = arrays[ 'dateCodes' ]
+        block.dateAxis  = arrays[ 'dateAxis' ]
+        block.present   = arrays[ 'present' ]
+        if len( block.secIds ) != block.present.shape[ 1 ]:
+            raise Exception( 'Security axis of {n:d} securities does not match the shared data of {m:d}.'.format(
+                    n=len( block.secIds ), m=block.present.shape[ 1 ] ) )
+        block.matrices  = { field: arrays[ 'matrix{i:d}'.format( i=i ) ]
+                            for i, field in enumerate( handle[ 'fields' ] ) }
+        block.setBudget( None )
+
+        return block
+
+
+class SlidingWindow( object ):
+    '''Chunks of calendar days of the daily data resident around the requested dates.
+The chunk after the latest requested one is prefetched in a background thread and the
+chunks before the lookback are evicted.
+    '''
+
+    def __init__( self, load, build, startDate, endDate, windowDays, lookbackDays ):
+        '''Initialize the window without loading any chunk.
+
+Parameters
+----------
+load : callable
+    load( startDate, endDate ) reads the rows of a date range as a DataFrame;
+build : callable
+    build( data ) makes the block of the resident rows;
+startDate : str
+    first data date in the format %Y%m%d;
+endDate : str
+    last data date in the format %Y%m%d;
+windowDays : int
+    calendar days of a chunk;
+lookbackDays : int
+    calendar days kept resident before the latest requested date.
+        '''
+        super( SlidingWindow, self ).__init__()
+
+        self.load         = load
+        self.build        = build
+        self.startDate    = startDate
+        self.endDate      = endDate
+        self.windowDays   = windowDays
+        self.lookbackDays = lookbackDays
+
+        self.chunks   = collections.OrderedDict()
+        self.pending  = {}
+        self.block    = None
+        self.executor = concurrent.futures.ThreadPoolExecutor( max_workers=1 )
+
+
+    def _getChunkIndex( self, dataDate ):
+        '''Get the chunk holding the date, clipped to the data range.
+
+Parameters
+----------
+dataDate : str
+    date in the format %Y%m%d.
+
+Returns
+-------
+idx : int
+    index of the chunk.
+        '''
+        dataDate = min( max( dataDate, self.startDate ), self.endDate )
+        days     = ( dt.datetime.strptime( dataDate, BLOCK_DATE_FORMAT ) -
+                     dt.datetime.strptime( self.startDate, BLOCK_DATE_FORMAT ) ).days
+
+        return days // self.windowDays
+
+
+    def _getChunkRange( self, idx ):
+        '''Get the date range of a chunk.
+
+Parameters
+----------
+idx : int
+    index of the chunk.
+
+Returns
+-------
+chunkRange : tuple of str
+    ( startDate, endDate ) of the chunk inclusively.
+        '''
+        startDate = dt.datetime.strptime( self.startDate, BLOCK_DATE_FORMAT ) + \
+                dt.timedelta( idx * self.windowDays )
+        endDate   = startDate + dt.timedelta( self.windowDays - 1 )
+
+        return ( startDate.strftime( BLOCK_DATE_FORMAT ),
+                 min( endDate.strftime( BLOCK_DATE_FORMAT ), self.endDate ) )
+
+
+    def ensure( self, startDate, endDate ):
+        '''Make the dates resident and get the block of the resident chunks.
+
+Parameters
+----------
+startDate : str
+    start date of the request in the format %Y%m%d;
+endDate : str
+    end date of the request in the format %Y%m%d.
+
+Returns
+-------
+block : DailyDataBlock
+    data of the resident chunks.
+        '''
+        first   = self._getChunkIndex( startDate )
+        last    = max( first, self._getChunkIndex( endDate ) )
+        horizon = dt.datetime.strptime( min( endDate, self.endDate ), BLOCK_DATE_FORMAT ) - \
+                dt.timedelta( self.lookbackDays )
+        keep    = min( first, self._getChunkIndex( horizon.strftime( BLOCK_DATE_FORMAT ) ) )
+
+        changed = False
+        for idx in range( first, last + 1 ):
+            if idx not in self.chunks:
+                future = self.pending.pop( idx, None )
+                self.chunks[ idx ] = future.result() if future is not None else \
+                        self.load( *self._getChunkRange( idx ) )
+                changed = True
+
+        # evict the chunks out of the lookback and drop the stale prefetches
+        for idx in list( self.chunks ):
+            if idx < keep or idx > last + 1:
+                del self.chunks[ idx ]
+                changed = True
+        for idx in list( self.pending ):
+            if idx < keep or idx > last + 1:
+                self.pending.pop( idx ).cancel()
+
+        nextIdx = last + 1
+        if nextIdx not in self.chunks and nextIdx not in self.pending and \
+                self._getChunkRange( nextIdx )[ 0 ] <= self.endDate:
+            self.pending[ nextIdx ] = self.executor.submit( self.load, *self._getChunkRange( nextIdx ) )
+
+        if changed or self.block is None:
+            self.block = self.build( pd.concat( [ self.chunks[ idx ] for idx in sorted( self.chunks ) ],
+                    ignore_index=True ) )
+
+        return self.block
+
+
+    def close( self ):
+        '''Drop the pending prefetches and stop the prefetch thread.
+        '''
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown( wait=False )
+
+
+    def __del__( self ):
+        executor = getattr( self, 'executor', None )
+        if executor is not None:
+            executor.shutdown( wait=False )
@@ -0,0 +1,204 @@
+'''Day x minute x field cube of the bin data.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import logging
+
+# third-party modules
+import numpy  as np
+import pandas as pd
+
+# customized modules
+import data.driver.codec as codec
+
+# column of the minute slot in the bin data
+BIN_SLOT_COLUMN = 'barTime'
+
+
+class BinDataCube( object ):
+    '''Bin data of one instrument as a contiguous dates x slots x fields array.
+    '''
+
+    __slots__ = ( 'dates', 'slots', 'fields', 'values' )
+
+    def __init__( self, dates, slots, fields, values=None ):
+        '''Initialize the cube, allocating the values filled with NaN if not given.
+
+Parameters
+----------
+dates : list of datetime.date
+    data dates, the first axis;
+slots : list of str
+    minute slots in a day, the second axis;
+fields : list of str
+    data fields, the third axis;
+values : numpy.ndarray or None
+    values in the shape ( dates, slots, fields ).
+        '''
+        super( BinDataCube, self ).__init__()
+
+        self.dates  = list( dates )
+        self.slots  = list( slots )
+        self.fields = list( fields )
+        if values is None:
+            values = np.full( ( len( self.dates ), len( self.slots ), len( self.fields ) ), np.nan )
+        self.values = values
+
+
+    def fill( self, i, df, slotColumn=BIN_SLOT_COLUMN ):
+        '''Fill the values of a day from its bin data.
+
+Parameters
+----------
+i : int
+    position of the day on the date axis;
+df : pandas.DataFrame
+    bin data of the day;
+slotColumn : str
+    column of the minute slot.
+
+Returns
+-------
+nDropped : int
+    number of rows whose slot is not on the slot axis.
+        '''
+        positions = pd.Index( self.slots ).get_indexer( df[ slotColumn ] )
+        onGrid    = positions >= 0
+        # the fields missing from the data stay NaN
+        self.values[ i, positions[ onGrid ], : ] = \
+                df.loc[ onGrid ].reindex( columns=self.fields ).to_numpy( dtype=np.float64 )
+
+        return int( len( positions ) - onGrid.sum() )
+
+
+    def day( self, date ):
+        '''Get the bin data of a day.
+
+Parameters
+----------
+date : datetime.date
+    data date.
+
+Returns
+-------
+dayData : pandas.DataFrame
+    slots x fields view on the values of the day.
+        '''
+        return pd.DataFrame( self.values[ self.dates.index( date ) ],
+                index=pd.Index( self.slots, name=BIN_SLOT_COLUMN ), columns=self.fields, copy=False )
+
+
+    def field( self, field ):
+        '''Get a field of all the days.
+
+Parameters
+----------
+field : str
+    data field.
+
+Returns
+-------
+fieldData : pandas.DataFrame
+    dates x slots view on the values of the field.
+        '''
+        return pd.DataFrame( self.values[ :, :, self.fields.index( field ) ],
+                index=pd.Index( self.dates, name='date' ), columns=self.slots, copy=False )
+
+
+    def toFrame( self, dropna=True ):
+        '''Convert the cube to a long DataFrame.
+
+Parameters
+----------
+dropna : bool
+    whether to drop the slots without any data.
+
+Returns
+-------
+df : pandas.DataFrame
+    bin data indexed by ( date, slot ) with one column per field.
+        '''
+        index = pd.MultiIndex.from_product( [ self.dates, self.slots ],
+                names=[ 'date', BIN_SLOT_COLUMN ] )
+        df = pd.DataFrame( self.values.reshape( -1, len( self.fields ) ), index=index,
+                columns=self.fields )
+        if dropna:
+            df = df.dropna( how='all' )
+
+        return df
+
+
+def buildBinDataCube( documents, slots=None, fields=None, slotColumn=BIN_SLOT_COLUMN ):
+    '''Build the cube from the daily bin data records. Each day is decoded once into
+the cube, only its slot column being read beforehand when the slots are not given.
+
+Parameters
+----------
+documents : list of dict
+    records with the `Date` and the encoded `Data` of a day, sorted by date;
+slots : list of str or None
+    minute slots of the cube, None to collect them from the data;
+fields : list of str or None
+    data fields of the cube, None for the numeric columns of any of the days;
+slotColumn : str
+    column of the minute slot.
+
+Returns
+-------
+cube : BinDataCube
+    bin data of the records.
+    '''
+    dates = [ item[ 'Date' ].date() for item in documents ]
+
+    if slots is None:
+        slots = set()
+        for item in documents:
+            slots.update( codec.decodeFrame( item[ 'Data' ], columns=[ slotColumn ] )[ slotColumn ] )
+        slots = sorted( slots )
+
+    if fields is None:
+        # the union of the days, in the order first seen
+        fields = {}
+        for item in documents:
+            fields.update( dict.fromkeys( c for c in codec.getNumericColumns( item[ 'Data' ] )
+                                          if c != slotColumn ) )
+        fields = list( fields )
+
+    cube = BinDataCube( dates, slots, fields )
+    columns  = fields + ( [] if slotColumn in fields else [ slotColumn ] )
+    nDropped = 0
+    for i, item in enumerate( documents ):
+        df = codec.decodeFrame( item[ 'Data' ], columns=columns )
+        nDropped += cube.fill( i, df, slotColumn=slotColumn )
+
+    if nDropped > 0:
+        logging.warning( '{n:d} bins out of the slots are dropped.'.format( n=nDropped ) )
+
+    return cube
@@ -40,7 +40,10 @@ import pandas as pd
 
 # customized modules
 import data.api.base as base
+import data.api.cube as cube
+import data.api.lazy as lazy
 import data.config   as config
+import data.driver.codec   as codec
 import data.driver.mongodb as dMongodb
 import data.driver.mysql   as mysql
 
@@ -53,6 +56,9 @@ TICK_DATE_FORMAT        = '%Y%m%d'
 WIND_DEFAULT_START_DATE = '20120101'
 WIND_DATE_FORMAT        = '%Y%m%d'
 
+# collection of the date-bucketed daily data
+BUCKETED_DAILY_DATA = 'bucketedFutures'
+
 FUTURES_PRODUCTS = [ 'AG', 'AL', 'AU', 'BU', 'CU', 'FU', 'HC', 'NI',
                      'PB', 'RB', 'RU', 'SN', 'WR', 'ZN',  # XSGE
                      'CF', 'RI', 'FG', 'JR', 'LR', 'MA', 'OI', 'PM',
@@ -182,7 +188,38 @@ Exceptions
     db = dMongodb.getAuthenticatedConnection( config.MONGODB_URL, config.MONGODB_PORT,
         username, password, 'dailyData' )
 
-    # Query data
+    # Query the date-bucketed layout first
+    dailyData = base.getBucketedDailyData( db[ BUCKETED_DAILY_DATA ], { 'SecID': secId },
+            startDate, endDate )
+    if dailyData is None:
+        dailyData = _getLegacyDailyData( db, secId, startDate, endDate )
+
+    return dailyData
+
+
+def _getLegacyDailyData( db, secId, startDate, endDate ):
+    '''Get daily data for the given futures from the legacy one-record-per-contract layout.
+
+Parameters
+----------
+db : pymongo.database.Database
+    the daily data database;
+secId : str
+    Security ID of the futures;
+startDate : datetime.date
+    Start date of the daily data queried inclusively;
+endDate : datetime.date
+    End date of the daily data queried inclusively.
+
+Returns
+-------
+dailyData : pandas.DataFrame or None
+    Requested daily data in pandas.DataFrame or None if the futures is not found.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given futures name.
+    '''
     cursor = db.futures.find( { 'SecID': secId } )
 
     # Sanity check
@@ -194,7 +231,7 @@ Exceptions
                          n=nRecords, s=secId ) )
     else:
         data = cursor.next()
-        dailyData = pd.read_json( data[ 'Data' ] )
+        dailyData = codec.decodeFrame( data[ 'Data' ] )
         dailyData.sort_index( inplace=True )
 
         # Filtered by date
@@ -210,6 +247,52 @@ Exceptions
     return dailyData
 
 
+def getDailyDataBatch( secIds, startDate=dt.date( 2012, 1, 1 ), endDate=dt.date.today(),
+        fields=None, layout=base.LAYOUT_LONG ):
+    '''Get daily data for many futures during the date range in one frame.
+
+Parameters
+----------
+secIds : list of str
+    Security ID's of the futures;
+startDate : datetime.date
+    Start date of the daily data queried inclusively;
+endDate : datetime.date
+    End date of the daily data queried inclusively;
+fields : list of str or None
+    data columns to return, None for all;
+layout : str
+    long for a frame indexed by ( tradeDate, secID ) or wide for a frame indexed by
+    tradeDate with one column per ( field, secID ).
+
+Returns
+-------
+dailyData : pandas.DataFrame
+    Requested daily data, in the wide layout `dailyData[ field ]` is the
+    date x futures matrix of the field.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on a futures or the layout is not
+    recognized.
+    '''
+    secIds = list( dict.fromkeys( secIds ) )
+
+    # Get authenticated MongoDB connection
+    username, password = config.MONGODB_CRED
+    db = dMongodb.getAuthenticatedConnection( config.MONGODB_URL, config.MONGODB_PORT,
+        username, password, 'dailyData' )
+
+    dailyData = base.getBucketedDailyDataBatch( db[ BUCKETED_DAILY_DATA ], secIds,
+            startDate, endDate )
+    # contracts not migrated to the bucketed layout yet
+    for secId in secIds:
+        if secId not in dailyData:
+            dailyData[ secId ] = _getLegacyDailyData( db, secId, startDate, endDate )
+
+    return base.combineDailyData( dailyData, secIds, fields=fields, layout=layout )
+
+
 
 def getMainContractDailyData( product, startDate=dt.date( 2012, 1, 1 ),
         endDate=dt.date.today() ):
@@ -238,7 +321,13 @@ Exceptions
     db = dMongodb.getAuthenticatedConnection( config.MONGODB_URL, config.MONGODB_PORT,
         username, password, 'dailyData' )
 
-    # Query data
+    # Query the date-bucketed layout first
+    dailyData = base.getBucketedDailyData( db[ BUCKETED_DAILY_DATA ],
+            { 'Product': product, 'MainContract': 1 }, startDate, endDate )
+    if dailyData is not None:
+        return dailyData
+
+    # Query data in the legacy layout
     cursor = db.futures.find( { 'Product': product, 'MainContract': 1 } )
 
     # Sanity check
@@ -250,7 +339,7 @@ Exceptions
                          n=nRecords, s=product ) )
     else:
         data = cursor.next()
-        dailyData = pd.read_json( data[ 'Data' ] )
+        dailyData = codec.decodeFrame( data[ 'Data' ] )
         dailyData.sort_index( inplace=True )
 
         # Filtered by date
@@ -303,13 +392,88 @@ Exceptoins
             raise Exception( 'Duplicated records on {d:s} found.'.format(
                 d=str( date ) ) )
         else:
-            dayBinData = pd.read_json( item[ 'Data' ] )
+            dayBinData = codec.decodeFrame( item[ 'Data' ] )
             dayBinData.sort_index( inplace=True )
             data[ date ] = dayBinData
 
     return pd.Panel( data )
 
 
+def getBinDataCube( secId, startDate=dt.date( 2012, 1, 1 ), endDate=dt.date.today(),
+        fields=None, slots=None ):
+    '''Get minute-by-minute data for the given futures during the date range in a
+dates x slots x fields cube.
+
+Parameters
+----------
+secId : str
+    Security ID of the futures;
+startDate : datetime.date
+    Start date of the bin data required inclusively,
+endDate : datetime.date
+    End date of the bin data required inclusively;
+fields : list of str or None
+    data fields, None for all the numeric columns;
+slots : list of str or None
+    minute slots, None to collect them from the data since the trading sessions
+    differ across products.
+
+Returns
+-------
+binData : cube.BinDataCube
+    Requested bin data.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given futures name.
+    '''
+    # Get authenticated MongoDB connection
+    username, password = config.MONGODB_CRED
+    db = dMongodb.getAuthenticatedConnection( config.MONGODB_URL,
+            config.MONGODB_PORT, username, password, 'binData' )
+
+    documents = base.getBinDataDocuments( db.futures, secId, startDate, endDate )
+
+    return cube.buildBinDataCube( documents, slots=slots, fields=fields )
+
+
+def getLazyBinData( secId, startDate=dt.date( 2012, 1, 1 ), endDate=dt.date.today(),
+        columns=None, cacheSize=lazy.LAZY_BIN_DATA_CACHE_SIZE ):
+    '''Get minute-by-minute data for the given futures during the date range, decoding
+each day only when it is accessed.
+
+Parameters
+----------
+secId : str
+    Security ID of the futures;
+startDate : datetime.date
+    Start date of the bin data required inclusively,
+endDate : datetime.date
+    End date of the bin data required inclusively;
+columns : list of str or None
+    columns to decode, None for all;
+cacheSize : int
+    maximum number of decoded days kept in memory.
+
+Returns
+-------
+binData : lazy.LazyBinData
+    Requested bin data keyed by date.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given futures name.
+    '''
+    # Get authenticated MongoDB connection
+    username, password = config.MONGODB_CRED
+    db = dMongodb.getAuthenticatedConnection( config.MONGODB_URL,
+            config.MONGODB_PORT, username, password, 'binData' )
+
+    documents = base.getBinDataDocuments( db.futures, secId, startDate, endDate )
+
+    return lazy.LazyBinData( documents, columns=columns, cacheSize=cacheSize )
+
+
 class BinDataSource( base.BinDataSource ):
     '''Get futures bin data from the database.
     '''
@@ -349,9 +513,8 @@ Returns
 businessDates : pandas.Series
     All business dates during the date range.
         '''
-        sql = "SELECT * FROM cfuturescalendar WHERE TRADE_DAYS >= '{sd:s}' AND TRADE_DAYS <= '{ed:s}' ORDER BY TRADE_DAYS ASC".format(
-                sd=startDate, ed=endDate )
-        df  = pd.read_sql( sql, self.conn )
+        sql = mysql.compileSql( 'SELECT S_INFO_EXCHMARKET, TRADE_DAYS FROM cfuturescalendar WHERE TRADE_DAYS >= :startDate AND TRADE_DAYS <= :endDate ORDER BY TRADE_DAYS ASC' )
+        df  = pd.read_sql( sql, self.conn, params={ 'startDate': startDate, 'endDate': endDate } )
 
         # since 20070101, Shanghai Futures Exchange, Dalian Commodities Exchange, Zhengzhou Commodities Exchange,
         # and China Financial Futures Exchange share the same business days.
@@ -359,7 +522,7 @@ businessDates : pandas.Series
 
 
     def getUpDownLimit( self, secId=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get up and down limit data for the given instrument in the specified date range.
 
 Parameters
@@ -369,7 +532,9 @@ secId : str
 startDate : str
     start date of the data in the format %Y%m%d;
 endDate : str
-    end date of the data in the format %Y%m%d.
+    end date of the data in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the contract code and the date, None for all.
 
 Returns
 -------
@@ -381,33 +546,41 @@ Exceptions
     raise Exception when error occurs reading the daily data.
         '''
         tableName = 'cfuturespricechangelimit'
-        sql = mysql.buildSql( tableName, secId, startDate, endDate, dateColumn='CHANGE_DT' )
-        df  = pd.read_sql( sql, self.conn )
+        sql, params = mysql.buildSql( tableName, secId, startDate, endDate, dateColumn='CHANGE_DT',
+                dataColumns=fields )
+        df  = pd.read_sql( sql, self.conn, params=params )
         df.S_INFO_WINDCODE = df.S_INFO_WINDCODE.apply( lambda secId: secId.split( '.' )[ 0 ] )
 
         return df
 
 
-    def getFuturesInfo( self, secId=None, tableName='cfuturescontpro' ):
+    def getFuturesInfo( self, secId=None, tableName='cfuturescontpro', fields=None ):
         '''Get futures fundemental information.
 
 Parameters
 ----------
 secId : str
-    Wind stock code; if None, get the dailyData on all the stocks.
+    Wind stock code; if None, get the dailyData on all the stocks;
+tableName : str
+    name of the table to read futures fundamental data;
+fields : list of str or None
+    data columns to read besides the contract code, None for all.
 
 Returns
 -------
 fundamentalData : pandas.DataFrame
-    fundamental data for the specified futures instrument. The order of the rows is not guaranteed;
-tableName : str
-    name of the table to read futures fundamental data.
+    fundamental data for the specified futures instrument. The order of the rows is not guaranteed.
 
 Exceptions
 ----------
     raise Exception when error occurs reading the daily data.
         '''
-        sql = 'SELECT * FROM {tn:s}'.format( tn=tableName )
+        # the converted columns are always read
+        keyColumns = [ 'S_INFO_WINDCODE' ]
+        if tableName == 'cfuturescontpro':
+            keyColumns.append( 'S_INFO_MFPRICE' )
+        sql = 'SELECT {cols:s} FROM {tn:s}'.format(
+                cols=mysql.getSelectColumns( keyColumns, fields ), tn=tableName )
         df  = pd.read_sql( sql, self.conn )
 
         if tableName == 'cfuturescontpro':
@@ -418,7 +591,7 @@ Exceptions
 
 
     def getMarginInfo( self, secId=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get futures margin information.
 
 Parameters
@@ -428,7 +601,9 @@ secId : str
 startDate : str
     start date of the data in the format %Y%m%d;
 endDate : str
-    end date of the data in the format %Y%m%d.
+    end date of the data in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the contract code and the date, None for all.
 
 Returns
 -------
@@ -439,7 +614,9 @@ Exceptions
 ----------
     raise Exception when error occurs reading the daily data.
         '''
-        sql = 'SELECT * FROM cfuturesmarginratio'
+        # the converted columns are always read
+        sql = 'SELECT {cols:s} FROM cfuturesmarginratio'.format(
+                cols=mysql.getSelectColumns( [ 'S_INFO_WINDCODE', 'MARGINRATIO' ], fields ) )
         df  = pd.read_sql( sql, self.conn )
         # convert to percentage
         df.MARGINRATIO     = df.MARGINRATIO.apply( float ) / 100.0
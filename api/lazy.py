@@ -0,0 +1,167 @@
+'''Lazily decoded daily bin data.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import collections
+import datetime as dt
+
+# third-party modules
+
+# customized modules
+import data.driver.codec as codec
+
+# number of decoded days kept in memory
+LAZY_BIN_DATA_CACHE_SIZE = 32
+
+
+class LazyBinData( object ):
+    '''Bin data of one instrument in a date range, holding the encoded records and
+decoding a day only on first access. Decoded days are kept in a LRU cache.
+    '''
+
+    def __init__( self, documents, columns=None, cacheSize=LAZY_BIN_DATA_CACHE_SIZE ):
+        '''Initialize the lazy bin data.
+
+Parameters
+----------
+documents : list of dict
+    records with the `Date` and the encoded `Data` of a day, sorted by date;
+columns : list of str or None
+    columns to decode by default, None for all;
+cacheSize : int
+    maximum number of decoded days kept.
+        '''
+        super( LazyBinData, self ).__init__()
+
+        self.records   = collections.OrderedDict( ( item[ 'Date' ].date(), item[ 'Data' ] )
+                                                  for item in documents )
+        self.columns   = columns
+        self.cacheSize = cacheSize
+        self._cache    = collections.OrderedDict()
+        self._hits     = 0
+        self._misses   = 0
+
+
+    def dates( self ):
+        '''Get the data dates.
+
+Returns
+-------
+dates : list of datetime.date
+    dates with data in ascending order.
+        '''
+        return list( self.records.keys() )
+
+
+    def get( self, date, columns=None ):
+        '''Get the bin data of a day, decoding it on first access.
+
+Parameters
+----------
+date : datetime.date
+    data date;
+columns : list of str or None
+    columns to decode, None for the default columns.
+
+Returns
+-------
+dayBinData : pandas.DataFrame
+    bin data of the day.
+
+Exceptions
+----------
+    raise KeyError when there is no data on the date.
+        '''
+        if isinstance( date, dt.datetime ):
+            date = date.date()
+        if columns is None:
+            columns = self.columns
+
+        key = ( date, None if columns is None else tuple( columns ) )
+        dayBinData = self._cache.get( key )
+        if dayBinData is not None:
+            self._cache.move_to_end( key )
+            self._hits += 1
+        else:
+            dayBinData = codec.decodeFrame( self.records[ date ], columns=columns )
+            dayBinData.sort_index( inplace=True )
+            self._misses += 1
+
+            self._cache[ key ] = dayBinData
+            if len( self._cache ) > self.cacheSize:
+                self._cache.popitem( last=False )
+
+        return dayBinData
+
+
+    def items( self, columns=None ):
+        '''Iterate over the days in ascending order.
+
+Parameters
+----------
+columns : list of str or None
+    columns to decode, None for the default columns.
+
+Returns
+-------
+days : generator of tuple
+    ( date, dayBinData ) of each day.
+        '''
+        for date in self.records:
+            yield date, self.get( date, columns=columns )
+
+
+    def getStats( self ):
+        '''Get the cache statistics.
+
+Returns
+-------
+stats : dict
+    `hits`, `misses` and `cached` number of decoded days in memory.
+        '''
+        return { 'hits': self._hits, 'misses': self._misses, 'cached': len( self._cache ) }
+
+
+    def __getitem__( self, date ):
+        return self.get( date )
+
+
+    def __contains__( self, date ):
+        if isinstance( date, dt.datetime ):
+            date = date.date()
+        return date in self.records
+
+
+    def __iter__( self ):
+        return iter( self.records )
+
+
+    def __len__( self ):
+        return len( self.records )
@@ -0,0 +1,177 @@
+'''Chunk planner of the batched securities x date range reads.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import datetime as dt
+import threading
+
+# third-party modules
+import pandas as pd
+
+# customized modules
+import data.config.mysql as mysqlConfig
+
+PLANNER_DATE_FORMAT = '%Y%m%d'
+
+# expected rows per security per business day
+DAILY_DENSITY     = 1.0
+QUARTERLY_DENSITY = 4.0 / 244
+
+
+class ChunkPlanner( object ):
+    '''Split a read of many securities over a date range into queries of about the
+same number of rows, along both the security and the date axes.
+    '''
+
+    def __init__( self, rowsPerQuery=mysqlConfig.MYSQL_ROWS_PER_QUERY,
+            maxSecIds=mysqlConfig.MYSQL_MAX_IN_LIST,
+            targetSeconds=mysqlConfig.MYSQL_TARGET_QUERY_SECONDS, alpha=0.2 ):
+        '''Initialize the planner.
+
+Parameters
+----------
+rowsPerQuery : int
+    rows budget of a query, also the ceiling when the budget is learned;
+maxSecIds : int
+    maximum number of securities in an IN list;
+targetSeconds : float or None
+    target latency of a query to size the queries by the observed throughput, None
+    to use the fixed rows budget;
+alpha : float
+    smoothing factor of the throughput moving average.
+        '''
+        super( ChunkPlanner, self ).__init__()
+
+        self.rowsPerQuery  = rowsPerQuery
+        self.maxSecIds     = maxSecIds
+        self.targetSeconds = targetSeconds
+        self.alpha         = alpha
+        self.throughput    = None
+        self._lock         = threading.Lock()
+
+
+    def observe( self, nRows, seconds ):
+        '''Record the size and the latency of an executed query.
+
+Parameters
+----------
+nRows : int
+    number of rows returned;
+seconds : float
+    elapsed time of the query.
+        '''
+        if seconds <= 0:
+            return
+
+        with self._lock:
+            throughput = nRows / seconds
+            if self.throughput is None:
+                self.throughput = throughput
+            else:
+                self.throughput = self.alpha * throughput + ( 1 - self.alpha ) * self.throughput
+
+
+    def getRowsPerQuery( self ):
+        '''Get the current rows budget of a query.
+
+Returns
+-------
+rowsPerQuery : int
+    the learned budget when the target latency is set and some queries are observed,
+    bounded by the fixed budget, otherwise the fixed budget.
+        '''
+        rowsPerQuery = self.rowsPerQuery
+        if self.targetSeconds is not None and self.throughput is not None:
+            rowsPerQuery = min( rowsPerQuery, int( self.throughput * self.targetSeconds ) )
+
+        return max( 1, rowsPerQuery )
+
+
+    def plan( self, secIds, startDate, endDate, density=DAILY_DENSITY, dates=None ):
+        '''Plan the chunks of a read.
+
+Parameters
+----------
+secIds : list of str
+    securities to read;
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+density : float
+    expected rows per security per business day;
+dates : list of str or None
+    business dates in the format %Y%m%d to estimate the rows, None for the weekdays.
+
+Returns
+-------
+chunks : list of tuple
+    ( secIds, windowStart, windowEnd ) of each query, the date windows covering the
+    date range without overlap.
+        '''
+        secIds = list( secIds )
+        if len( secIds ) == 0:
+            return []
+
+        if dates is None:
+            dates = [ d.strftime( PLANNER_DATE_FORMAT ) for d in pd.bdate_range( startDate, endDate ) ]
+        else:
+            dates = [ d for d in dates if startDate <= d <= endDate ]
+        nDays  = max( 1, len( dates ) )
+        budget = self.getRowsPerQuery()
+
+        # widest IN list first, then narrower date windows, then narrower IN lists
+        nSecIds       = min( self.maxSecIds, len( secIds ) )
+        daysPerWindow = nDays
+        if nSecIds * nDays * density > budget:
+            daysPerWindow = int( budget // ( nSecIds * density ) )
+            if daysPerWindow < 1:
+                daysPerWindow = 1
+                nSecIds       = max( 1, int( budget // density ) )
+
+        windows = []
+        if daysPerWindow >= nDays or len( dates ) == 0:
+            windows.append( ( startDate, endDate ) )
+        else:
+            starts = [ startDate ] + dates[ daysPerWindow : : daysPerWindow ]
+            for i, windowStart in enumerate( starts ):
+                if i + 1 < len( starts ):
+                    windowEnd = ( dt.datetime.strptime( starts[ i + 1 ], PLANNER_DATE_FORMAT ) -
+                            dt.timedelta( 1 ) ).strftime( PLANNER_DATE_FORMAT )
+                else:
+                    windowEnd = endDate
+                windows.append( ( windowStart, windowEnd ) )
+
+        chunks = []
+        for i in range( 0, len( secIds ), nSecIds ):
+            for windowStart, windowEnd in windows:
+                chunks.append( ( secIds[ i : i + nSecIds ], windowStart, windowEnd ) )
+
+        return chunks
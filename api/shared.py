@@ -0,0 +1,113 @@
+'''Arrays written once to memory-mapped files and attached read-only by other processes,
+e.g. the workers of a parameter sweep reading the same daily data, so that the
+processes share one copy in the page cache.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import os
+import shutil
+import tempfile
+
+# third-party modules
+import numpy as np
+
+# customized modules
+
+# RAM-backed file system where available
+SHARED_ROOT_DIR = '/dev/shm' if os.path.isdir( '/dev/shm' ) else None
+
+
+def createSharedDirectory( root=SHARED_ROOT_DIR ):
+    '''Create a new directory for the shared arrays.
+
+Parameters
+----------
+root : str or None
+    parent directory, None for the default temporary directory.
+
+Returns
+-------
+path : str
+    path of the created directory.
+    '''
+    return tempfile.mkdtemp( prefix='arsenal-data-', dir=root )
+
+
+def shareArrays( path, arrays ):
+    '''Write the arrays into the shared directory.
+
+Parameters
+----------
+path : str
+    shared directory;
+arrays : dict
+    name to numpy.ndarray, names being valid file names.
+    '''
+    for name, array in arrays.items():
+        np.save( os.path.join( path, '{n:s}.npy'.format( n=name ) ), np.ascontiguousarray( array ) )
+
+
+def attachArrays( path, names ):
+    '''Attach the shared arrays as read-only memory-mapped views. Arrays of Python
+objects cannot be mapped and are loaded instead.
+
+Parameters
+----------
+path : str
+    shared directory;
+names : list of str
+    names of the arrays.
+
+Returns
+-------
+arrays : dict
+    name to read-only numpy.ndarray.
+    '''
+    arrays = {}
+    for name in names:
+        filename = os.path.join( path, '{n:s}.npy'.format( n=name ) )
+        try:
+            arrays[ name ] = np.load( filename, mmap_mode='r' )
+        except ValueError:
+            arrays[ name ] = np.load( filename, allow_pickle=True )
+
+    return arrays
+
+
+def releaseSharedDirectory( path ):
+    '''Remove the shared directory, by the owner once all the workers are done. Views
+already attached remain valid until they are released.
+
+Parameters
+----------
+path : str
+    shared directory.
+    '''
+    shutil.rmtree( path, ignore_errors=True )
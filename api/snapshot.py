@@ -0,0 +1,543 @@
+'''On-disk snapshots of the daily data loaded in batch, so that the repeated loads of
+the same securities reuse the data read before and only query the missing dates.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import contextlib
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# third-party modules
+import numpy  as np
+import pandas as pd
+
+# customized modules
+
+SNAPSHOT_DATE_FORMAT  = '%Y%m%d'
+SNAPSHOT_META_FILE    = 'meta.json'
+# pointer to the current frame of a snapshot, replaced atomically, and the lock
+# serializing the writers
+SNAPSHOT_CURRENT_FILE = 'current.json'
+SNAPSHOT_LOCK_FILE    = 'lock'
+
+# frames not referenced for so long are left by failed writers and removed
+SNAPSHOT_ORPHAN_SECONDS = 3600
+
+# errors of a snapshot changed or removed by another process while read
+SNAPSHOT_READ_ERRORS = ( IOError, OSError, ValueError, KeyError )
+
+# column encodings, plain arrays or integer codes with the categories
+COLUMN_VALUES = 'values'
+COLUMN_CODES  = 'codes'
+
+
+def getSnapshotKey( tableName, secIds ):
+    '''Get the key of the snapshot of a table and a set of securities.
+
+Parameters
+----------
+tableName : str
+    name of the source table;
+secIds : list of str
+    securities identifiers, the order does not matter.
+
+Returns
+-------
+key : str
+    directory name of the snapshot.
+    '''
+    digest = hashlib.sha1( '\n'.join( [ tableName ] + sorted( set( secIds ) ) ).encode( 'utf-8' ) )
+    return '{tn:s}-{h:s}'.format( tn=tableName, h=digest.hexdigest()[ : 20 ] )
+
+
+def _shiftDate( dataDate, days ):
+    '''Shift the date by calendar days.
+
+Parameters
+----------
+dataDate : str
+    date in the format %Y%m%d;
+days : int
+    number of days to shift, negative for the past.
+
+Returns
+-------
+shiftedDate : str
+    shifted date in the format %Y%m%d.
+    '''
+    shiftedDate = dt.datetime.strptime( dataDate, SNAPSHOT_DATE_FORMAT ) + dt.timedelta( days )
+    return shiftedDate.strftime( SNAPSHOT_DATE_FORMAT )
+
+
+def encodeColumn( column ):
+    '''Encode a column as a plain array or as integer codes with the categories.
+
+Parameters
+----------
+column : pandas.Series
+    column to encode.
+
+Returns
+-------
+kind : str
+    COLUMN_VALUES or COLUMN_CODES;
+values : numpy.ndarray
+    values of a numeric or datetime column, int32 codes of the others;
+categories : numpy.ndarray or None
+    sorted categories as an object array if possible, None for plain values.
+    '''
+    if column.dtype.kind in 'biufcmM':
+        return COLUMN_VALUES, column.to_numpy(), None
+
+    try:
+        codes, categories = pd.factorize( column, sort=True )
+    except TypeError:
+        # values not comparable to each other
+        codes, categories = pd.factorize( column )
+
+    return COLUMN_CODES, codes.astype( np.int32 ), np.asarray( categories, dtype=object )
+
+
+def decodeColumn( codes, categories ):
+    '''Decode the integer codes of a column, see `encodeColumn`.
+
+Parameters
+----------
+codes : numpy.ndarray
+    integer codes, -1 for the missing values;
+categories : numpy.ndarray
+    categories as an object array.
+
+Returns
+-------
+values : numpy.ndarray
+    values as an object array.
+    '''
+    values = categories[ np.maximum( codes, 0 ) ] if len( categories ) > 0 \
+            else np.empty( len( codes ), dtype=object )
+    values[ codes < 0 ] = None
+
+    return values
+
+
+def isFresh( stored, watermark ):
+    '''Check whether data saved under a watermark is still up-to-date.
+
+Parameters
+----------
+stored : str or None
+    watermark when the data was saved, None if unknown;
+watermark : str or None
+    current watermark of the rows read, None without any row.
+
+Returns
+-------
+fresh : bool
+    True if no row read has been modified since the data was saved.
+    '''
+    return watermark is None or ( stored is not None and watermark <= stored )
+
+
+def writeFrame( path, data, meta ):
+    '''Write the frame as one .npy file per column. Numeric and datetime columns are
+written as they are, other columns as integer codes with the sorted categories.
+
+Parameters
+----------
+path : str
+    directory of the frame, which must not exist; the metadata is written last, so
+    that a frame without it is incomplete;
+data : pandas.DataFrame
+    frame to write;
+meta : dict
+    metadata written along, with the number of rows and the encoding of the
+    columns added.
+    '''
+    os.makedirs( path )
+
+    columns = []
+    for i, name in enumerate( data.columns ):
+        kind, values, categories = encodeColumn( data[ name ] )
+        if kind == COLUMN_VALUES:
+            np.save( os.path.join( path, '{i:d}.npy'.format( i=i ) ), values )
+        else:
+            np.save( os.path.join( path, '{i:d}.codes.npy'.format( i=i ) ), values )
+            np.save( os.path.join( path, '{i:d}.categories.npy'.format( i=i ) ),
+                    categories, allow_pickle=True )
+        columns.append( { 'name': name, 'kind': kind } )
+
+    meta = dict( meta, nRows=len( data ), columns=columns )
+    with open( os.path.join( path, SNAPSHOT_META_FILE ), 'w' ) as f:
+        json.dump( meta, f )
+
+
+def readColumn( path, i, column, first=0, last=None ):
+    '''Read the rows of a column written by `writeFrame` with memory mapping.
+
+Parameters
+----------
+path : str
+    directory of the frame;
+i : int
+    position of the column;
+column : dict
+    name and encoding of the column;
+first : int
+    first row to read;
+last : int or None
+    last row + 1 to read, None up to the end.
+
+Returns
+-------
+values : numpy.ndarray
+    values of the rows.
+    '''
+    if column[ 'kind' ] == COLUMN_VALUES:
+        return np.load( os.path.join( path, '{i:d}.npy'.format( i=i ) ), mmap_mode='r' )[ first : last ]
+
+    codes      = np.load( os.path.join( path, '{i:d}.codes.npy'.format( i=i ) ), mmap_mode='r' )[ first : last ]
+    categories = np.load( os.path.join( path, '{i:d}.categories.npy'.format( i=i ) ), allow_pickle=True )
+
+    return decodeColumn( codes, categories )
+
+
+def readFrame( path, categorical=False ):
+    '''Read a frame written by `writeFrame` with memory mapping.
+
+Parameters
+----------
+path : str
+    directory of the frame;
+categorical : bool
+    whether to read the coded columns as categoricals over the mapped codes instead
+    of decoding them.
+
+Returns
+-------
+data : pandas.DataFrame
+    frame read.
+    '''
+    with open( os.path.join( path, SNAPSHOT_META_FILE ) ) as f:
+        meta = json.load( f )
+
+    data = {}
+    for i, column in enumerate( meta[ 'columns' ] ):
+        if categorical and column[ 'kind' ] == COLUMN_CODES:
+            codes      = np.load( os.path.join( path, '{i:d}.codes.npy'.format( i=i ) ), mmap_mode='r' )
+            categories = np.load( os.path.join( path, '{i:d}.categories.npy'.format( i=i ) ), allow_pickle=True )
+            data[ column[ 'name' ] ] = pd.Categorical.from_codes( codes, categories )
+        else:
+            data[ column[ 'name' ] ] = readColumn( path, i, column )
+
+    return pd.DataFrame( data, copy=False )
+
+
+@contextlib.contextmanager
+def _lockFile( path ):
+    '''Hold the exclusive lock on the file, flock on POSIX and msvcrt on Windows.
+
+Parameters
+----------
+path : str
+    path of the lock file, created if necessary.
+
+Exceptions
+----------
+    raise OSError when no file locking is available on the platform.
+    '''
+    with open( path, 'a+' ) as lockFile:
+        if fcntl is not None:
+            fcntl.flock( lockFile, fcntl.LOCK_EX )
+            yield
+        elif msvcrt is not None:
+            # lock the first byte, LK_LOCK gives up after 10 attempts
+            lockFile.seek( 0 )
+            while True:
+                try:
+                    msvcrt.locking( lockFile.fileno(), msvcrt.LK_LOCK, 1 )
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                lockFile.seek( 0 )
+                msvcrt.locking( lockFile.fileno(), msvcrt.LK_UNLCK, 1 )
+        else:
+            raise OSError( 'No file locking available for the snapshots.' )
+
+
+class SnapshotStore( object ):
+    '''Directory of the snapshots of the daily data, one per table and set of securities.
+
+A snapshot is a list of segments, each covering a date range with the rows written
+once by `writeFrame` under a unique name, and the watermark of the rows when read,
+e.g. MAX( OPDATE ) of the securities over the window of a Wind source. A segment is
+ignored once a reader sees a later watermark, see `isFresh`. New rows are added as a
+new segment, so that loading a window only reads the overlapping segments.
+
+The segment list is a pointer file replaced atomically under a file lock held by the
+writers, so that readers always see complete segments.
+    '''
+
+    def __init__( self, directory, dateColumn='TRADE_DT', secColumn='S_INFO_WINDCODE' ):
+        '''Initialize the store, creating the directory if necessary.
+
+Parameters
+----------
+directory : str
+    root directory of the snapshots;
+dateColumn : str
+    name of the date column in the format %Y%m%d;
+secColumn : str
+    name of the security column.
+        '''
+        super( SnapshotStore, self ).__init__()
+
+        os.makedirs( directory, exist_ok=True )
+        self.directory  = directory
+        self.dateColumn = dateColumn
+        self.secColumn  = secColumn
+
+
+    def _readSegments( self, path ):
+        '''Read the segment list of a snapshot.
+
+Parameters
+----------
+path : str
+    directory of the snapshot.
+
+Returns
+-------
+segments : list of dict
+    startDate, endDate, watermark and frame name of the segments.
+        '''
+        try:
+            with open( os.path.join( path, SNAPSHOT_CURRENT_FILE ) ) as f:
+                return json.load( f ).get( 'segments', [] )
+        except SNAPSHOT_READ_ERRORS:
+            return []
+
+
+    def _writeSegments( self, path, tableName, segments ):
+        '''Replace the segment list atomically.
+
+Parameters
+----------
+path : str
+    directory of the snapshot;
+tableName : str
+    name of the source table;
+segments : list of dict
+    startDate, endDate, watermark and frame name of the segments.
+        '''
+        tmpFile = os.path.join( path, '{f:s}.tmp-{u:s}'.format( f=SNAPSHOT_CURRENT_FILE,
+                u=uuid.uuid4().hex ) )
+        with open( tmpFile, 'w' ) as f:
+            json.dump( { 'table': tableName, 'segments': segments }, f )
+        os.replace( tmpFile, os.path.join( path, SNAPSHOT_CURRENT_FILE ) )
+
+
+    def _removeFrames( self, path, removed, keep ):
+        '''Remove the frames of the dropped segments, and the ones left by failed writers.
+
+Parameters
+----------
+path : str
+    directory of the snapshot;
+removed : list of str
+    names of the frames dropped;
+keep : list of str
+    names of the frames still referenced.
+        '''
+        now = time.time()
+        for name in os.listdir( path ):
+            framePath = os.path.join( path, name )
+            if not name.startswith( 'frame-' ) or name in keep:
+                continue
+            try:
+                # unreferenced recent frames may be written by other processes
+                if name in removed or now - os.path.getmtime( framePath ) > SNAPSHOT_ORPHAN_SECONDS:
+                    shutil.rmtree( framePath, ignore_errors=True )
+            except OSError:
+                # removed by another writer
+                pass
+
+
+    def _readRows( self, path, startDate=None, endDate=None ):
+        '''Read the rows of a frame in the date range.
+
+Parameters
+----------
+path : str
+    directory of the frame;
+startDate : str or None
+    start date inclusively, None for the first row;
+endDate : str or None
+    end date inclusively, None for the last row.
+
+Returns
+-------
+data : pandas.DataFrame
+    rows in the date range.
+        '''
+        with open( os.path.join( path, SNAPSHOT_META_FILE ) ) as f:
+            meta = json.load( f )
+
+        # rows are sorted by date, so the date codes are ascending as well
+        first, last = 0, meta[ 'nRows' ]
+        for i, column in enumerate( meta[ 'columns' ] ):
+            if column[ 'name' ] == self.dateColumn:
+                codes      = np.load( os.path.join( path, '{i:d}.codes.npy'.format( i=i ) ), mmap_mode='r' )
+                categories = np.load( os.path.join( path, '{i:d}.categories.npy'.format( i=i ) ),
+                        allow_pickle=True ).astype( str )
+                if startDate is not None:
+                    first = int( codes.searchsorted( categories.searchsorted( startDate, side='left' ) ) )
+                if endDate is not None:
+                    last  = int( codes.searchsorted( categories.searchsorted( endDate, side='right' ) ) )
+
+        return pd.DataFrame( { column[ 'name' ]: readColumn( path, i, column, first, last )
+                for i, column in enumerate( meta[ 'columns' ] ) } )
+
+
+    def load( self, tableName, secIds, startDate, endDate, watermark ):
+        '''Load the snapshot rows in the date range.
+
+Parameters
+----------
+tableName : str
+    name of the source table;
+secIds : list of str
+    securities identifiers;
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+watermark : str or None
+    current watermark of the rows read.
+
+Returns
+-------
+data : pandas.DataFrame or None
+    snapshot rows in the date range, None without any usable segment;
+missing : list of tuple
+    ( startDate, endDate ) of the ranges not covered, to read from the source.
+        '''
+        path     = os.path.join( self.directory, getSnapshotKey( tableName, secIds ) )
+        segments = sorted( [ s for s in self._readSegments( path )
+                             if isFresh( s[ 'watermark' ], watermark ) and
+                                s[ 'startDate' ] <= endDate and s[ 'endDate' ] >= startDate ],
+                           key=lambda s: s[ 'startDate' ] )
+
+        # walk the segments by start date, reading each date once
+        dfs, missing = [], []
+        curDate = startDate
+        for segment in segments:
+            if segment[ 'endDate' ] < curDate:
+                continue
+            if segment[ 'startDate' ] > curDate:
+                missing.append( ( curDate, _shiftDate( segment[ 'startDate' ], -1 ) ) )
+                curDate = segment[ 'startDate' ]
+            lastDate = min( segment[ 'endDate' ], endDate )
+            try:
+                dfs.append( self._readRows( os.path.join( path, segment[ 'frame' ] ), curDate, lastDate ) )
+            except SNAPSHOT_READ_ERRORS:
+                # dropped by another writer meanwhile
+                missing.append( ( curDate, lastDate ) )
+            if lastDate >= endDate:
+                curDate = None
+                break
+            curDate = _shiftDate( lastDate, 1 )
+        if curDate is not None:
+            missing.append( ( curDate, endDate ) )
+
+        data = pd.concat( dfs, ignore_index=True ) if len( dfs ) > 0 else None
+        return data, missing
+
+
+    def update( self, tableName, secIds, data, startDate, endDate, watermark ):
+        '''Add the rows read from the source to the snapshot as a new segment.
+
+Parameters
+----------
+tableName : str
+    name of the source table;
+secIds : list of str
+    securities identifiers;
+data : pandas.DataFrame
+    all rows of the securities in the date range;
+startDate : str
+    start date of the rows in the format %Y%m%d inclusively;
+endDate : str
+    end date of the rows in the format %Y%m%d inclusively;
+watermark : str or None
+    current watermark of the rows read.
+
+Exceptions
+----------
+    raise OSError when the snapshot cannot be written.
+        '''
+        path = os.path.join( self.directory, getSnapshotKey( tableName, secIds ) )
+        os.makedirs( path, exist_ok=True )
+
+        frame = 'frame-{u:s}'.format( u=uuid.uuid4().hex )
+        data  = data.sort_values( [ self.dateColumn, self.secColumn ], kind='mergesort' )
+        writeFrame( os.path.join( path, frame ), data, { 'table': tableName } )
+
+        with _lockFile( os.path.join( path, SNAPSHOT_LOCK_FILE ) ):
+            # drop the stale segments and the ones covered by the new segment
+            kept, removed = [], []
+            for segment in self._readSegments( path ):
+                if isFresh( segment[ 'watermark' ], watermark ) and not (
+                        startDate <= segment[ 'startDate' ] and segment[ 'endDate' ] <= endDate ):
+                    kept.append( segment )
+                else:
+                    removed.append( segment[ 'frame' ] )
+            kept.append( { 'startDate': startDate, 'endDate': endDate,
+                           'watermark': watermark, 'frame': frame } )
+
+            self._writeSegments( path, tableName, kept )
+            self._removeFrames( path, removed, [ s[ 'frame' ] for s in kept ] )
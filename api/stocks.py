@@ -31,6 +31,9 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # built-in modules
 import datetime as dt
 import functools
+import os
+import threading
+import time
 
 # third-party modules
 import numpy  as np
@@ -38,7 +41,14 @@ import pandas as pd
 
 # customized modules
 import data.api.base as base
+import data.api.blocks as blocks
+import data.api.cube as cube
+import data.api.lazy as lazy
+import data.api.planner as planner
+import data.api.shared as shared
+import data.api.snapshot as snapshot
 from data.config import *
+from data.driver import codec
 from data.driver import mongodb
 from data.driver import mysql
 from data.driver import sqlite3
@@ -60,6 +70,26 @@ TICK_DATE_FORMAT        = '%Y%m%d'
 WIND_DEFAULT_START_DATE = '20160104'
 WIND_DATE_FORMAT        = '%Y%m%d'
 
+# collection of the date-bucketed daily data
+BUCKETED_DAILY_DATA = 'bucketedStocks'
+
+# calendar days kept before the latest requested date in the windowed CachedWindSource,
+# about 100 trading days
+CACHED_WIND_LOOKBACK_DAYS = 150
+
+# columns converted by the compact Wind results, see `data.api.base.compactFrame`
+WIND_ID_COLUMNS   = [ 'S_INFO_WINDCODE' ]
+WIND_DATE_COLUMNS = [ 'TRADE_DT', 'ANN_DT', 'REPORT_PERIOD' ]
+
+# what CachedWindSource does when the loaded data exceeds the memory budget
+BUDGET_RAISE = blocks.BUDGET_RAISE
+BUDGET_SPILL = blocks.BUDGET_SPILL
+
+# minute slots of the A-share continuous trading sessions
+BIN_DATA_SLOTS = [ t.strftime( '%H:%M' ) for t in
+        list( pd.date_range( '09:31', '11:30', freq='min' ) ) +
+        list( pd.date_range( '13:01', '15:00', freq='min' ) ) ]
+
 # @functools.lru_cache( maxsize=32 )
 def _getUniverse( asOfDate, country='CN' ):
     '''Get stock universe as of the given date.
@@ -230,7 +260,38 @@ Exceptions
     db = mongodb.getAuthenticatedConnection( MONGODB_URL, MONGODB_PORT,
         username, password, 'dailyData' )
 
-    # Query data
+    # Query the date-bucketed layout first
+    dailyData = base.getBucketedDailyData( db[ BUCKETED_DAILY_DATA ], { 'SecID': secId },
+            startDate, endDate )
+    if dailyData is None:
+        dailyData = _getLegacyDailyData( db, secId, startDate, endDate )
+
+    return dailyData
+
+
+def _getLegacyDailyData( db, secId, startDate, endDate ):
+    '''Get daily data for the given stock from the legacy one-record-per-stock layout.
+
+Parameters
+----------
+db : pymongo.database.Database
+    the daily data database;
+secId : str
+    Security ID of the stock;
+startDate : datetime.date
+    Start date of the daily data queried inclusively;
+endDate : datetime.date
+    End date of the daily data queried inclusively.
+
+Returns
+-------
+dailyData : pandas.DataFrame or None
+    Requested daily data in pandas.DataFrame or None if the stock is not found.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given stock name.
+    '''
     cursor = db.stocks.find( { 'SecID': secId } )
 
     # Sanity check
@@ -242,7 +303,7 @@ Exceptions
                          n=nRecords, s=secId ) )
     else:
         data = cursor.next()
-        dailyData = pd.read_json( data[ 'Data' ] )
+        dailyData = codec.decodeFrame( data[ 'Data' ] )
         dailyData.sort_index( inplace=True )
 
         # Filtered by date
@@ -256,6 +317,52 @@ Exceptions
     return dailyData
 
 
+def getDailyDataBatch( secIds, startDate=DEFAULT_START_DATE, endDate=dt.date.today(),
+        fields=None, layout=base.LAYOUT_LONG ):
+    '''Get daily data for many stocks during the date range in one frame.
+
+Parameters
+----------
+secIds : list of str
+    Security ID's of the stocks;
+startDate : datetime.date
+    Start date of the daily data queried inclusively;
+endDate : datetime.date
+    End date of the daily data queried inclusively;
+fields : list of str or None
+    data columns to return, None for all;
+layout : str
+    long for a frame indexed by ( tradeDate, secID ) or wide for a frame indexed by
+    tradeDate with one column per ( field, secID ).
+
+Returns
+-------
+dailyData : pandas.DataFrame
+    Requested daily data, in the wide layout `dailyData[ field ]` is the
+    date x stock matrix of the field.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on a stock or the layout is not
+    recognized.
+    '''
+    secIds = list( dict.fromkeys( secIds ) )
+
+    # Get authenticated MongoDB connection
+    username, password = MONGODB_CRED
+    db = mongodb.getAuthenticatedConnection( MONGODB_URL, MONGODB_PORT,
+        username, password, 'dailyData' )
+
+    dailyData = base.getBucketedDailyDataBatch( db[ BUCKETED_DAILY_DATA ], secIds,
+            startDate, endDate )
+    # stocks not migrated to the bucketed layout yet
+    for secId in secIds:
+        if secId not in dailyData:
+            dailyData[ secId ] = _getLegacyDailyData( db, secId, startDate, endDate )
+
+    return base.combineDailyData( dailyData, secIds, fields=fields, layout=layout )
+
+
 def getBinData( secId, startDate=DEFAULT_START_DATE, endDate=dt.date.today() ):
     '''Get minute-by-minute data for the given stock during the date range.
 
@@ -295,13 +402,88 @@ Exceptoins
             raise Exception( 'Duplicated records on {d:s} found.'.format(
                 d=str( date ) ) )
         else:
-            dayBinData = pd.read_json( item[ 'Data' ] )
+            dayBinData = codec.decodeFrame( item[ 'Data' ] )
             dayBinData.sort_index( inplace=True )
             data[ date ] = dayBinData
 
     return pd.Panel( data )
 
 
+def getBinDataCube( secId, startDate=DEFAULT_START_DATE, endDate=dt.date.today(),
+        fields=None, slots=BIN_DATA_SLOTS ):
+    '''Get minute-by-minute data for the given stock during the date range in a
+dates x slots x fields cube.
+
+Parameters
+----------
+secId : str
+    Security ID of the stock;
+startDate : datetime.date
+    Start date of the bin data required inclusively,
+endDate : datetime.date
+    End date of the bin data required inclusively;
+fields : list of str or None
+    data fields, None for all the numeric columns;
+slots : list of str or None
+    minute slots, the 240 A-share continuous trading minutes by default, None to
+    collect them from the data.
+
+Returns
+-------
+binData : cube.BinDataCube
+    Requested bin data.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given stock name.
+    '''
+    # Get authenticated MongoDB connection
+    username, password = MONGODB_CRED
+    db = mongodb.getAuthenticatedConnection( MONGODB_URL, MONGODB_PORT,
+        username, password, 'binData' )
+
+    documents = base.getBinDataDocuments( db.stocks, secId, startDate, endDate )
+
+    return cube.buildBinDataCube( documents, slots=slots, fields=fields )
+
+
+def getLazyBinData( secId, startDate=DEFAULT_START_DATE, endDate=dt.date.today(),
+        columns=None, cacheSize=lazy.LAZY_BIN_DATA_CACHE_SIZE ):
+    '''Get minute-by-minute data for the given stock during the date range, decoding
+each day only when it is accessed.
+
+Parameters
+----------
+secId : str
+    Security ID of the stock;
+startDate : datetime.date
+    Start date of the bin data required inclusively,
+endDate : datetime.date
+    End date of the bin data required inclusively;
+columns : list of str or None
+    columns to decode, None for all;
+cacheSize : int
+    maximum number of decoded days kept in memory.
+
+Returns
+-------
+binData : lazy.LazyBinData
+    Requested bin data keyed by date.
+
+Exceptions
+----------
+    raise Exception when duplicated records found on the given stock name.
+    '''
+    # Get authenticated MongoDB connection
+    username, password = MONGODB_CRED
+    db = mongodb.getAuthenticatedConnection( MONGODB_URL, MONGODB_PORT,
+        username, password, 'binData' )
+
+    documents = base.getBinDataDocuments( db.stocks, secId, startDate, endDate )
+
+    return lazy.LazyBinData( documents, columns=columns, cacheSize=cacheSize )
+
+
 class BinDataSource( base.BinDataSource ):
     '''Get stocks bin data from the database.
     '''
@@ -316,17 +498,74 @@ class WindDataSource( object ):
     '''Get data from Wind.
     '''
 
-    def __init__( self ):
+    def __init__( self, compact=False ):
         '''Initialize a WindDataSource object.
+
+Parameters
+----------
+compact : bool
+    whether to return the daily data and fundamentals with compact dtypes, i.e.
+    categorical security codes, int32 dates and float32 where precise enough, see
+    `data.api.base.compactFrame`.
         '''
         username, password = MYSQL_WIND_CRED
         dbname = 'wind'
         self.conn = mysql.getAuthenticatedConnection( MYSQL_WIND_URL, MYSQL_WIND_PORT,
                 username, password, dbname, encoding='gbk' )
+        # sizes the batched reads
+        self.planner = planner.ChunkPlanner()
+        self.compact = compact
+
+
+    def _compact( self, df ):
+        '''Convert the results to compact dtypes if enabled.
+
+Parameters
+----------
+df : pandas.DataFrame
+    results read from Wind.
+
+Returns
+-------
+df : pandas.DataFrame
+    results with compact dtypes, or as they are.
+        '''
+        if not self.compact:
+            return df
+
+        return base.compactFrame( df, idColumns=WIND_ID_COLUMNS, dateColumns=WIND_DATE_COLUMNS )
+
+
+    def _readChunks( self, queries ):
+        '''Run the chunked queries concurrently on the shared MySQL executor.
+
+Parameters
+----------
+queries : list of tuple
+    ( statement, parameters ) of each chunk.
+
+Returns
+-------
+df : pandas.DataFrame
+    results concatenated in the order of the queries.
+        '''
+        def readSql( query ):
+            startTime = time.time()
+            df = pd.read_sql( query[ 0 ], self.conn, params=query[ 1 ] )
+            self.planner.observe( len( df ), time.time() - startTime )
+
+            return df
+
+        if len( queries ) > 1:
+            dfs = list( mysql.getExecutor().map( readSql, queries ) )
+        else:
+            dfs = [ readSql( query ) for query in queries ]
+
+        return pd.concat( dfs )
 
 
     def getStockDailyData( self, secId=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get daily data for the given instrument in the specified date range.
 
 Parameters
@@ -336,7 +575,9 @@ secId : str
 startDate : str
     start date of the data in the format %Y%m%d;
 endDate : str
-    end date of the data in the format %Y%m%d.
+    end date of the data in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -348,14 +589,14 @@ Exceptions
     raise Exception when error occurs reading the daily data.
         '''
         tableName = 'ashareeodprices'
-        sql = mysql.buildSql( tableName, secId, startDate, endDate )
-        df  = pd.read_sql( sql, self.conn )
+        sql, params = mysql.buildSql( tableName, secId, startDate, endDate, dataColumns=fields )
+        df  = pd.read_sql( sql, self.conn, params=params )
 
-        return df
+        return self._compact( df )
 
 
     def getIndexDailyData( self, secId=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get daily data for the given index in the specified date range.
 
 Parameters
@@ -365,7 +606,9 @@ secId : str
 startDate : str
     start date of the data in the format %Y%m%d;
 endDate : str
-    end date of the data in the format %Y%m%d.
+    end date of the data in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -377,14 +620,15 @@ Exceptions
     raise Exception when error occurs reading the daily data.
         '''
         tableName = 'aindexeodprices'
-        sql = mysql.buildSql( tableName, secId, startDate, endDate )
-        df  = pd.read_sql( sql, self.conn )
+        sql, params = mysql.buildSql( tableName, secId, startDate, endDate, dataColumns=fields )
+        df  = pd.read_sql( sql, self.conn, params=params )
 
-        return df
+        return self._compact( df )
 
 
     def getFundamentals( self, tableName, secIds=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), dateColName='REPORT_PERIOD' ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), dateColName='REPORT_PERIOD',
+            fields=None ):
         '''Get fundamentals for the given stocks in the specific date range.
 
 Parameters
@@ -399,7 +643,9 @@ startDate : str
 endDate : str
     end date of the data in the format %Y%m%d;
 dateColName : str
-    the name of the date column.
+    the name of the date column;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -412,28 +658,23 @@ Exceptions
     raise Exception when error occurs reading the data.
         '''
         if secIds is None:
-            sql = mysql.buildSql( tableName, secIds, startDate, endDate,
-                    dateColumn=dateColName )
-            df  = pd.read_sql( sql, self.conn )
+            sql, params = mysql.buildSql( tableName, secIds, startDate, endDate,
+                    dateColumn=dateColName, dataColumns=fields )
+            df  = pd.read_sql( sql, self.conn, params=params )
         else:
-            dfs   = []
-            # batch the query 100 per query
-            step  = 100
-            index = 0
-            total = len( secIds )
-            while index < total:
-                sql = mysql.buildSqlWithSecIds( tableName,
-                        secIds[ index : index + step ], startDate=startDate,
-                        endDate=endDate, dateColumn=dateColName )
-                dfs.append( pd.read_sql( sql, self.conn ) )
-                index += step
-
-            df = pd.concat( dfs )
+            # reported quarterly
+            queries = [ mysql.buildSqlWithSecIds( tableName, chunk, startDate=windowStart,
+                            endDate=windowEnd, dateColumn=dateColName, dataColumns=fields )
+                        for chunk, windowStart, windowEnd in self.planner.plan( secIds,
+                            startDate, endDate, density=planner.QUARTERLY_DENSITY ) ]
 
-        return df
+            df = self._readChunks( queries )
 
+        return self._compact( df )
 
-    def getDailyDataOnDate( self, secIds, dataDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+
+    def getDailyDataOnDate( self, secIds, dataDate=dt.date.today().strftime( WIND_DATE_FORMAT ),
+            fields=None ):
         '''Get daily data for all instruments on the given date.
 
 Parameters
@@ -441,7 +682,9 @@ Parameters
 secIds : list of str
     All instruments to read;
 dataDate : str
-    data date in the format %Y%m%d.
+    data date in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -449,17 +692,11 @@ dailyData : pandas.DataFrame
     daily data for the specific trading date.
         '''
         tableName = 'ashareeodprices'
-        dfs   = []
-        step  = 100
-        index = 0
-        total = len( secIds )
-        while index < total:
-            sql = mysql.buildSqlWithSecIds( tableName, secIds[ index : index + step ],
-                    startDate=dataDate, endDate=dataDate )
-            dfs.append( pd.read_sql( sql, self.conn ) )
-            index += step
-
-        df = pd.concat( dfs ).drop_duplicates( [ 'S_INFO_WINDCODE' ] )
+        queries   = [ mysql.buildSqlWithSecIds( tableName, chunk, startDate=windowStart,
+                          endDate=windowEnd, dataColumns=fields )
+                      for chunk, windowStart, windowEnd in self.planner.plan( secIds, dataDate, dataDate ) ]
+
+        df = self._compact( self._readChunks( queries ).drop_duplicates( [ 'S_INFO_WINDCODE' ] ) )
         # sort by securities identifier
         df.set_index( [ 'S_INFO_WINDCODE' ], inplace=True )
 
@@ -490,24 +727,18 @@ pivot : pandas.DataFrame
 2. data date, sorted by date ascendingly;
 3. sec id.
         '''
-        dfs   = []
-        step  = 100
-        index = 0
-        total = len( secIds )
-        while index < total:
-            sql = mysql.buildSqlWithSecIds( tableName, secIds[ index : index + step ],
-                    startDate=startDate, endDate=endDate, dataColumns=fields )
-            dfs.append( pd.read_sql( sql, self.conn ) )
-            index += step
-
-        df = pd.concat( dfs ).drop_duplicates( [ 'TRADE_DT', 'S_INFO_WINDCODE' ] )
+        queries = [ mysql.buildSqlWithSecIds( tableName, chunk, startDate=windowStart,
+                        endDate=windowEnd, dataColumns=fields )
+                    for chunk, windowStart, windowEnd in self.planner.plan( secIds, startDate, endDate ) ]
+
+        df = self._compact( self._readChunks( queries ).drop_duplicates( [ 'TRADE_DT', 'S_INFO_WINDCODE' ] ) )
         df.sort_values( 'TRADE_DT', inplace=True, ascending=True )
 
-        return df.pivot( 'TRADE_DT', 'S_INFO_WINDCODE' )
+        return df.pivot( index='TRADE_DT', columns='S_INFO_WINDCODE' )
 
 
     def getDividendInformation( self, secId=None, startDate=DEFAULT_START_DATE, endDate=dt.date.today(),
-            realizedOnly=True ):
+            realizedOnly=True, fields=None ):
         '''Get dividend information from Wind database.
 
 Parameters
@@ -517,7 +748,11 @@ secId : str
 startDate : datetime.date
     start date of the dividend data;
 endDate : datetime.date
-    end date of the dividend data.
+    end date of the dividend data;
+realizedOnly : bool
+    whether to keep the realized ones only;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -525,18 +760,19 @@ dividendInfo : pandas.DataFrame
     All dividend info in pandas DataFrame.
         '''
         tableName = 'asharedividend'
-        sql = mysql.buildSql( tableName, secId, startDate, endDate, dateColumn='EX_DT' )
-        if realizedOnly:
-            # modify the SQL to constraint the row range.
-            sql += " AND S_DIV_PROGRESS='3'"
+        # constraint the row range to the realized ones
+        conditions  = { 'S_DIV_PROGRESS': '3' } if realizedOnly else None
+        sql, params = mysql.buildSql( tableName, secId, startDate.strftime( WIND_DATE_FORMAT ),
+                endDate.strftime( WIND_DATE_FORMAT ), dateColumn='EX_DT',
+                dataColumns=fields, conditions=conditions )
 
-        df = pd.read_sql( sql, self.conn )
+        df = pd.read_sql( sql, self.conn, params=params )
 
         return df
 
 
     def getRightIssueInformation( self, secId=None, startDate=DEFAULT_START_DATE, endDate=dt.date.today(),
-            realizedOnly=True ):
+            realizedOnly=True, fields=None ):
         '''Get dividend information from Wind database.
 
 Parameters
@@ -546,7 +782,11 @@ secId : str
 startDate : datetime.date
     start date of the dividend data;
 endDate : datetime.date
-    end date of the dividend data.
+    end date of the dividend data;
+realizedOnly : bool
+    whether to keep the realized ones only;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -554,12 +794,13 @@ dividendInfo : pandas.DataFrame
     All dividend info in pandas DataFrame.
         '''
         tableName = 'asharerightissue'
-        sql = mysql.buildSql( tableName, secId, startDate, endDate, dateColumn='S_RIGHTSISSUE_EXDIVIDENDDATE' )
-        if realizedOnly:
-            # modify the SQL to constraint the row range.
-            sql += " AND S_RIGHTSISSUE_PROGRESS='3'"
+        # constraint the row range to the realized ones
+        conditions  = { 'S_RIGHTSISSUE_PROGRESS': '3' } if realizedOnly else None
+        sql, params = mysql.buildSql( tableName, secId, startDate.strftime( WIND_DATE_FORMAT ),
+                endDate.strftime( WIND_DATE_FORMAT ), dateColumn='S_RIGHTSISSUE_EXDIVIDENDDATE',
+                dataColumns=fields, conditions=conditions )
 
-        df = pd.read_sql( sql, self.conn )
+        df = pd.read_sql( sql, self.conn, params=params )
 
         return df
 
@@ -580,9 +821,9 @@ Returns
 businessDates : pandas.Series
     All business dates during the date range.
         '''
-        sql = "SELECT * FROM asharecalendar WHERE TRADE_DAYS >= '{sd:s}' AND TRADE_DAYS <= '{ed:s}'".format(
-                sd=startDate, ed=endDate )
-        df  = pd.read_sql( sql, self.conn )
+        sql    = mysql.compileSql( 'SELECT S_INFO_EXCHMARKET, TRADE_DAYS FROM asharecalendar WHERE TRADE_DAYS >= :startDate AND TRADE_DAYS <= :endDate' )
+        params = { 'startDate': startDate, 'endDate': endDate }
+        df  = pd.read_sql( sql, self.conn, params=params )
 
         # since 2012-01-04, Shanghai stock exchange and Shenzhen stock exchange share the
         # same trading calendar.
@@ -590,7 +831,7 @@ businessDates : pandas.Series
 
 
     def getDelistedStocks( self, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get delisted stocks from the given start date to now.
 
 Parameters
@@ -598,19 +839,28 @@ Parameters
 startDate : str
     Start date of the business date range in the format %Y%m%d;
 endDate : datetime.date
-    end date of the business dates range in the format %Y%m%d.
+    end date of the business dates range in the format %Y%m%d;
+fields : list of str or None
+    columns of asharedescription to read besides the stock code and the delisting
+    date, None for the delisting date only.
 
 Returns
 -------
-delistedStocks : pandas.Series
-    delisted stocks in a pandas Series with S_INFO_DELISTDATE indexed by stock codes.
+delistedStocks : pandas.Series or pandas.DataFrame
+    delisted stocks in a pandas Series with S_INFO_DELISTDATE indexed by stock codes,
+    or a DataFrame with the delisting date and the fields when fields are given.
         '''
-        sql = "SELECT S_INFO_WINDCODE, S_INFO_DELISTDATE FROM asharedescription WHERE S_INFO_DELISTDATE >= '{sd:s}' AND S_INFO_DELISTDATE <= '{ed:s}'".format( sd=startDate, ed=endDate )
-        df  = pd.read_sql( sql, self.conn )
-        delistedStocks = df.S_INFO_DELISTDATE
-        delistedStocks.index = df.S_INFO_WINDCODE
+        columns = mysql.getSelectColumns( [ 'S_INFO_WINDCODE', 'S_INFO_DELISTDATE' ], fields or [] )
+        sql     = mysql.compileSql( 'SELECT {c:s} FROM asharedescription WHERE S_INFO_DELISTDATE >= :startDate AND S_INFO_DELISTDATE <= :endDate'.format(
+                c=columns ) )
+        params  = { 'startDate': startDate, 'endDate': endDate }
+        df  = pd.read_sql( sql, self.conn, params=params )
+        df.index = df.S_INFO_WINDCODE
+
+        if fields is None:
+            return df.S_INFO_DELISTDATE
 
-        return delistedStocks
+        return df.drop( 'S_INFO_WINDCODE', axis=1 )
 
 
     def getSuspensionDates( self, startDate=WIND_DEFAULT_START_DATE,
@@ -629,9 +879,9 @@ Returns
 df : pandas.DataFrame
     All suspending dates during the date range.
         '''
-        sql = "SELECT S_INFO_WINDCODE, S_DQ_SUSPENDDATE FROM asharetradingsuspension WHERE S_DQ_SUSPENDDATE >= '{sd:s}' AND S_DQ_SUSPENDDATE <= '{ed:s}'".format(
-                sd=startDate, ed=endDate )
-        df  = pd.read_sql( sql, self.conn )
+        sql    = mysql.compileSql( 'SELECT S_INFO_WINDCODE, S_DQ_SUSPENDDATE FROM asharetradingsuspension WHERE S_DQ_SUSPENDDATE >= :startDate AND S_DQ_SUSPENDDATE <= :endDate' )
+        params = { 'startDate': startDate, 'endDate': endDate }
+        df  = pd.read_sql( sql, self.conn, params=params )
 
         return df
 
@@ -640,7 +890,9 @@ class CachedWindSource( WindDataSource ):
     '''In memory Wind source, which loads the necessary Wind data in batch and stores in memory.
     '''
 
-    def __init__( self, secIds, startDate, endDate ):
+    def __init__( self, secIds, startDate, endDate, snapshotDir=None, windowDays=None,
+            lookbackDays=CACHED_WIND_LOOKBACK_DAYS, compact=False, memoryBudget=None,
+            onBudgetExceeded=BUDGET_RAISE ):
         '''Initialize a in-memory data source.
 
 Parameters
@@ -650,9 +902,37 @@ secIds : list of str
 startDate : str
     backtest start date in the format %Y%m%d;
 endDate : str
-    backtest end date in the format %Y%m%d.
+    backtest end date in the format %Y%m%d;
+snapshotDir : str or None
+    directory of the on-disk snapshots of the loaded data, see `data.api.snapshot`;
+    if given, the dates already in an up-to-date snapshot of the same securities
+    are not read from MySQL again;
+windowDays : int or None
+    if given, only chunks of windowDays calendar days around the requested dates are
+    kept in memory instead of the whole backtest, the next chunk being prefetched in
+    the background;
+lookbackDays : int
+    calendar days kept in memory before the latest requested date in the windowed mode;
+compact : bool
+    whether to keep the data with compact dtypes, see `WindDataSource`;
+memoryBudget : int or None
+    bytes the loaded data may take in memory, see `getMemoryUsage`, None for no limit;
+onBudgetExceeded : str
+    BUDGET_RAISE to raise beyond the budget, BUDGET_SPILL to move the data to
+    memory-mapped files, under snapshotDir if given, keeping the indexes in memory.
+
+Exceptions
+----------
+    raise Exception when the data exceeds the memory budget with BUDGET_RAISE, or when
+    spilling is asked in the windowed mode.
         '''
-        super( CachedWindSource, self ).__init__()
+        super( CachedWindSource, self ).__init__( compact=compact )
+
+        if windowDays is not None and memoryBudget is not None and onBudgetExceeded == BUDGET_SPILL:
+            raise Exception( 'Cannot spill a windowed CachedWindSource.' )
+        self.memoryBudget     = memoryBudget
+        self.onBudgetExceeded = onBudgetExceeded
+        self.spillDir         = snapshotDir
 
         # calculate data start date and end date based on the backtest date
         stockCalendar = uc.AShareTradingCalendar( self,
@@ -667,27 +947,288 @@ endDate : str
         except Exception:
             dataEndDate   = endDate
 
-        # load all data into memory
-        dfs   = []
-        step  = 100
-        index = 0
-        total = len( secIds )
-        tableName = 'ashareeodprices'
-        while index < total:
-            sql = mysql.buildSqlWithSecIds( tableName, secIds[ index : index + step ],
-                    startDate=dataStartDate, endDate=dataEndDate )
-            df = pd.read_sql( sql, self.conn )
-            dfs.append( df )
-            index += step
-
-        df = pd.concat( dfs )
-        df.sort_values( 'TRADE_DT', inplace=True, ascending=True )
+        self.secIds    = secIds
+        self.tableName = 'ashareeodprices'
+        self.store     = None if snapshotDir is None else snapshot.SnapshotStore( snapshotDir )
+        self._loadLock = threading.Lock()
+        # modification watermark of the rows concerned, checked against the snapshots
+        self.watermark = None if self.store is None else \
+                self._getWatermark( dataStartDate, dataEndDate )
+
+        if windowDays is None:
+            # load all data into memory
+            self.window = None
+            self.block  = self._buildBlock( self._loadRange( dataStartDate, dataEndDate ) )
+        else:
+            self.window = blocks.SlidingWindow( self._loadRange, self._buildBlock, dataStartDate,
+                    dataEndDate, windowDays, lookbackDays )
+            self.block  = self.window.ensure( startDate, startDate )
+        self.data = self.block.data
+
+
+    def _buildBlock( self, data ):
+        '''Build the block of the loaded rows within the memory budget.
+
+Parameters
+----------
+data : pandas.DataFrame
+    rows loaded.
+
+Returns
+-------
+block : blocks.DailyDataBlock
+    block of the rows, over memory-mapped files if spilled.
+
+Exceptions
+----------
+    raise Exception when the data exceeds the memory budget with BUDGET_RAISE.
+        '''
+        block = blocks.DailyDataBlock( self._compact( data ) )
+        if self.memoryBudget is None:
+            return block
+
+        # the field matrices built later are checked against the same budget
+        block.setBudget( self.memoryBudget, self.onBudgetExceeded, self.spillDir )
+        memoryUsage = block.getMemoryUsage()
+        if memoryUsage <= self.memoryBudget:
+            return block
+        if self.onBudgetExceeded != BUDGET_SPILL:
+            raise Exception( 'Daily data takes {m:d} bytes, beyond the memory budget of {b:d} bytes.'.format(
+                    m=memoryUsage, b=self.memoryBudget ) )
+
+        # the mapped files remain readable once the directory is removed
+        path = shared.createSharedDirectory( root=self.spillDir )
+        try:
+            snapshot.writeFrame( os.path.join( path, 'data' ), block.data, {} )
+            data = snapshot.readFrame( os.path.join( path, 'data' ), categorical=True )
+        finally:
+            shared.releaseSharedDirectory( path )
+
+        block = blocks.DailyDataBlock( data, isSorted=True )
+        block.setBudget( self.memoryBudget, self.onBudgetExceeded, self.spillDir )
+
+        return block
+
+
+    def getMemoryUsage( self ):
+        '''Get the memory taken by the loaded data, mapped files included.
+
+Returns
+-------
+nBytes : int
+    memory usage in bytes.
+        '''
+        return self.block.getMemoryUsage()
+
+
+    def share( self, fields=None, directory=None ):
+        '''Place the loaded data into memory-mapped files shared with other processes.
+The workers of a parameter sweep then call `attach` with the returned handle instead
+of loading their own copy. This source reads the shared copy afterwards as well.
+
+Parameters
+----------
+fields : list of str or None
+    numeric fields whose date x security matrices are shared, None for all numeric
+    fields; the matrices of other fields are built by each process on first use;
+directory : str or None
+    shared directory, by default a new one under /dev/shm if available.
+
+Returns
+-------
+handle : dict
+    picklable handle to pass to `attach`.
+
+Exceptions
+----------
+    raise Exception in the windowed mode, whose data changes as the window moves.
+        '''
+        if self.window is not None:
+            raise Exception( 'Cannot share a windowed CachedWindSource.' )
+
+        path   = shared.createSharedDirectory() if directory is None else directory
+        handle = self.block.share( path, fields )
+        # the block keeps its own security axis under secIds
+        shared.shareArrays( path, { 'sourceSecIds': blocks.toSharedLabels( self.secIds ) } )
+        handle.update( tableName=self.tableName )
+
+        self._sharedPath = path
+        self.block = blocks.DailyDataBlock.attach( handle )
+        self.data  = self.block.data
 
-        self.data = df
+        return handle
+
+
+    @classmethod
+    def attach( cls, handle ):
+        '''Create a source over the data shared by `share` in another process.
+
+Parameters
+----------
+handle : dict
+    handle returned by `share`.
+
+Returns
+-------
+source : CachedWindSource
+    source with the same API reading the shared data.
+        '''
+        source = cls.__new__( cls )
+        WindDataSource.__init__( source )
+
+        sourceSecIds     = shared.attachArrays( handle[ 'path' ], [ 'sourceSecIds' ] )
+        source.secIds    = sourceSecIds[ 'sourceSecIds' ].tolist()
+        source.tableName = handle[ 'tableName' ]
+        source.store     = None
+        source.window    = None
+        source._loadLock = threading.Lock()
+        source.block     = blocks.DailyDataBlock.attach( handle )
+        source.data      = source.block.data
+
+        return source
+
+
+    def releaseShared( self ):
+        '''Remove the shared files created by `share`, once the workers are done.
+        '''
+        path = getattr( self, '_sharedPath', None )
+        if path is not None:
+            shared.releaseSharedDirectory( path )
+            self._sharedPath = None
+
+
+    def close( self ):
+        '''Stop the background prefetch of the windowed mode, if any.
+        '''
+        window = getattr( self, 'window', None )
+        if window is not None:
+            window.close()
+
+
+    def __enter__( self ):
+        return self
+
+
+    def __exit__( self, excType, excValue, traceback ):
+        self.close()
+        self.releaseShared()
+
+
+    def _loadRange( self, startDate, endDate ):
+        '''Load the data of the securities in the date range, through the snapshot if any.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively.
+
+Returns
+-------
+data : pandas.DataFrame
+    rows of the securities in the date range.
+        '''
+        if self.store is None:
+            return self._readWindow( self.tableName, self.secIds, startDate, endDate )
+
+        # the prefetch thread shares the snapshot
+        with self._loadLock:
+            watermark = self.watermark
+            data, missing = self.store.load( self.tableName, self.secIds, startDate, endDate, watermark )
+            if len( missing ) > 0:
+                dfs = [ self._readWindow( self.tableName, self.secIds, windowStart, windowEnd )
+                        for windowStart, windowEnd in missing ]
+                try:
+                    for ( windowStart, windowEnd ), df in zip( missing, dfs ):
+                        self.store.update( self.tableName, self.secIds, df, windowStart, windowEnd, watermark )
+                except OSError:
+                    # the snapshot is a cache, the rows read are used all the same
+                    pass
+                data = pd.concat( ( [] if data is None else [ data ] ) + dfs, ignore_index=True )
+
+        return data
+
+
+    def _getBlock( self, startDate, endDate ):
+        '''Get the block holding the requested dates, moving the window in the windowed mode.
+
+Parameters
+----------
+startDate : str
+    start date of the request in the format %Y%m%d;
+endDate : str
+    end date of the request in the format %Y%m%d.
+
+Returns
+-------
+block : blocks.DailyDataBlock
+    data block to select from.
+        '''
+        if self.window is not None:
+            self.block = self.window.ensure( startDate, endDate )
+            self.data  = self.block.data
+
+        return self.block
+
+
+    def _readWindow( self, tableName, secIds, startDate, endDate ):
+        '''Read the data of the securities in the date range in planned chunks.
+
+Parameters
+----------
+tableName : str
+    name of the Wind table;
+secIds : list of str
+    Wind stock codes;
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively.
+
+Returns
+-------
+data : pandas.DataFrame
+    rows of the securities in the date range.
+        '''
+        queries = [ mysql.buildSqlWithSecIds( tableName, chunk, startDate=windowStart,
+                        endDate=windowEnd )
+                    for chunk, windowStart, windowEnd in self.planner.plan( secIds,
+                        startDate, endDate ) ]
+
+        return self._readChunks( queries )
+
+
+    def _getWatermark( self, startDate, endDate ):
+        '''Get the watermark of the securities in the date range, the latest OPDATE of
+their rows.
+
+Parameters
+----------
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively.
+
+Returns
+-------
+watermark : str or None
+    latest modification time of the rows, None without any row.
+        '''
+        watermarks = []
+        maxSecIds  = self.planner.maxSecIds
+        for i in range( 0, len( self.secIds ), maxSecIds ):
+            stmt, params = mysql.buildWatermarkSql( self.tableName, self.secIds[ i : i + maxSecIds ],
+                    startDate, endDate )
+            value = pd.read_sql( stmt, self.conn, params=params ).WATERMARK.iloc[ 0 ]
+            if not pd.isnull( value ):
+                watermarks.append( str( value ) )
+
+        return max( watermarks ) if len( watermarks ) > 0 else None
 
 
     def getStockDailyData( self, secId=None, startDate=WIND_DEFAULT_START_DATE,
-            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+            endDate=dt.date.today().strftime( WIND_DATE_FORMAT ), fields=None ):
         '''Get daily data for the given instrument in the specified date range.
 
 Parameters
@@ -697,7 +1238,9 @@ secId : str
 startDate : str
     start date of the data in the format %Y%m%d inclusively;
 endDate : str
-    end date of the data in the format %Y%m%d inclusively.
+    end date of the data in the format %Y%m%d inclusively;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
@@ -708,15 +1251,15 @@ Exceptions
 ----------
     raise Exception when error occurs reading the daily data.
         '''
-        dataFilter = ( self.data.TRADE_DT >= startDate ) & ( self.data.TRADE_DT <= endDate )
-        dailyData  = self.data[ dataFilter ]
-        if secId is not None:
-            dailyData = dailyData[ dailyData.S_INFO_WINDCODE == secId ]
+        dailyData = self._getBlock( startDate, endDate ).select( startDate, endDate,
+                secIds=None if secId is None else [ secId ],
+                columns=mysql.getProjection( [ 'S_INFO_WINDCODE', 'TRADE_DT' ], fields ) )
 
         return dailyData
 
 
-    def getDailyDataOnDate( self, secIds, dataDate=dt.date.today().strftime( WIND_DATE_FORMAT ) ):
+    def getDailyDataOnDate( self, secIds, dataDate=dt.date.today().strftime( WIND_DATE_FORMAT ),
+            fields=None ):
         '''Get daily data for all instruments on the given date.
 
 Parameters
@@ -724,19 +1267,25 @@ Parameters
 secIds : list of str
     All instruments to read;
 dataDate : str
-    data date in the format %Y%m%d.
+    data date in the format %Y%m%d;
+fields : list of str or None
+    data columns to read besides the stock code and the date, None for all.
 
 Returns
 -------
 dailyData : pandas.DataFrame
     daily data for the specific trading date.
         '''
-        dataFilter = self.data.S_INFO_WINDCODE.isin( secIds ) & \
-                ( self.data.TRADE_DT == dataDate )
-
-        df = self.data[ dataFilter ]
+        block = self._getBlock( dataDate, dataDate )
+        if fields is not None and all( block.hasMatrix( f ) for f in fields
+                if f not in ( 'S_INFO_WINDCODE', 'TRADE_DT' ) ):
+            return block.onDate( dataDate, secIds, [ f for f in fields
+                if f != 'S_INFO_WINDCODE' ] )
+
+        df = block.select( dataDate, dataDate, secIds=secIds,
+                columns=mysql.getProjection( [ 'S_INFO_WINDCODE', 'TRADE_DT' ], fields ) )
         # sort by securities identifier
-        df.set_index( [ 'S_INFO_WINDCODE' ], inplace=True )
+        df = df.set_index( [ 'S_INFO_WINDCODE' ] )
 
         return df
 
@@ -760,13 +1309,15 @@ tableName : str
 Returns
 -------
 data : pandas.DataFrame.pivot
-    requested data in pivoted DataFrame.
+    requested data in pivoted DataFrame. Numeric fields are backed by read-only
+    matrices shared across calls, copy the frame before modifying it in place.
         '''
-        dataWithField = self.data[ fields + [ 'S_INFO_WINDCODE', 'TRADE_DT' ] ]
-        dataFilter    = ( dataWithField.TRADE_DT >= startDate ) & \
-                ( dataWithField.TRADE_DT <= endDate )
+        # numeric fields are served from the pre-pivoted matrices
+        block = self._getBlock( startDate, endDate )
+        if all( block.hasMatrix( f ) for f in fields ):
+            return block.pivot( startDate, endDate, secIds, fields )
 
-        dataWithField = dataWithField[ dataFilter ]
-        dataWithField = dataWithField[ dataWithField.S_INFO_WINDCODE.isin( secIds ) ]
+        dataWithField = block.select( startDate, endDate, secIds=secIds,
+                columns=fields + [ 'S_INFO_WINDCODE', 'TRADE_DT' ] )
 
-        return dataWithField.pivot( 'TRADE_DT', 'S_INFO_WINDCODE' )
+        return dataWithField.pivot( index='TRADE_DT', columns='S_INFO_WINDCODE' )
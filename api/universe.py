@@ -202,9 +202,8 @@ raise Exception when the given short name is not recognized.
             conn = mDriver.getAuthenticatedConnection( mConfig.MYSQL_WIND_URL,
                     mConfig.MYSQL_WIND_PORT, username, password, dbname )
 
-            sql  = "SELECT * FROM aindexhs300freeweight WHERE S_INFO_WINDCODE='{ic:s}'".format(
-                    ic=indexCode )
-            self.indexWeights  = pd.read_sql( sql, conn )
+            sql  = mDriver.compileSql( 'SELECT * FROM aindexhs300freeweight WHERE S_INFO_WINDCODE=:indexCode' )
+            self.indexWeights  = pd.read_sql( sql, conn, params={ 'indexCode': indexCode } )
             self.tradeDates    = self.indexWeights.TRADE_DT.sort_values().unique()
             self.wholeUniverse = set( self.indexWeights.S_CON_WINDCODE )
         else:
@@ -33,9 +33,42 @@ ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
+# built-in modules
+import os
+
 DATAYES_API_URL = 'http://api.wmcloud.com/data'
 DATAYES_VERSION = 'v1'
 DATAYES_TOKEN   = YOUR_DATAYES_TOKEN
 
 # API request status code
 DATAYES_STATUS_OK = 200
+
+# HTTP connection pool and ( connect, read ) timeouts in seconds
+DATAYES_POOL_SIZE = 16
+DATAYES_TIMEOUT   = ( 10, 60 )
+
+# number of requests in flight for the bulk fetches
+DATAYES_MAX_CONCURRENCY = 8
+
+# request rate limit shared by all threads, and by all processes using the same lock
+# file; None for no limit
+DATAYES_RATE_LIMIT     = 10
+DATAYES_RATE_BURST     = 20
+DATAYES_RATE_LOCK_FILE = None
+
+# retry with exponential backoff on throttled or failed requests
+DATAYES_MAX_RETRIES  = 5
+DATAYES_BACKOFF_BASE = 0.5
+DATAYES_BACKOFF_CAP  = 30
+# longest Retry-After honored, in seconds
+DATAYES_RETRY_AFTER_CAP = 300
+
+# directory of the on-disk response cache; None to disable the cache by default
+DATAYES_CACHE_DIR = None
+
+# store of the requests known to return empty data used by the backfill jobs, and the
+# number of recent days whose empty results are retried; the daily update jobs only
+# request the current date, always retried, so they do not use the store
+DATAYES_EMPTY_RESULT_DB     = os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ),
+                                            'db', 'datayes-empty.db' )
+DATAYES_EMPTY_RESULT_EXPIRY = 7
@@ -37,3 +37,14 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 MONGODB_URL  = YOUR_MONGODB_URL
 MONGODB_PORT = YOUR_MONGODB_PORT
 MONGODB_CRED = YOUR_MONGODB_CRED_IN_USERNAME_PASSWORD_TUPLE
+
+# connection pool of the process-wide MongoDB clients
+MONGODB_MAX_POOL_SIZE = 100
+MONGODB_MIN_POOL_SIZE = 0
+MONGODB_CONNECT_TIMEOUT_MS          = 20000
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = 30000
+MONGODB_SOCKET_TIMEOUT_MS           = None
+
+# compression of the columnar dailyData/binData records, zlib or zstd; zstd needs the
+# zstandard package on every host reading the records
+MONGODB_RECORD_COMPRESSION = 'zlib'
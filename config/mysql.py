@@ -43,3 +43,23 @@ MYSQL_WIND_CRED = YOUR_MYSQL_CREDENTIAL_TO_WIND_DATABASE_IN_USERNAME_PASSWORD_TU
 MYSQL_TICK_URL  = YOUR_MYSQL_URL_TO_TICK_DATABASE
 MYSQL_TICK_PORT = YOUR_MYSQL_PORT_TO_TICK_DATABASE
 MYSQL_TICK_CRED = YOUR_MYSQL_CREDENTIAL_TO_TICK_DATABASE_IN_USERNAME_PASSWORD_TUPLE
+
+# connection pool of the shared SQLAlchemy engines
+MYSQL_POOL_SIZE     = 5
+MYSQL_MAX_OVERFLOW  = 10
+MYSQL_POOL_PRE_PING = True
+MYSQL_POOL_RECYCLE  = 3600
+
+# number of distinct statement shapes whose SQLAlchemy constructs are cached
+MYSQL_STATEMENT_CACHE_SIZE = 256
+
+# number of chunked queries run concurrently over a shared engine, keep it no more
+# than MYSQL_POOL_SIZE + MYSQL_MAX_OVERFLOW
+MYSQL_QUERY_PARALLELISM = 4
+
+# batched Wind reads are split into queries of about MYSQL_ROWS_PER_QUERY rows with
+# at most MYSQL_MAX_IN_LIST securities; with MYSQL_TARGET_QUERY_SECONDS set, the
+# rows per query also follow the observed throughput
+MYSQL_ROWS_PER_QUERY       = 50000
+MYSQL_MAX_IN_LIST          = 1000
+MYSQL_TARGET_QUERY_SECONDS = None
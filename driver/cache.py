@@ -0,0 +1,225 @@
+'''This script implements a content-addressed on-disk cache of the Datayes
+responses keyed by the API URL and the request parameters.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import datetime as dt
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# third-party modules
+
+# customized modules
+
+# request parameters looking like a date in the format %Y%m%d
+DATE_PATTERN = re.compile( '^[0-9]{8}$' )
+
+# time-to-live in seconds of the responses without any date in the request
+DEFAULT_TTL = 24 * 3600
+# time-to-live in seconds of the responses covering today or later
+TODAY_TTL   = 300
+
+
+class ResponseCache( object ):
+    '''On-disk cache of the Datayes responses. Bodies are stored gzip compressed under
+the SHA-1 of the API URL and the parameters. Responses fetched after all their
+dates had passed never expire, the ones fetched while covering today expire quickly.
+    '''
+
+    def __init__( self, cacheDir, ttl=DEFAULT_TTL, todayTtl=TODAY_TTL ):
+        '''Initialize a response cache.
+
+Parameters
+----------
+cacheDir : str
+    directory of the cache files;
+ttl : float or None
+    time-to-live in seconds of the responses without any date in the request, None
+    for never expire;
+todayTtl : float
+    time-to-live in seconds of the responses covering today or later.
+        '''
+        super( ResponseCache, self ).__init__()
+
+        self.cacheDir = cacheDir
+        self.ttl      = ttl
+        self.todayTtl = todayTtl
+
+        self._lock   = threading.Lock()
+        self.nHits   = 0
+        self.nMisses = 0
+        self.nStores = 0
+
+
+    def getKey( self, apiUrl, params ):
+        '''Get the cache key of the request.
+
+Parameters
+----------
+apiUrl : str
+    API to Datayes;
+params : dict
+    parameters to feed the API.
+
+Returns
+-------
+key : str
+    hex digest identifying the request.
+        '''
+        content = json.dumps( [ apiUrl, params ], sort_keys=True, default=str )
+
+        return hashlib.sha1( content.encode( 'utf-8' ) ).hexdigest()
+
+
+    def getTtl( self, params, fetchedAt ):
+        '''Get the time-to-live of the response to the request.
+
+Parameters
+----------
+params : dict
+    parameters to feed the API;
+fetchedAt : float
+    timestamp when the response was fetched.
+
+Returns
+-------
+ttl : float or None
+    time-to-live in seconds or None if the response never expires.
+        '''
+        dates = [ str( v ) for v in params.values() if DATE_PATTERN.match( str( v ) ) ]
+        if len( dates ) == 0:
+            ttl = self.ttl
+        elif max( dates ) < dt.date.fromtimestamp( fetchedAt ).strftime( '%Y%m%d' ):
+            # the data of dates already passed when fetched is immutable
+            ttl = None
+        else:
+            ttl = self.todayTtl
+
+        return ttl
+
+
+    def _getPath( self, key ):
+        '''Get the cache file path of the key.
+
+Parameters
+----------
+key : str
+    cache key.
+
+Returns
+-------
+path : str
+    path of the cache file.
+        '''
+        return os.path.join( self.cacheDir, key[ : 2 ], key + '.csv.gz' )
+
+
+    def get( self, apiUrl, params ):
+        '''Get the cached response body of the request.
+
+Parameters
+----------
+apiUrl : str
+    API to Datayes;
+params : dict
+    parameters to feed the API.
+
+Returns
+-------
+body : str or None
+    cached response body or None if not cached or expired.
+        '''
+        path = self._getPath( self.getKey( apiUrl, params ) )
+        body = None
+        try:
+            fetchedAt = os.path.getmtime( path )
+            ttl       = self.getTtl( params, fetchedAt )
+            if ttl is None or time.time() - fetchedAt <= ttl:
+                with gzip.open( path, 'rt', encoding='utf-8' ) as f:
+                    body = f.read()
+        except ( OSError, EOFError ):
+            body = None
+
+        with self._lock:
+            if body is None:
+                self.nMisses += 1
+            else:
+                self.nHits += 1
+
+        return body
+
+
+    def put( self, apiUrl, params, body ):
+        '''Store the response body of the request.
+
+Parameters
+----------
+apiUrl : str
+    API to Datayes;
+params : dict
+    parameters to feed the API;
+body : str
+    response body.
+        '''
+        path      = self._getPath( self.getKey( apiUrl, params ) )
+        directory = os.path.dirname( path )
+        os.makedirs( directory, exist_ok=True )
+
+        # write to a temporary file first so that readers never see a partial file.
+        fd, tmpPath = tempfile.mkstemp( dir=directory, suffix='.tmp' )
+        try:
+            with os.fdopen( fd, 'wb' ) as f:
+                with gzip.GzipFile( fileobj=f, mode='wb' ) as gz:
+                    gz.write( body.encode( 'utf-8' ) )
+            os.replace( tmpPath, path )
+        except Exception:
+            os.remove( tmpPath )
+            raise
+
+        with self._lock:
+            self.nStores += 1
+
+
+    def getStats( self ):
+        '''Get the cache statistics.
+
+Returns
+-------
+stats : dict
+    `hits`, `misses` and `stores` counters.
+        '''
+        return { 'hits': self.nHits, 'misses': self.nMisses, 'stores': self.nStores }
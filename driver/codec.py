@@ -0,0 +1,349 @@
+'''This script encapsulates the encoding and decoding of the pandas.DataFrame
+stored in the `Data` field of the MongoDB records.
+
+Two record formats are supported
+
+* json -- the legacy `DataFrame.to_json()` string;
+* columnar -- a BSON sub-document holding one typed NumPy buffer per column,
+  optionally compressed.
+
+`decodeFrame` handles both formats transparently.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import io
+import zlib
+
+# third-party modules
+import numpy  as np
+import pandas as pd
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# customized modules
+import data.config.mongodb as mongoConfig
+
+CODEC_JSON     = 'json'
+CODEC_COLUMNAR = 'columnar'
+
+COMPRESSION_ZLIB = 'zlib'
+COMPRESSION_ZSTD = 'zstd'
+
+COLUMNAR_VERSION = 1
+
+DEFAULT_CODEC       = CODEC_COLUMNAR
+DEFAULT_COMPRESSION = mongoConfig.MONGODB_RECORD_COMPRESSION
+
+# column kinds in the columnar format
+KIND_ARRAY    = 'array'
+KIND_CATEGORY = 'category'
+KIND_RANGE    = 'range'
+
+
+def _compress( buf, compression ):
+    '''Compress the given bytes.
+
+Parameters
+----------
+buf : bytes
+    raw bytes to compress;
+compression : str or None
+    compression algorithm, one of zlib, zstd or None for no compression.
+
+Returns
+-------
+compressed : bytes
+    compressed bytes.
+
+Exceptions
+----------
+    raise Exception when the compression algorithm is not supported.
+    '''
+    if compression is None:
+        compressed = buf
+    elif compression == COMPRESSION_ZLIB:
+        compressed = zlib.compress( buf )
+    elif compression == COMPRESSION_ZSTD and zstd is not None:
+        compressed = zstd.ZstdCompressor().compress( buf )
+    else:
+        raise Exception( 'Unsupported compression {c:s}.'.format( c=str( compression ) ) )
+
+    return compressed
+
+
+def _decompress( buf, compression ):
+    '''Decompress the given bytes.
+
+Parameters
+----------
+buf : bytes
+    compressed bytes;
+compression : str or None
+    compression algorithm used, one of zlib, zstd or None for no compression.
+
+Returns
+-------
+decompressed : bytes
+    raw bytes.
+
+Exceptions
+----------
+    raise Exception when the compression algorithm is not supported.
+    '''
+    if compression is None:
+        decompressed = buf
+    elif compression == COMPRESSION_ZLIB:
+        decompressed = zlib.decompress( buf )
+    elif compression == COMPRESSION_ZSTD and zstd is not None:
+        decompressed = zstd.ZstdDecompressor().decompress( buf )
+    else:
+        raise Exception( 'Unsupported compression {c:s}.'.format( c=str( compression ) ) )
+
+    return decompressed
+
+
+def _encodeColumn( name, values, compression ):
+    '''Encode one column into the columnar format.
+
+Parameters
+----------
+name : str
+    name of the column;
+values : pandas.Series or pandas.Index
+    column values;
+compression : str or None
+    compression algorithm.
+
+Returns
+-------
+column : dict
+    encoded column with `Name`, `Kind`, `DType` and `Data`, and `Categories`
+for categorical columns.
+
+Exceptions
+----------
+    raise Exception when the column type is not supported.
+    '''
+    dtype = values.dtype
+    if isinstance( dtype, np.dtype ) and dtype.kind in 'biufcmM':
+        # numeric, boolean, datetime and timedelta columns are stored as is
+        data = np.ascontiguousarray( values.to_numpy() )
+        column = { 'Name': name,
+                   'Kind': KIND_ARRAY,
+                   'DType': data.dtype.str,
+                   'Data': _compress( data.tobytes(), compression ) }
+    else:
+        # strings and other objects are dictionary encoded
+        codes, categories = pd.factorize( values, use_na_sentinel=True )
+        categories = [ c.item() if isinstance( c, np.generic ) else c for c in categories ]
+        for c in categories:
+            if not isinstance( c, ( str, int, float, bool ) ):
+                raise Exception( 'Unsupported value type {t:s} in column {c:s}.'.format(
+                        t=type( c ).__name__, c=str( name ) ) )
+
+        column = { 'Name': name,
+                   'Kind': KIND_CATEGORY,
+                   'DType': 'category' if isinstance( dtype, pd.CategoricalDtype ) else 'object',
+                   'Categories': categories,
+                   'Data': _compress( codes.astype( np.int32 ).tobytes(), compression ) }
+
+    return column
+
+
+def _decodeColumn( column, compression ):
+    '''Decode one column from the columnar format.
+
+Parameters
+----------
+column : dict
+    encoded column;
+compression : str or None
+    compression algorithm.
+
+Returns
+-------
+values : numpy.ndarray or pandas.Categorical
+    decoded column values.
+    '''
+    buf = _decompress( column[ 'Data' ], compression )
+    if column[ 'Kind' ] == KIND_ARRAY:
+        values = np.frombuffer( buf, dtype=np.dtype( column[ 'DType' ] ) )
+    else:
+        codes = np.frombuffer( buf, dtype=np.int32 )
+        if column[ 'DType' ] == 'category':
+            values = pd.Categorical.from_codes( codes, categories=column[ 'Categories' ] )
+        else:
+            # the trailing None is picked up by the missing value code -1
+            categories = np.empty( len( column[ 'Categories' ] ) + 1, dtype=object )
+            categories[ : -1 ] = column[ 'Categories' ]
+            values = categories.take( codes )
+
+    return values
+
+
+def encodeFrame( df, codec=DEFAULT_CODEC, compression=DEFAULT_COMPRESSION ):
+    '''Encode a pandas.DataFrame to be stored in the `Data` field of a MongoDB record.
+
+Parameters
+----------
+df : pandas.DataFrame
+    data to encode;
+codec : str
+    record codec, either json or columnar;
+compression : str or None
+    compression algorithm for the columnar codec, zlib, zstd or None.
+
+Returns
+-------
+data : str or dict
+    JSON string for the json codec or a BSON-compatible sub-document for the
+    columnar codec.
+
+Exceptions
+----------
+    raise Exception when the codec or any column type is not supported.
+    '''
+    if codec == CODEC_JSON:
+        data = df.to_json()
+    elif codec == CODEC_COLUMNAR:
+        if isinstance( df.index, pd.MultiIndex ):
+            raise Exception( 'MultiIndex is not supported by the columnar codec.' )
+
+        if isinstance( df.index, pd.RangeIndex ):
+            index = { 'Name': df.index.name, 'Kind': KIND_RANGE,
+                      'Start': int( df.index.start ), 'Stop': int( df.index.stop ),
+                      'Step': int( df.index.step ) }
+        else:
+            index = _encodeColumn( df.index.name, df.index, compression )
+
+        data = { 'Codec': CODEC_COLUMNAR,
+                 'Version': COLUMNAR_VERSION,
+                 'Compression': compression,
+                 'Rows': len( df ),
+                 'Index': index,
+                 'Columns': [ _encodeColumn( name, df.iloc[ :, i ], compression )
+                              for i, name in enumerate( df.columns ) ] }
+    else:
+        raise Exception( 'Unsupported codec {c:s}.'.format( c=str( codec ) ) )
+
+    return data
+
+
+def decodeFrame( data, columns=None ):
+    '''Decode the `Data` field of a MongoDB record into a pandas.DataFrame.
+
+Parameters
+----------
+data : str or dict
+    legacy JSON string or columnar sub-document;
+columns : list of str or None
+    columns to decode, None for all. Only the requested columns of a columnar
+    record are decompressed; missing columns are ignored.
+
+Returns
+-------
+df : pandas.DataFrame
+    decoded data.
+
+Exceptions
+----------
+    raise Exception when the record format is not recognized.
+    '''
+    if isinstance( data, str ):
+        df = pd.read_json( io.StringIO( data ) )
+        if columns is not None:
+            df = df[ [ c for c in columns if c in df.columns ] ]
+    elif isColumnar( data ):
+        compression = data[ 'Compression' ]
+        index = data[ 'Index' ]
+        if index[ 'Kind' ] == KIND_RANGE:
+            index = pd.RangeIndex( index[ 'Start' ], index[ 'Stop' ], index[ 'Step' ],
+                    name=index[ 'Name' ] )
+        else:
+            index = pd.Index( _decodeColumn( index, compression ), name=index[ 'Name' ] )
+
+        encoded = data[ 'Columns' ]
+        if columns is not None:
+            byName  = { c[ 'Name' ]: c for c in encoded }
+            encoded = [ byName[ c ] for c in columns if c in byName ]
+        df = pd.DataFrame( { i: _decodeColumn( c, compression ) for i, c in enumerate( encoded ) },
+                index=index )
+        df.columns = [ c[ 'Name' ] for c in encoded ]
+    else:
+        raise Exception( 'Unrecognized record format.' )
+
+    return df
+
+
+def getNumericColumns( data ):
+    '''Get the numeric columns of the `Data` field of a MongoDB record. The columns of
+a columnar record are read from its metadata without decompressing any data.
+
+Parameters
+----------
+data : str or dict
+    legacy JSON string or columnar sub-document.
+
+Returns
+-------
+columns : list of str
+    names of the numeric columns in the stored order.
+
+Exceptions
+----------
+    raise Exception when the record format is not recognized.
+    '''
+    if isColumnar( data ):
+        columns = [ c[ 'Name' ] for c in data[ 'Columns' ] if c[ 'Kind' ] == KIND_ARRAY and
+                    np.issubdtype( np.dtype( c[ 'DType' ] ), np.number ) ]
+    else:
+        columns = list( decodeFrame( data ).select_dtypes( include=[ np.number ] ).columns )
+
+    return columns
+
+
+def isColumnar( data ):
+    '''Check whether the `Data` field of a MongoDB record is in the columnar format.
+
+Parameters
+----------
+data : str or dict
+    `Data` field of the record.
+
+Returns
+-------
+columnar : bool
+    True if the record is in the columnar format, otherwise False.
+    '''
+    return isinstance( data, dict ) and data.get( 'Codec' ) == CODEC_COLUMNAR
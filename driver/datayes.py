@@ -29,8 +29,15 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 # built-in modules
+import asyncio
+import concurrent.futures
+import functools
 import logging
 import io
+import os
+import random
+import threading
+import time
 
 # third-party modules
 import pandas as pd
@@ -38,11 +45,188 @@ import requests
 
 # customized modules
 from data.config import *
+from data.driver import cache
+from data.driver import throttle
 
 # set logging level
 logging.getLogger( 'requests' ).setLevel( logging.WARNING )
 
-def getDataFrame( apiUrl, params ):
+# module-level session shared by the calls without an explicit session
+_session     = None
+_sessionPid  = None
+_sessionLock = threading.Lock()
+
+# module-level rate limiter
+_limiter     = None
+_limiterPid  = None
+_limiterLock = threading.Lock()
+
+# on-disk response cache, opt-in
+_cache = None if DATAYES_CACHE_DIR is None else cache.ResponseCache( DATAYES_CACHE_DIR )
+
+# HTTP status codes worth a retry
+RETRY_STATUS_CODES = { 429, 500, 502, 503, 504 }
+
+# retry statistics
+_retryLock   = threading.Lock()
+_nRetries    = 0
+_backoffTime = 0.0
+
+def createSession( poolSize=DATAYES_POOL_SIZE ):
+    '''Create a keep-alive HTTP session to Datayes.
+
+Parameters
+----------
+poolSize : int
+    maximum number of connections kept alive in the pool.
+
+Returns
+-------
+session : requests.Session
+    HTTP session with the Datayes credential.
+    '''
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter( pool_connections=poolSize, pool_maxsize=poolSize )
+    session.mount( 'http://', adapter )
+    session.mount( 'https://', adapter )
+    session.headers.update( { 'Authorization': 'Bearer ' + DATAYES_TOKEN,
+                              'Accept-Encoding': 'gzip, deflate' } )
+
+    return session
+
+
+def getSession():
+    '''Get the module-level Datayes session of the current process.
+
+Returns
+-------
+session : requests.Session
+    shared HTTP session.
+    '''
+    global _session, _sessionPid
+
+    # the session is not shared with a forked child process.
+    if _session is None or _sessionPid != os.getpid():
+        with _sessionLock:
+            if _session is None or _sessionPid != os.getpid():
+                _session    = createSession()
+                _sessionPid = os.getpid()
+
+    return _session
+
+
+def enableCache( cacheDir, ttl=cache.DEFAULT_TTL, todayTtl=cache.TODAY_TTL ):
+    '''Enable the on-disk response cache of the Datayes requests.
+
+Parameters
+----------
+cacheDir : str
+    directory of the cache files;
+ttl : float or None
+    time-to-live in seconds of the responses without any date in the request, None
+    for never expire;
+todayTtl : float
+    time-to-live in seconds of the responses covering today or later.
+
+Returns
+-------
+responseCache : cache.ResponseCache
+    the enabled cache.
+    '''
+    global _cache
+
+    _cache = cache.ResponseCache( cacheDir, ttl=ttl, todayTtl=todayTtl )
+
+    return _cache
+
+
+def disableCache():
+    '''Disable the on-disk response cache of the Datayes requests.
+    '''
+    global _cache
+
+    _cache = None
+
+
+def getCacheStats():
+    '''Get the hit and miss counters of the response cache.
+
+Returns
+-------
+stats : dict or None
+    `hits`, `misses` and `stores` counters or None if the cache is disabled.
+    '''
+    return None if _cache is None else _cache.getStats()
+
+
+def getRateLimiter():
+    '''Get the module-level rate limiter of the current process.
+
+Returns
+-------
+limiter : throttle.TokenBucket or None
+    rate limiter of the Datayes requests or None if not limited.
+    '''
+    global _limiter, _limiterPid
+
+    if DATAYES_RATE_LIMIT is None:
+        return None
+
+    if _limiter is None or _limiterPid != os.getpid():
+        with _limiterLock:
+            if _limiter is None or _limiterPid != os.getpid():
+                _limiter    = throttle.TokenBucket( DATAYES_RATE_LIMIT, DATAYES_RATE_BURST,
+                        lockFile=DATAYES_RATE_LOCK_FILE )
+                _limiterPid = os.getpid()
+
+    return _limiter
+
+
+def getThrottleStats():
+    '''Get the throttling and retry statistics of the current process, to tune the
+concurrency against the API quota.
+
+Returns
+-------
+stats : dict
+    `acquired`, `throttled` and `waitTime` of the rate limiter, `retries` number of
+    retried requests and `backoffTime` total seconds slept before the retries.
+    '''
+    limiter = getRateLimiter()
+    stats   = { 'acquired': 0, 'throttled': 0, 'waitTime': 0.0 } if limiter is None else \
+            limiter.getStats()
+    stats[ 'retries' ]     = _nRetries
+    stats[ 'backoffTime' ] = _backoffTime
+
+    return stats
+
+
+def _getBackoff( attempt, response=None ):
+    '''Get the delay before the next retry, honoring the Retry-After header if any.
+
+Parameters
+----------
+attempt : int
+    number of the failed attempts so far minus one;
+response : requests.Response or None
+    the failed response if any.
+
+Returns
+-------
+delay : float
+    seconds to sleep, exponential backoff with full jitter.
+    '''
+    retryAfter = None if response is None else response.headers.get( 'Retry-After' )
+    try:
+        # a bogus or hostile header must not stall the job for hours
+        delay = min( max( 0.0, float( retryAfter ) ), DATAYES_RETRY_AFTER_CAP )
+    except ( TypeError, ValueError ):
+        delay = random.uniform( 0, min( DATAYES_BACKOFF_CAP, DATAYES_BACKOFF_BASE * 2 ** attempt ) )
+
+    return delay
+
+
+def getDataFrame( apiUrl, params, session=None, timeout=DATAYES_TIMEOUT ):
     '''Get data from Datayes in pandas DataFrame.
 
 Parameters
@@ -50,7 +234,18 @@ Parameters
 apiUrl : str
     API to Datayes;
 params : dict
-    parameters to feed the API.
+    parameters to feed the API;
+session : requests.Session or None
+    HTTP session to send the request, e.g. one created by `createSession` for a
+    worker thread, or None to use the module-level session;
+timeout : float or tuple of float
+    ( connect, read ) timeout in seconds.
+
+Notes
+-----
+Requests are served from the response cache if enabled, otherwise throttled by the
+module-level rate limiter and retried with exponential backoff on HTTP 429, 5xx
+and connection errors.
 
 Returns
 -------
@@ -62,21 +257,155 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
+    global _nRetries, _backoffTime
+
     data = None
+    responseCache = _cache
+    if responseCache is not None:
+        body = responseCache.get( apiUrl, params )
+        if body is not None:
+            return pd.read_csv( io.StringIO( body ) )
+
+    if session is None:
+        session = getSession()
+    limiter = getRateLimiter()
+    url     = '/'.join( [ DATAYES_API_URL, DATAYES_VERSION, apiUrl ] )
+
+    for attempt in range( DATAYES_MAX_RETRIES + 1 ):
+        if limiter is not None:
+            limiter.acquire()
+
+        # get response, the credential is in the session headers
+        try:
+            response = session.get( url=url, params=params, timeout=timeout )
+        except ( requests.exceptions.ConnectionError, requests.exceptions.Timeout ):
+            if attempt >= DATAYES_MAX_RETRIES:
+                raise
+            delay = _getBackoff( attempt )
+        else:
+            if response.status_code == DATAYES_STATUS_OK:
+                break
+            elif response.status_code in RETRY_STATUS_CODES and attempt < DATAYES_MAX_RETRIES:
+                delay = _getBackoff( attempt, response )
+            else:
+                raise Exception( 'Request failed with status code {sc:d}.'.format(
+                                 sc=response.status_code ) )
+
+        logging.warning( 'Retry {u:s} in {d:.1f} seconds ({a:d}/{n:d})...'.format(
+                u=apiUrl, d=delay, a=attempt + 1, n=DATAYES_MAX_RETRIES ) )
+        with _retryLock:
+            _nRetries    += 1
+            _backoffTime += delay
+        time.sleep( delay )
+
+    if responseCache is not None:
+        responseCache.put( apiUrl, params, response.text )
+
+    bufferData = io.StringIO( response.text )
+    data       = pd.read_csv( bufferData )
+
+    return data
+
+
+async def getDataFrameAsync( apiUrl, params, session=None, timeout=DATAYES_TIMEOUT,
+        executor=None ):
+    '''Get data from Datayes in pandas DataFrame without blocking the event loop.
+
+Parameters
+----------
+apiUrl : str
+    API to Datayes;
+params : dict
+    parameters to feed the API;
+session : requests.Session or None
+    HTTP session to send the request or None to use the module-level session;
+timeout : float or tuple of float
+    ( connect, read ) timeout in seconds;
+executor : concurrent.futures.Executor or None
+    executor to run the blocking request or None for the default one of the loop.
+
+Returns
+-------
+data: pandas.DataFrame or None
+    Datayes data in pandas DataFrame or
+    None if error happends.
 
-    # compose request header and payload
-    headers = { 'Authorization': 'Bearer ' + DATAYES_TOKEN }
-
-    # get response
-    response = requests.get( url='/'.join( [ DATAYES_API_URL,
-                                             DATAYES_VERSION,
-                                             apiUrl ] ), headers=headers,
-                                           params=params )
-    if response.status_code != DATAYES_STATUS_OK:
-        raise Exception( 'Request failed with status code {sc:d}.'.format(
-                         sc=response.status_code ) )
-    else:
-        bufferData = io.StringIO( response.text )
-        data       = pd.read_csv( bufferData )
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor( executor, functools.partial( getDataFrame,
+            apiUrl, params, session=session, timeout=timeout ) )
 
     return data
+
+
+async def gatherFrames( batch, maxConcurrency=DATAYES_MAX_CONCURRENCY,
+        returnExceptions=False ):
+    '''Get data for a batch of Datayes requests with bounded concurrency.
+
+Parameters
+----------
+batch : list of tuple
+    ( apiUrl, params ) of each request;
+maxConcurrency : int
+    maximum number of requests in flight;
+returnExceptions : bool
+    if True, the exception of a failed request is returned in place of its data,
+    otherwise the first failure is raised after all requests are done.
+
+Returns
+-------
+frames : list of pandas.DataFrame
+    Datayes data in the same order as the requests.
+
+Exceptions
+----------
+    raise Exception naming the failed request when any request fails and
+    `returnExceptions` is False.
+    '''
+    semaphore = asyncio.Semaphore( maxConcurrency )
+    with concurrent.futures.ThreadPoolExecutor( max_workers=maxConcurrency ) as executor:
+        async def fetch( apiUrl, params ):
+            async with semaphore:
+                return await getDataFrameAsync( apiUrl, params, executor=executor )
+
+        frames = await asyncio.gather( *[ fetch( apiUrl, params ) for apiUrl, params in batch ],
+                return_exceptions=True )
+
+    if not returnExceptions:
+        for ( apiUrl, params ), frame in zip( batch, frames ):
+            if isinstance( frame, Exception ):
+                raise Exception( 'Request to {u:s} with {p:s} failed: {e:s}'.format(
+                                 u=apiUrl, p=str( params ), e=str( frame ) ) ) from frame
+
+    return frames
+
+
+def getDataFrames( batch, maxConcurrency=DATAYES_MAX_CONCURRENCY, returnExceptions=False ):
+    '''Get data for a batch of Datayes requests with bounded concurrency from
+synchronous code, see `gatherFrames`.
+
+Parameters
+----------
+batch : list of tuple
+    ( apiUrl, params ) of each request;
+maxConcurrency : int
+    maximum number of requests in flight;
+returnExceptions : bool
+    if True, the exception of a failed request is returned in place of its data,
+    otherwise the first failure is raised after all requests are done.
+
+Returns
+-------
+frames : list of pandas.DataFrame
+    Datayes data in the same order as the requests.
+
+Exceptions
+----------
+    raise Exception naming the failed request when any request fails and
+    `returnExceptions` is False.
+    '''
+    return asyncio.run( gatherFrames( batch, maxConcurrency=maxConcurrency,
+            returnExceptions=returnExceptions ) )
@@ -0,0 +1,182 @@
+'''This script implements a persistent store of the requests known to return empty
+data from Datayes, e.g. weekends, holidays and suspended securities, so that
+the jobs skip them when rerun.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import datetime as dt
+import os
+import sqlite3
+import threading
+import time
+
+# third-party modules
+
+# customized modules
+
+DATE_FORMAT = '%Y%m%d'
+
+
+def _formatDate( dataDate ):
+    '''Normalize the data date to a string.
+
+Parameters
+----------
+dataDate : datetime.date or str
+    data date as a date or a string in the format %Y%m%d.
+
+Returns
+-------
+strDate : str
+    data date in the format %Y%m%d.
+    '''
+    return dataDate if isinstance( dataDate, str ) else dataDate.strftime( DATE_FORMAT )
+
+
+class EmptyResultStore( object ):
+    '''SQLite3-backed store of ( endpoint, secId, dataDate ) with empty results.
+    '''
+
+    def __init__( self, path ):
+        '''Initialize the store, creating the database file if necessary.
+
+Parameters
+----------
+path : str
+    path of the SQLite3 database file.
+        '''
+        super( EmptyResultStore, self ).__init__()
+
+        directory = os.path.dirname( path )
+        if len( directory ) > 0:
+            os.makedirs( directory, exist_ok=True )
+
+        self._lock = threading.Lock()
+        self.conn  = sqlite3.connect( path, check_same_thread=False )
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS empty_result ( '
+                'endpoint TEXT NOT NULL, sec_id TEXT NOT NULL, data_date TEXT NOT NULL, '
+                'created REAL NOT NULL, PRIMARY KEY ( endpoint, sec_id, data_date ) )' )
+        self.conn.commit()
+
+
+    def contains( self, endpoint, secId, dataDate ):
+        '''Check whether the request is known to return empty data.
+
+Parameters
+----------
+endpoint : str
+    Datayes API;
+secId : str
+    security identifier;
+dataDate : datetime.date or str
+    data date.
+
+Returns
+-------
+empty : bool
+    True if the request is known to return empty data.
+        '''
+        with self._lock:
+            row = self.conn.execute( 'SELECT 1 FROM empty_result WHERE endpoint=? AND sec_id=? AND data_date=?',
+                    ( endpoint, secId, _formatDate( dataDate ) ) ).fetchone()
+
+        return row is not None
+
+
+    def getDates( self, endpoint, secId ):
+        '''Get all the dates known to return empty data for the security.
+
+Parameters
+----------
+endpoint : str
+    Datayes API;
+secId : str
+    security identifier.
+
+Returns
+-------
+dates : set of str
+    data dates in the format %Y%m%d.
+        '''
+        with self._lock:
+            rows = self.conn.execute( 'SELECT data_date FROM empty_result WHERE endpoint=? AND sec_id=?',
+                    ( endpoint, secId ) ).fetchall()
+
+        return set( row[ 0 ] for row in rows )
+
+
+    def add( self, endpoint, secId, dataDates ):
+        '''Record the requests returning empty data.
+
+Parameters
+----------
+endpoint : str
+    Datayes API;
+secId : str
+    security identifier;
+dataDates : list of datetime.date or str
+    data dates with empty data.
+        '''
+        now = time.time()
+        with self._lock:
+            self.conn.executemany( 'INSERT OR REPLACE INTO empty_result VALUES ( ?, ?, ?, ? )',
+                    [ ( endpoint, secId, _formatDate( d ), now ) for d in dataDates ] )
+            self.conn.commit()
+
+
+    def expireRecent( self, days ):
+        '''Forget the empty results of the recent dates, since Datayes may publish the
+data of a recent date late.
+
+Parameters
+----------
+days : int
+    entries whose data date is within the given number of days before today, or
+    later, are removed.
+
+Returns
+-------
+nExpired : int
+    number of entries removed.
+        '''
+        since = ( dt.date.today() - dt.timedelta( days ) ).strftime( DATE_FORMAT )
+        with self._lock:
+            cursor = self.conn.execute( 'DELETE FROM empty_result WHERE data_date>=?', ( since, ) )
+            self.conn.commit()
+
+        return cursor.rowcount
+
+
+    def close( self ):
+        '''Close the store.
+        '''
+        with self._lock:
+            self.conn.close()
@@ -30,13 +30,119 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 # built-in modules
+import os
+import threading
 
 # third-party modules
 import pymongo
 
 # customized modules
+import data.config.mongodb as mongoConfig
 
-def getAuthenticatedConnection( mongoUrl, port, username, password, dbname, source='admin' ):
+# process-wide MongoDB clients keyed by ( mongoUrl, port, username, source )
+_clients     = {}
+_clientsLock = threading.Lock()
+_clientsPid  = os.getpid()
+
+
+def _resetClients():
+    '''Forget the clients inherited from the parent process. A MongoClient is not
+fork-safe, so the child process opens its own clients on demand.
+    '''
+    global _clientsLock, _clientsPid
+
+    _clients.clear()
+    _clientsLock = threading.Lock()
+    _clientsPid  = os.getpid()
+
+
+if hasattr( os, 'register_at_fork' ):
+    os.register_at_fork( after_in_child=_resetClients )
+
+
+def getClient( mongoUrl, port, username, password, source='admin',
+        maxPoolSize=mongoConfig.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=mongoConfig.MONGODB_MIN_POOL_SIZE,
+        connectTimeoutMS=mongoConfig.MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=mongoConfig.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=mongoConfig.MONGODB_SOCKET_TIMEOUT_MS ):
+    '''Get the pooled MongoDB client of the current process. The client is created and
+authenticated on the first call and reused afterwards.
+
+Parameters
+----------
+mongoUrl : str
+    MongoDB hostname;
+port : int
+    MongoDB listening port;
+username : str
+    MongoDB username to login;
+password : str
+    MongoDB password to authenticate the user;
+source : str
+    Source of the authentication database;
+maxPoolSize : int
+    maximum number of connections in the pool;
+minPoolSize : int
+    minimum number of connections kept in the pool;
+connectTimeoutMS : int
+    timeout in milliseconds to establish a connection;
+serverSelectionTimeoutMS : int
+    timeout in milliseconds to find an available server;
+socketTimeoutMS : int or None
+    timeout in milliseconds of a socket read or write, None for no timeout.
+
+Notes
+-----
+The pool options only take effect when the client is created.
+
+Returns
+-------
+client : pymongo.MongoClient
+    authenticated MongoDB client.
+
+Exceptions
+----------
+    raise Exception when authentication failed or cannont connect to server.
+    '''
+    if os.getpid() != _clientsPid:
+        _resetClients()
+
+    key    = ( mongoUrl, port, username, source )
+    client = _clients.get( key )
+    if client is None:
+        with _clientsLock:
+            client = _clients.get( key )
+            if client is None:
+                client = pymongo.MongoClient( mongoUrl, port, username=username,
+                        password=password, authSource=source, maxPoolSize=maxPoolSize,
+                        minPoolSize=minPoolSize, connectTimeoutMS=connectTimeoutMS,
+                        serverSelectionTimeoutMS=serverSelectionTimeoutMS,
+                        socketTimeoutMS=socketTimeoutMS )
+                # authenticate eagerly so that a wrong credential fails here.
+                try:
+                    client.admin.command( 'ping' )
+                except pymongo.errors.OperationFailure:
+                    client.close()
+                    raise Exception( 'Fail to authenticate {u:s} against {db:s}.'.format(
+                                     u=username, db=source ) )
+
+                _clients[ key ] = client
+
+    return client
+
+
+def closeClients():
+    '''Close all the pooled MongoDB clients of the current process.
+    '''
+    with _clientsLock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def getAuthenticatedConnection( mongoUrl, port, username, password, dbname, source='admin',
+        **kwargs ):
     '''Get MongoDB connection and authenticate the connection.
 
 Parameters
@@ -52,21 +158,19 @@ password : str
 dbname : str
     MongoDB database name to connect;
 source : str
-    Source of the authentication database.
+    Source of the authentication database;
+kwargs : dict
+    pool options of the client, see `getClient`.
 
 Returns
 -------
 db : pymongon.database.Database
-    authenticated MongoDB connection.
+    authenticated MongoDB connection backed by the pooled client of the process.
 
 Exceptions
 ----------
     raise Exception when authentication failed or cannont connect to server.
     '''
-    client = pymongo.MongoClient( mongoUrl, port )
-    db     = client[ dbname ]
-    if not db.authenticate( username, password, source=source ):
-        raise Exception( 'Fail to authenticate {u:s} against {db:s}.'.format(
-                         u=username, db=dbname ) )
+    client = getClient( mongoUrl, port, username, password, source=source, **kwargs )
 
-    return db
+    return client[ dbname ]
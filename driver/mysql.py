@@ -30,6 +30,10 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 # built-in modules
+import concurrent.futures
+import functools
+import os
+import threading
 
 # third-party modules
 import sqlalchemy
@@ -37,10 +41,77 @@ import sqlalchemy
 # customized modules
 import data.config.mysql as mysqlConfig
 
+# process-wide engines keyed by the connection URL and the pool options
+_engines     = {}
+_enginesLock = threading.Lock()
+
+# process-wide executor running the chunked queries
+_executor     = None
+_executorLock = threading.Lock()
+
+
+def _disposeEnginesInChild():
+    '''Drop the pooled connections inherited from the parent process without closing
+them, so that the engines open fresh connections in the child process. The query
+executor is dropped as well since its threads do not survive the fork.
+    '''
+    global _enginesLock, _executor, _executorLock
+
+    _executor     = None
+    _executorLock = threading.Lock()
+    _enginesLock  = threading.Lock()
+    for engine in _engines.values():
+        try:
+            engine.dispose( close=False )
+        except TypeError:
+            # SQLAlchemy before 1.4.33
+            engine.pool = engine.pool.recreate()
+
+
+if hasattr( os, 'register_at_fork' ):
+    os.register_at_fork( after_in_child=_disposeEnginesInChild )
+
+
+def disposeEngines():
+    '''Dispose all the shared engines of the current process.
+    '''
+    with _enginesLock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def getExecutor():
+    '''Get the executor shared by the chunked queries of the current process.
+
+Notes
+-----
+Queries submitted to the executor must not wait on other queries submitted to it,
+otherwise the pool may be exhausted.
+
+Returns
+-------
+executor : concurrent.futures.ThreadPoolExecutor
+    thread pool with MYSQL_QUERY_PARALLELISM workers.
+    '''
+    global _executor
+
+    if _executor is None:
+        with _executorLock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=max( 1, mysqlConfig.MYSQL_QUERY_PARALLELISM ),
+                        thread_name_prefix='mysql' )
+
+    return _executor
+
 
 def getAuthenticatedConnection( mysqlUrl, port, username, password, dbname,
-            driver=mysqlConfig.MYSQL_DRIVER, encoding='utf8' ):
-    '''Get MySQL connection and authenticate the connection.
+            driver=mysqlConfig.MYSQL_DRIVER, encoding='utf8',
+            poolSize=mysqlConfig.MYSQL_POOL_SIZE, maxOverflow=mysqlConfig.MYSQL_MAX_OVERFLOW,
+            prePing=mysqlConfig.MYSQL_POOL_PRE_PING, recycle=mysqlConfig.MYSQL_POOL_RECYCLE ):
+    '''Get MySQL connection and authenticate the connection. Engines are shared in the
+process, so the same database and credential always get the same engine.
 
 Parameters
 ----------
@@ -55,7 +126,15 @@ password : str
 dbname : str
     MySQL database name to connect;
 encoding : str
-    encoding of the connection.
+    encoding of the connection;
+poolSize : int
+    number of connections kept in the pool;
+maxOverflow : int
+    number of connections allowed beyond the pool size;
+prePing : bool
+    whether to test a pooled connection before using it;
+recycle : int
+    seconds after which a pooled connection is replaced, -1 to disable.
 
 Returns
 -------
@@ -66,16 +145,121 @@ Exceptions
 ----------
     raise Exception when authentication failed or cannot connect to server.
     '''
-    conn = sqlalchemy.create_engine( '{driver:s}://{username:s}:{password:s}@{url:s}:{port:d}/{dbname:s}?charset={encoding:s}'.format(
+    url = '{driver:s}://{username:s}:{password:s}@{url:s}:{port:d}/{dbname:s}?charset={encoding:s}'.format(
             driver='mysql' if driver is None else 'mysql+{d:s}'.format( d=driver ),
             username=username, password=password, url=mysqlUrl, port=port, dbname=dbname,
-            encoding=encoding ) )
+            encoding=encoding )
+
+    key  = ( url, poolSize, maxOverflow, prePing, recycle )
+    conn = _engines.get( key )
+    if conn is None:
+        with _enginesLock:
+            conn = _engines.get( key )
+            if conn is None:
+                conn = sqlalchemy.create_engine( url, pool_size=poolSize, max_overflow=maxOverflow,
+                        pool_pre_ping=prePing, pool_recycle=recycle )
+                _engines[ key ] = conn
 
     return conn
 
 
+@functools.lru_cache( maxsize=mysqlConfig.MYSQL_STATEMENT_CACHE_SIZE )
+def compileSql( sql, expanding=() ):
+    '''Get the SQLAlchemy text construct of a parameterized statement. Constructs are
+cached per statement shape, so that the queries differing only in the parameters
+share the same construct and the compiled form of the engine.
+
+Parameters
+----------
+sql : str
+    SQL with named parameters in the form :name;
+expanding : tuple of str
+    names of the list parameters expanded in IN clauses.
+
+Returns
+-------
+stmt : sqlalchemy.sql.expression.TextClause
+    executable statement.
+    '''
+    stmt = sqlalchemy.text( sql )
+    if len( expanding ) > 0:
+        stmt = stmt.bindparams( *[ sqlalchemy.bindparam( name, expanding=True ) for name in expanding ] )
+
+    return stmt
+
+
+def _getConditionsSql( conditions, params ):
+    '''Get the equality constraints of a WHERE clause with their parameters.
+
+Parameters
+----------
+conditions : dict or None
+    values keyed by the column name;
+params : dict
+    parameters of the statement to update in place.
+
+Returns
+-------
+sql : str
+    AND-ed constraints, empty if no condition.
+    '''
+    sql = ''
+    for column, value in sorted( ( conditions or {} ).items() ):
+        name = 'cond_{c:s}'.format( c=column )
+        sql += ' AND {c:s}=:{n:s}'.format( c=column, n=name )
+        params[ name ] = value
+
+    return sql
+
+
+def getProjection( keyColumns, dataColumns=None ):
+    '''Get the columns to read, the key columns first.
+
+Parameters
+----------
+keyColumns : list of str
+    columns always selected, e.g. the instrument and the date;
+dataColumns : list of str or None
+    data columns to get, by default all columns with None.
+
+Returns
+-------
+columns : list of str or None
+    columns without duplicates, or None for all columns.
+    '''
+    if dataColumns is None:
+        return None
+
+    columns = []
+    for column in list( keyColumns ) + list( dataColumns ):
+        if column not in columns:
+            columns.append( column )
+
+    return columns
+
+
+def getSelectColumns( keyColumns, dataColumns=None ):
+    '''Get the column list of a SELECT statement, see `getProjection`.
+
+Parameters
+----------
+keyColumns : list of str
+    columns always selected, e.g. the instrument and the date;
+dataColumns : list of str or None
+    data columns to get, by default all columns with None.
+
+Returns
+-------
+columns : str
+    comma-separated columns, or * for all columns.
+    '''
+    columns = getProjection( keyColumns, dataColumns )
+
+    return '*' if columns is None else ', '.join( columns )
+
+
 def buildBinDataSql( tableName, secId, startDate, endDate, binSize,
-        instColumn='sec_id', dateColumn='tradedate', binColumn='kl_period_id' ):
+        instColumn='sec_id', dateColumn='tradedate', binColumn='kl_period_id', dataColumns=None ):
     '''Build an SQL query for bin data to be executable.
 
 Parameters
@@ -95,24 +279,98 @@ instColumn : str
 dateColumn : str
     column name of the date;
 binColumn : str
-    period to distinguish bin size.
+    period to distinguish bin size;
+dataColumns : list of str
+    data column to get, by default all columns with None.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
-    sql = "SELECT * FROM {tablename:s} WHERE {dc:s}>='{sd:s}' AND {dc:s}<='{ed:s}' AND {pc:s}={p:d}".format(
-            tablename=tableName, dc=dateColumn, sd=startDate, ed=endDate, pc=binColumn, p=binSize )
+    sql = 'SELECT {cols:s} FROM {tablename:s} WHERE {dc:s}>=:startDate AND {dc:s}<=:endDate AND {pc:s}=:binSize'.format(
+            cols=getSelectColumns( [ instColumn, dateColumn ], dataColumns ), tablename=tableName,
+            dc=dateColumn, pc=binColumn )
+    params = { 'startDate': startDate, 'endDate': endDate, 'binSize': binSize }
 
     if secId is not None:
-        sql += " AND {sn:s}='{sid:s}'".format( sn=instColumn, sid=secId )
+        sql += ' AND {sn:s}=:secId'.format( sn=instColumn )
+        params[ 'secId' ] = secId
 
-    return sql
+    return compileSql( sql ), params
+
+
+def buildBinDataSqlWithSecIds( tableName, secIds, startDate, endDate, binSize,
+        instColumn='sec_id', dateColumn='tradedate', binColumn='kl_period_id', dataColumns=None,
+        suffix='' ):
+    '''Build an SQL query for bin data of many securities in the same table.
+
+Parameters
+----------
+tableName : str
+    name of the data table in the SQL database;
+secIds : list of str
+    all securities identifiers to be constrained;
+startDate : str
+    start date of the data series in the format %Y%m%d;
+endDate : str
+    end date of the data series in the format %Y%m%d;
+binSize : int
+    number of minute in a bin;
+instColumn : str
+    column name of the instrument identifier;
+dateColumn : str
+    column name of the date;
+binColumn : str
+    period to distinguish bin size;
+dataColumns : list of str
+    data column to get, by default all columns with None;
+suffix : str
+    suffix of the parameter names, to combine the queries with `buildUnionSql`.
+
+Returns
+-------
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
+    '''
+    sql = 'SELECT {cols:s} FROM {tablename:s} WHERE {dc:s}>=:startDate{sf:s} AND {dc:s}<=:endDate{sf:s} AND {pc:s}=:binSize{sf:s} AND {sn:s} IN :secIds{sf:s}'.format(
+            cols=getSelectColumns( [ instColumn, dateColumn ], dataColumns ), tablename=tableName,
+            dc=dateColumn, pc=binColumn, sn=instColumn, sf=suffix )
+    params = { 'startDate' + suffix: startDate, 'endDate' + suffix: endDate,
+               'binSize' + suffix: binSize, 'secIds' + suffix: list( secIds ) }
+
+    return compileSql( sql, expanding=( 'secIds' + suffix, ) ), params
+
+
+def buildUnionSql( queries, orderBy=None ):
+    '''Combine the queries with UNION ALL. The parameter names of the queries must
+not collide, e.g. built with different suffixes.
+
+Parameters
+----------
+queries : list of tuple
+    ( statement, parameters ) of each query;
+orderBy : list of str or None
+    columns to sort the combined rows.
+
+Returns
+-------
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
+    '''
+    sql    = ' UNION ALL '.join( stmt.text for stmt, _ in queries )
+    params = {}
+    for _, queryParams in queries:
+        params.update( queryParams )
+    if orderBy is not None:
+        sql += ' ORDER BY {cols:s}'.format( cols=', '.join( orderBy ) )
+    expanding = tuple( sorted( name for name, value in params.items() if isinstance( value, list ) ) )
+
+    return compileSql( sql, expanding=expanding ), params
 
 
 def buildSql( tableName, secId, startDate, endDate,
-        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT' ):
+        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None, conditions=None ):
     '''Build an SQL query to be executable.
 
 Parameters
@@ -129,27 +387,34 @@ stockColumn : str
     column name of the stock identifier;
 dateColumn : str
     column name of the date;
-dateFormat : str
-    date format.
+dataColumns : list of str
+    data column to get, by default all columns with None;
+conditions : dict or None
+    additional equality constraints keyed by the column name, e.g.
+    { 'S_DIV_PROGRESS': '3' }.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
-    sql = "SELECT * FROM {tablename:s} WHERE {dc:s}>='{sd:s}' AND {dc:s}<='{ed:s}'".format(
-            tablename=tableName, dc=dateColumn, sd=startDate, ed=endDate )
+    sql = 'SELECT {cols:s} FROM {tablename:s} WHERE {dc:s}>=:startDate AND {dc:s}<=:endDate'.format(
+            cols=getSelectColumns( [ stockColumn, dateColumn ], dataColumns ), tablename=tableName,
+            dc=dateColumn )
+    params = { 'startDate': startDate, 'endDate': endDate }
 
     if secId is not None:
-        sql += " AND {sn:s}='{sid:s}'".format( sn=stockColumn, sid=secId )
+        sql += ' AND {sn:s}=:secId'.format( sn=stockColumn )
+        params[ 'secId' ] = secId
 
+    sql += _getConditionsSql( conditions, params )
     sql += ' ORDER BY {dc:s}'.format( dc=dateColumn )
 
-    return sql
+    return compileSql( sql ), params
 
 
 def buildSqlWithSecIds( tableName, secIds, startDate, endDate,
-        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None ):
+        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None, conditions=None ):
     '''Build an SQL query to be executable.
 
 Parameters
@@ -167,19 +432,56 @@ stockColumn : str
 dateColumn : str
     column name of the date.
 dataColumns : list of str
-    data column to get, by default all columns with None.
+    data column to get, by default all columns with None;
+conditions : dict or None
+    additional equality constraints keyed by the column name.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
-    sql  = "SELECT {cols:s} FROM {tablename:s} WHERE {sc:s} IN ('{secIds:s}') AND {dc:s}>='{sd:s}' AND {dc:s} <= '{ed:s}'".format(
-            cols='*' if dataColumns is None else ', '.join( [ stockColumn, dateColumn ] + dataColumns ),
-            tablename=tableName, sc=stockColumn, secIds="', '".join( secIds ), dc=dateColumn,
-            sd=startDate, ed=endDate )
+    sql = 'SELECT {cols:s} FROM {tablename:s} WHERE {sc:s} IN :secIds AND {dc:s}>=:startDate AND {dc:s}<=:endDate'.format(
+            cols=getSelectColumns( [ stockColumn, dateColumn ], dataColumns ),
+            tablename=tableName, sc=stockColumn, dc=dateColumn )
+    params = { 'secIds': list( secIds ), 'startDate': startDate, 'endDate': endDate }
+    sql += _getConditionsSql( conditions, params )
 
-    return sql
+    return compileSql( sql, expanding=( 'secIds', ) ), params
+
+
+def buildWatermarkSql( tableName, secIds, startDate, endDate, stockColumn='S_INFO_WINDCODE',
+        dateColumn='TRADE_DT', column='OPDATE' ):
+    '''Get the query of the latest modification time of the rows of the securities in
+the date range, which changes whenever such rows are inserted or corrected.
+
+Parameters
+----------
+tableName : str
+    name of the table;
+secIds : list of str
+    securities identifiers;
+startDate : str
+    start date in the format %Y%m%d inclusively;
+endDate : str
+    end date in the format %Y%m%d inclusively;
+stockColumn : str
+    column name of the stock identifier;
+dateColumn : str
+    column name of the date;
+column : str
+    modification time column, OPDATE in the Wind tables.
+
+Returns
+-------
+query : tuple
+    ( statement, parameters ) selecting the WATERMARK column.
+    '''
+    sql = 'SELECT MAX({col:s}) AS WATERMARK FROM {tablename:s} WHERE {sc:s} IN :secIds AND {dc:s}>=:startDate AND {dc:s}<=:endDate'.format(
+            col=column, tablename=tableName, sc=stockColumn, dc=dateColumn )
+    params = { 'secIds': list( secIds ), 'startDate': startDate, 'endDate': endDate }
+
+    return compileSql( sql, expanding=( 'secIds', ) ), params
 
 
 def getRefDataSql( tableName ):
@@ -208,7 +510,8 @@ secId : str
 
 Returns
 -------
-tableNameSql : str
-    SQL to query the name of the table holding the data for the securities.
+query : tuple
+    ( statement, parameters ) to query the name of the table holding the data for
+    the securities.
     '''
-    return "SELECT * FROM dict_market_code WHERE sec_id='{secId:s}'".format( secId=secId )
+    return compileSql( 'SELECT * FROM dict_market_code WHERE sec_id=:secId' ), { 'secId': secId }
@@ -70,7 +70,7 @@ Exceptions
     return conn
 
 def buildBinDataSql( tableName, secId, startDate, endDate, binSize,
-        instColumn='sec_id', dateColumn='tradedate', binColumn='kl_period_id' ):
+        instColumn='sec_id', dateColumn='tradedate', binColumn='kl_period_id', dataColumns=None ):
     '''Build an SQL query for bin data to be executable.
 
 Parameters
@@ -90,23 +90,29 @@ instColumn : str
 dateColumn : str
     column name of the date;
 binColumn : str
-    period to distinguish bin size.
+    period to distinguish bin size;
+dataColumns : list of str
+    data column to get, by default all columns with None.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
-    sql = "SELECT * FROM {tablename:s} WHERE {dc:s}>='{sd:s}' AND {dc:s}<='{ed:s}'".format(
-            tablename=tableName, dc=dateColumn, sd=startDate, ed=endDate )
+    sql = 'SELECT {cols:s} FROM {tablename:s} WHERE {dc:s}>=:startDate AND {dc:s}<=:endDate'.format(
+            cols='*' if dataColumns is None else ', '.join( [ instColumn, dateColumn ] +
+                [ c for c in dataColumns if c not in ( instColumn, dateColumn ) ] ),
+            tablename=tableName, dc=dateColumn )
+    params = { 'startDate': startDate, 'endDate': endDate }
 
     if secId is not None:
-        sql += " AND {sn:s}='{sid:s}'".format( sn=instColumn, sid=secId )
+        sql += ' AND {sn:s}=:secId'.format( sn=instColumn )
+        params[ 'secId' ] = secId
 
-    return sql
+    return sqlalchemy.text( sql ), params
 
 def buildSql( tableName, secId, startDate, endDate,
-        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT' ):
+        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None, conditions=None ):
     '''Build an SQL query to be executable.
 
 Parameters
@@ -123,18 +129,20 @@ stockColumn : str
     column name of the stock identifier;
 dateColumn : str
     column name of the date;
-dateFormat : str
-    date format.
+dataColumns : list of str
+    data column to get, by default all columns with None;
+conditions : dict or None
+    additional equality constraints keyed by the column name.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
     raise Exception( 'Method `buildSql` not implemented' )
 
 def buildSqlWithSecIds( tableName, secIds, startDate, endDate,
-        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None ):
+        stockColumn='S_INFO_WINDCODE', dateColumn='TRADE_DT', dataColumns=None, conditions=None ):
     '''Build an SQL query to be executable.
 
 Parameters
@@ -152,11 +160,13 @@ stockColumn : str
 dateColumn : str
     column name of the date.
 dataColumns : list of str
-    data column to get, by default all columns with None.
+    data column to get, by default all columns with None;
+conditions : dict or None
+    additional equality constraints keyed by the column name.
 
 Returns
 -------
-sql : str
-    SQL to query.
+query : tuple
+    ( statement, parameters ) to feed `pandas.read_sql( statement, conn, params=parameters )`.
     '''
     raise Exception( 'Method `buildSqlWithSecIds` not implemented' )
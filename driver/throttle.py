@@ -0,0 +1,185 @@
+'''This script implements a token-bucket rate limiter shared across threads and,
+through a lock file, across processes on the same host.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# third-party modules
+
+# customized modules
+
+# layout of the shared state in the lock file: available tokens, last refill time as
+# wall-clock seconds since the epoch
+_STATE_FORMAT = '<dd'
+_STATE_SIZE   = struct.calcsize( _STATE_FORMAT )
+
+
+class TokenBucket( object ):
+    '''Token-bucket rate limiter. A caller reserves one token per request and sleeps
+until the token is due, so concurrent callers are served at the configured rate.
+    '''
+
+    def __init__( self, rate, burst, lockFile=None ):
+        '''Initialize a token bucket.
+
+Parameters
+----------
+rate : float
+    tokens refilled per second, i.e. the sustained requests per second;
+burst : int
+    capacity of the bucket, i.e. the number of requests allowed back-to-back;
+lockFile : str or None
+    path of the file holding the bucket state shared by all processes using the
+    same path, or None to share the bucket among the threads of this process only.
+        '''
+        super( TokenBucket, self ).__init__()
+
+        self.rate     = float( rate )
+        self.burst    = float( burst )
+        self.lockFile = lockFile if fcntl is not None else None
+
+        self._lock   = threading.Lock()
+        self._tokens = self.burst
+        self._last   = time.monotonic()
+
+        # statistics
+        self.nAcquired  = 0
+        self.nThrottled = 0
+        self.waitTime   = 0.0
+
+
+    def _reserve( self, tokens, last, now ):
+        '''Refill the bucket and reserve one token.
+
+Parameters
+----------
+tokens : float
+    tokens available at the last refill, negative if already over-reserved;
+last : float
+    time of the last refill;
+now : float
+    current time, earlier than last if the clock went back, e.g. a stored time from
+    another host or before a reboot.
+
+Returns
+-------
+tokens : float
+    tokens available after the reservation;
+wait : float
+    seconds to wait until the reserved token is due.
+        '''
+        tokens = min( self.burst, tokens + max( 0.0, now - last ) * self.rate ) - 1
+        wait   = -tokens / self.rate if tokens < 0 else 0.0
+
+        return tokens, wait
+
+
+    def _reserveShared( self, now ):
+        '''Reserve one token from the bucket state in the lock file.
+
+Parameters
+----------
+now : float
+    current time.
+
+Returns
+-------
+wait : float
+    seconds to wait until the reserved token is due.
+        '''
+        fd = os.open( self.lockFile, os.O_RDWR | os.O_CREAT, 0o644 )
+        try:
+            fcntl.flock( fd, fcntl.LOCK_EX )
+            buf = os.pread( fd, _STATE_SIZE, 0 )
+            if len( buf ) == _STATE_SIZE:
+                tokens, last = struct.unpack( _STATE_FORMAT, buf )
+            else:
+                tokens, last = self.burst, now
+
+            tokens, wait = self._reserve( tokens, last, now )
+            os.pwrite( fd, struct.pack( _STATE_FORMAT, tokens, now ), 0 )
+        finally:
+            # closing the descriptor releases the lock
+            os.close( fd )
+
+        return wait
+
+
+    def acquire( self ):
+        '''Block until a request is allowed.
+
+Returns
+-------
+wait : float
+    seconds waited for the token.
+        '''
+        with self._lock:
+            if self.lockFile is None:
+                now = time.monotonic()
+                self._tokens, wait = self._reserve( self._tokens, self._last, now )
+                self._last = now
+            else:
+                # the state outlives reboots and may be shared across hosts, where only the
+                # wall clock is comparable
+                wait = self._reserveShared( time.time() )
+
+            self.nAcquired += 1
+            if wait > 0:
+                self.nThrottled += 1
+                self.waitTime   += wait
+
+        if wait > 0:
+            time.sleep( wait )
+
+        return wait
+
+
+    def getStats( self ):
+        '''Get the throttling statistics of this process.
+
+Returns
+-------
+stats : dict
+    `acquired` number of requests, `throttled` number of requests delayed and
+    `waitTime` total seconds waited.
+        '''
+        return { 'acquired': self.nAcquired,
+                 'throttled': self.nThrottled,
+                 'waitTime': self.waitTime }
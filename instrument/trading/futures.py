@@ -50,6 +50,9 @@ import data.api.futures as futuresApi
 # initialize logger
 logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
 
+# Datayes API of the historical bin data
+BIN_DATA_URL = 'api/market/getFutureBarHistDateRange.csv'
+
 def getDailyData( startDate=dt.date( 2012, 1, 1 ),
                   endDate=dt.date.today() ):
     '''Get continuous daily trading data for the given product
@@ -72,26 +75,53 @@ Exceptions
     # read data from Datayes API in a .csv file
     dataUrl = 'api/market/getMktFutd.csv'
 
-    data = []
+    dailyRequests = []
     tradingDates = set( futuresApi.getTradingDates() )
     iterDate = startDate
     while iterDate <= endDate:
         if iterDate in tradingDates:
-            strD = iterDate.strftime( '%Y%m%d' )
-            logging.info( 'Processing {d:s}...'.format( d=strD ) )
-            params = { 'tradeDate' : strD }
-            futuresDailyData = datayes.getDataFrame( dataUrl, params )
-            if len( futuresDailyData ) > 0:
-                data.append( futuresDailyData )
-            else:
-                logging.warning( 'Empty data on {d:s}.'.format( d=strD ) )
+            dailyRequests.append( ( dataUrl, { 'tradeDate' : iterDate.strftime( '%Y%m%d' ) } ) )
         iterDate = iterDate + dt.timedelta( 1 )
 
+    # the trading dates are fetched concurrently
+    logging.info( 'Processing {n:d} trading dates...'.format( n=len( dailyRequests ) ) )
+    data = []
+    for request, futuresDailyData in zip( dailyRequests, datayes.getDataFrames( dailyRequests ) ):
+        if len( futuresDailyData ) > 0:
+            data.append( futuresDailyData )
+        else:
+            logging.warning( 'Empty data on {d:s}.'.format( d=request[ 1 ][ 'tradeDate' ] ) )
+
     dailyData = pd.concat( data )
     dailyData.reset_index( drop=True, inplace=True )
 
     return dailyData
 
+def getBinDataRequest( instId, dataDate=dt.date.today() ):
+    '''Compose the Datayes request of the bin data, see `getBinData`.
+
+Parameters
+----------
+instId : str
+    instrument ID (instead of SecID with no exchange info);
+dataDate : datetime.date
+    Data date to read.
+
+Returns
+-------
+request : tuple
+    ( apiUrl, params ) to feed `datayes.getDataFrame`.
+    '''
+    # read data from Datayes API in a .csv file
+    dataUrl = BIN_DATA_URL
+
+    # compose request payload
+    strDataDate = dataDate.strftime( '%Y%m%d' )
+    params = { 'instrumentID': instId, 'startDate': strDataDate, 'endDate': strDataDate }
+
+    return dataUrl, params
+
+
 def getBinData( instId, dataDate=dt.date.today() ):
     '''Get historical bin data for the given instrument during the given
 date.
@@ -112,13 +142,30 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
-    # read data from Datayes API in a .csv file
-    dataUrl = 'api/market/getFutureBarHistDateRange.csv'
+    binData = datayes.getDataFrame( *getBinDataRequest( instId, dataDate=dataDate ) )
+
+    return binData
 
-    # compose request payload
-    strDataDate = dataDate.strftime( '%Y%m%d' )
-    params = { 'instrumentID': instId, 'startDate': strDataDate, 'endDate': strDataDate }
 
-    binData = datayes.getDataFrame( dataUrl, params )
+async def getBinDataAsync( instId, dataDate=dt.date.today() ):
+    '''Asynchronous version of `getBinData`.
+
+Parameters
+----------
+instId : str
+    instrument ID (instead of SecID with no exchange info);
+dataDate : datetime.date
+    Data date to read.
+
+Returns
+-------
+histBinData : pandas.DataFrame
+    Datayes futures historical bin data.
+
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    binData = await datayes.getDataFrameAsync( *getBinDataRequest( instId, dataDate=dataDate ) )
 
     return binData
@@ -42,6 +42,37 @@ import datetime as dt
 # customized modules
 from data.driver import datayes
 
+# Datayes API of the historical bin data
+BIN_DATA_URL = 'api/market/getBarHistDateRange.csv'
+
+def getAdjustedDailyDataRequest( secId, startDate=dt.date( 2012, 1, 1 ),
+                                 endDate=dt.date.today() ):
+    '''Compose the Datayes request of the adjusted daily data, see `getAdjustedDailyData`.
+
+Parameters
+----------
+secId : str
+    ticker name in secID;
+startDate : datetime.date
+    data begin date inclusively;
+endDate : datetime.date
+    data end date inclusively.
+
+Returns
+-------
+request : tuple
+    ( apiUrl, params ) to feed `datayes.getDataFrame`.
+    '''
+    # read data from Datayes API in a .csv file
+    dataUrl = 'api/market/getMktEqudAdj.csv'
+
+    # compose request payload
+    params  = { 'secID': secId, 'beginDate': startDate.strftime( '%Y%m%d' ),
+                'endDate': endDate.strftime( '%Y%m%d' ) }
+
+    return dataUrl, params
+
+
 def getAdjustedDailyData( secId, startDate=dt.date( 2012, 1, 1 ),
                           endDate=dt.date.today() ):
     '''Get adjusted (former complex right) daily information for
@@ -65,16 +96,66 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
+    adjustedDailyData = datayes.getDataFrame( *getAdjustedDailyDataRequest( secId,
+            startDate=startDate, endDate=endDate ) )
+
+    return adjustedDailyData
+
+
+async def getAdjustedDailyDataAsync( secId, startDate=dt.date( 2012, 1, 1 ),
+                                     endDate=dt.date.today() ):
+    '''Asynchronous version of `getAdjustedDailyData`.
+
+Parameters
+----------
+secId : str
+    ticker name in secID;
+startDate : datetime.date
+    data begin date inclusively;
+endDate : datetime.date
+    data end date inclusively.
+
+Returns
+-------
+adjustedDailyData : pandas.DataFrame
+    Datayes adjusted daily trading volume in pandas DataFrame.
+
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    adjustedDailyData = await datayes.getDataFrameAsync( *getAdjustedDailyDataRequest( secId,
+            startDate=startDate, endDate=endDate ) )
+
+    return adjustedDailyData
+
+
+def getHistoryBinDataRequest( secId, startDate=dt.date( 2012, 1, 1 ),
+                              endDate=dt.date.today() ):
+    '''Compose the Datayes request of the historical bin data, see `getHistoryBinData`.
+
+Parameters
+----------
+secId : str
+    ticker name in secID;
+startDate : datetime.date
+    data begin date inclusively;
+endDate : datetime.date
+    data end date inclusively.
+
+Returns
+-------
+request : tuple
+    ( apiUrl, params ) to feed `datayes.getDataFrame`.
+    '''
     # read data from Datayes API in a .csv file
-    dataUrl = 'api/market/getMktEqudAdj.csv'
+    dataUrl = BIN_DATA_URL
 
     # compose request payload
-    params  = { 'secID': secId, 'beginDate': startDate.strftime( '%Y%m%d' ),
+    params  = { 'securityID': secId, 'startDate': startDate.strftime( '%Y%m%d' ),
                 'endDate': endDate.strftime( '%Y%m%d' ) }
 
-    adjustedDailyData = datayes.getDataFrame( dataUrl, params )
-
-    return adjustedDailyData
+    return dataUrl, params
 
 
 def getHistoryBinData( secId, startDate=dt.date( 2012, 1, 1 ),
@@ -106,15 +187,61 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
+    histBinData = datayes.getDataFrame( *getHistoryBinDataRequest( secId,
+            startDate=startDate, endDate=endDate ) )
+    return histBinData
+
+
+async def getHistoryBinDataAsync( secId, startDate=dt.date( 2012, 1, 1 ),
+                                  endDate=dt.date.today() ):
+    '''Asynchronous version of `getHistoryBinData`.
+
+Parameters
+----------
+secId : str
+    ticker name in secID;
+startDate : datetime.date
+    data begin date inclusively;
+endDate : datetime.date
+    data end date inclusively.
+
+Returns
+-------
+histBinData: pandas.DataFrame
+    Datayes stock historical bin data in pandas DataFrame.
+
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    histBinData = await datayes.getDataFrameAsync( *getHistoryBinDataRequest( secId,
+            startDate=startDate, endDate=endDate ) )
+    return histBinData
+
+
+def getBinDataRequest( secId, dataDate=dt.date.today() ):
+    '''Compose the Datayes request of the bin data, see `getBinData`.
+
+Parameters
+----------
+secId : str
+    the ticker name in secID;
+dataDate : datetime.date
+    Data date to read.
+
+Returns
+-------
+request : tuple
+    ( apiUrl, params ) to feed `datayes.getDataFrame`.
+    '''
     # read data from Datayes API in a .csv file
-    dataUrl = 'api/market/getBarHistDateRange.csv'
+    dataUrl = BIN_DATA_URL
 
     # compose request payload
-    params  = { 'securityID': secId, 'startDate': startDate.strftime( '%Y%m%d' ),
-                'endDate': endDate.strftime( '%Y%m%d' ) }
+    params  = { 'securityID': secId, 'startDate': dataDate.strftime( '%Y%m%d' ),
+                'endDate': dataDate.strftime( '%Y%m%d' ) }
 
-    histBinData = datayes.getDataFrame( dataUrl, params )
-    return histBinData
+    return dataUrl, params
 
 
 def getBinData( secId, dataDate=dt.date.today() ):
@@ -143,13 +270,30 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
-    # read data from Datayes API in a .csv file
-    dataUrl = 'api/market/getBarHistDateRange.csv'
+    binData = datayes.getDataFrame( *getBinDataRequest( secId, dataDate=dataDate ) )
+
+    return binData
 
-    # compose request payload
-    params  = { 'securityID': secId, 'startDate': dataDate.strftime( '%Y%m%d' ),
-                'endDate': dataDate.strftime( '%Y%m%d' ) }
 
-    binData = datayes.getDataFrame( dataUrl, params )
+async def getBinDataAsync( secId, dataDate=dt.date.today() ):
+    '''Asynchronous version of `getBinData`.
+
+Parameters
+----------
+secId : str
+    the ticker name in secID;
+dataDate : datetime.date
+    Data date to read.
+
+Returns
+-------
+histBinData: pandas.DataFrame
+    Datayes stock historical bin data in pandas DataFrame.
+
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    binData = await datayes.getDataFrameAsync( *getBinDataRequest( secId, dataDate=dataDate ) )
 
     return binData
@@ -37,6 +37,9 @@ import logging
 # customized modules
 import data.api.futures as futuresApi
 import data.config      as config
+import data.driver.codec   as codec
+import data.driver.datayes as datayes
+import data.driver.emptycache as emptycache
 import data.driver.mongodb as mongodb
 import data.instrument.trading.futures as futuresTrading
 
@@ -53,6 +56,14 @@ def main():
     # get all available futures since the very beginning.
     futuresInfo = futuresApi.getFuturesInformation( asOfDate, listed=False )
 
+    # responses of the past dates are replayed from disk when the backfill is restarted
+    if config.DATAYES_CACHE_DIR is not None:
+        datayes.enableCache( config.DATAYES_CACHE_DIR )
+
+    # requests known to return empty data are skipped, except for the recent dates
+    emptyResults = emptycache.EmptyResultStore( config.DATAYES_EMPTY_RESULT_DB )
+    emptyResults.expireRecent( config.DATAYES_EMPTY_RESULT_EXPIRY )
+
     # initialize MongoDB connection
     username, password = config.MONGODB_CRED
     db = mongodb.getAuthenticatedConnection( config.MONGODB_URL,
@@ -79,27 +90,40 @@ def main():
         startDate = dt.datetime.strptime( listedDate, '%Y-%m-%d' )
         endDate   = min( endDate, dt.datetime.strptime( tradeDate, '%Y-%m-%d' ) )
 
+        # skip the dates known to be empty, e.g. weekends and holidays
+        endpoint   = futuresTrading.BIN_DATA_URL
+        emptyDates = emptyResults.getDates( endpoint, secId )
+        dates   = []
         curDate = startDate
-        records = []
         while curDate <= endDate:
-            logging.info( 'Processing {iid:s} ({i:d}/{n:d}) on {sd:s}...'.format(
-                    iid=instId, sd=str( curDate ), i=i, n=nContracts ) )
+            if curDate.strftime( '%Y%m%d' ) not in emptyDates:
+                dates.append( curDate )
+            curDate += dt.timedelta( 1 )
+
+        # all dates of the contract are fetched concurrently
+        logging.info( 'Processing {iid:s} ({i:d}/{n:d}) from {sd:s} to {ed:s}...'.format(
+                iid=instId, sd=str( startDate ), ed=str( endDate ), i=i, n=nContracts ) )
+        frames  = datayes.getDataFrames( [ futuresTrading.getBinDataRequest( instId, dataDate=curDate )
+                                           for curDate in dates ] )
+        records = []
+        newEmptyDates = []
+        for curDate, dailyBin in zip( dates, frames ):
             try:
-                dailyBin = futuresTrading.getBinData( instId, dataDate=curDate )
                 if len( dailyBin ) > 0:
                     record = { 'SecID': secId,
                                'Date':  curDate,
-                               'Data':  dailyBin.to_json(),
+                               'Data':  codec.encodeFrame( dailyBin ),
                                'Country': 'CN' }
                     records.append( record )
                 else:
                     logging.warning( 'Empty data for {sec:s} on {sd:s}.'.format(
                         sec=secId, sd=str( curDate ) ) )
+                    newEmptyDates.append( curDate )
             except KeyError as e:
                 logging.warning( 'Error when updating {sec:s} on {sd:s}.'.format(
                     sec=secId, sd=str( curDate ) ) )
 
-            curDate += dt.timedelta( 1 )
+        emptyResults.add( endpoint, secId, newEmptyDates )
 
         if len( records ) > 0:
             db.futures.insert_many( records )
@@ -107,6 +131,9 @@ def main():
             logging.warning( 'Empty data to be inserted into database for {sec:s}'.format(
                     sec=secId ) )
     
+    logging.info( 'Datayes throttle stats: {s:s}.'.format( s=str( datayes.getThrottleStats() ) ) )
+    logging.info( 'Datayes cache stats: {s:s}.'.format( s=str( datayes.getCacheStats() ) ) )
+    emptyResults.close()
     logging.info( 'Bin data backfill done.' )
 
 
@@ -38,12 +38,17 @@ import logging
 # customized modules
 import data.api.futures as futuresApi
 import data.config      as config
+import data.driver.codec   as codec
+import data.driver.datayes as datayes
 import data.driver.mongodb as mongodb
 import data.instrument.trading.futures as futuresTrading
 
 # customize logging config
 logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
 
+# number of futures fetched concurrently from Datayes
+BATCH_SIZE = 100
+
 def main():
     '''Entry point of the job.
     '''
@@ -65,27 +70,29 @@ def main():
     nFutures = len( universe )
     logging.info( 'Minute bin volume for {ns:d} futures in total to be updated...' )
 
-    # for bin data, futures are updated one-by-one
-    for i, ids in enumerate( universe.items() ):
-        futures, secId = ids
-        futures = futures.upper()
-        logging.info( 'Updating minute bin data for {s:s} ({idx:d}/{n:d})...'.format(
-                s=secId, idx=i + 1, n=nFutures ) )
-
-        data = futuresTrading.getBinData( futures, dataDate=asOfDate )
-
-        if len( data ) > 0:
-            mongoDate = dt.datetime.combine( asOfDate, dt.datetime.min.time() )
-            record    = { 'SecID': secId,
-                          'Date':  mongoDate,
-                          'Data':  data.to_json(),
-                          'Country': 'CN' }
-     
-            db.futures.update( { 'SecID': secId, 'Date': mongoDate, 'Country': 'CN' },
-                    record, upsert=True )
-        else:
-            logging.warning( 'Empty data for {secId:s}'.format( secId=secId ) )
-
+    # for bin data, futures are fetched concurrently in batches and stored one-by-one
+    mongoDate = dt.datetime.combine( asOfDate, dt.datetime.min.time() )
+    items     = list( universe.items() )
+    for index in range( 0, nFutures, BATCH_SIZE ):
+        batch = items[ index : index + BATCH_SIZE ]
+        logging.info( 'Updating minute bin data for futures ({idx:d}-{end:d}/{n:d})...'.format(
+                idx=index + 1, end=index + len( batch ), n=nFutures ) )
+        frames = datayes.getDataFrames( [ futuresTrading.getBinDataRequest( futures.upper(),
+                                          dataDate=asOfDate ) for futures, _ in batch ] )
+
+        for ( futures, secId ), data in zip( batch, frames ):
+            if len( data ) > 0:
+                record    = { 'SecID': secId,
+                              'Date':  mongoDate,
+                              'Data':  codec.encodeFrame( data ),
+                              'Country': 'CN' }
+
+                db.futures.update( { 'SecID': secId, 'Date': mongoDate, 'Country': 'CN' },
+                        record, upsert=True )
+            else:
+                logging.warning( 'Empty data for {secId:s}'.format( secId=secId ) )
+
+    logging.info( 'Datayes throttle stats: {s:s}.'.format( s=str( datayes.getThrottleStats() ) ) )
     logging.info( 'All futures updated.' )
 
 
@@ -35,6 +35,7 @@ import logging
 # third-party modules
 
 # customized modules
+import data.api.base    as apiBase
 import data.api.futures as futuresApi
 import data.config      as config
 import data.driver.mongodb as mongodb
@@ -64,14 +65,10 @@ def main():
         secId, co = groupId
         logging.info( 'Processing {sid:s} for {p:s}...'.format( sid=secId, p=co ) )
 
-        record = { 'SecID': secId,
-                   'Product': co,
-                   'Data' : groupedData.to_json(),
-                   'LastModified': mongoDate,
-                   'Country': 'CN' }
-
         # save data to mongo
-        db.futures.update( { 'SecID': secId, 'Country': 'CN' }, record, upsert=True )
+        apiBase.updateBucketedDailyData( db[ futuresApi.BUCKETED_DAILY_DATA ],
+                { 'SecID': secId, 'Country': 'CN' }, groupedData, mongoDate,
+                extraFields={ 'Product': co } )
 
     logging.info( 'Updating main contract data...' )
 
@@ -81,14 +78,9 @@ def main():
     for co, groupedData in grouped:
         logging.info( 'Processing {p:s}...'.format( p=co ) )
 
-        record = { 'Product': co,
-                   'Data': groupedData.to_json(),
-                   'MainContract' : 1,
-                   'LastModified': mongoDate,
-                   'Country': 'CN' }
-
         # save data to mongo
-        db.futures.update( { 'Product': co, 'MainContract': 1, 'Country': 'CN' }, record, upsert=True )
+        apiBase.updateBucketedDailyData( db[ futuresApi.BUCKETED_DAILY_DATA ],
+                { 'Product': co, 'MainContract': 1, 'Country': 'CN' }, groupedData, mongoDate )
 
     logging.info( 'Daily futures data update done.' )
 
@@ -0,0 +1,85 @@
+'''This job splits the legacy whole-history dailyData records into the
+date-bucketed layout and creates the indexes of the bucketed collections.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import logging
+
+# third-party modules
+
+# customized modules
+import data.api.base       as apiBase
+import data.api.futures    as futuresApi
+import data.api.stocks     as stockApi
+import data.config         as config
+import data.driver.codec   as codec
+import data.driver.mongodb as mongodb
+
+# customize logging configure
+logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
+
+# legacy collection, bucketed collection and the identifying fields of the records
+COLLECTIONS = [ ( 'stocks',  stockApi.BUCKETED_DAILY_DATA,   [ 'SecID', 'Country' ] ),
+                ( 'futures', futuresApi.BUCKETED_DAILY_DATA, [ 'SecID', 'Product', 'MainContract', 'Country' ] ) ]
+
+def main():
+    '''Entry point of the job.
+    '''
+    username, password = config.MONGODB_CRED
+    db = mongodb.getAuthenticatedConnection( config.MONGODB_URL,
+            config.MONGODB_PORT, username, password, 'dailyData' )
+
+    for legacyName, bucketedName, keys in COLLECTIONS:
+        bucketed = db[ bucketedName ]
+        bucketed.create_index( [ ( 'SecID', mongodb.pymongo.ASCENDING ),
+                                 ( 'StartDate', mongodb.pymongo.ASCENDING ) ] )
+        bucketed.create_index( [ ( 'Product', mongodb.pymongo.ASCENDING ),
+                                 ( 'MainContract', mongodb.pymongo.ASCENDING ),
+                                 ( 'StartDate', mongodb.pymongo.ASCENDING ) ] )
+
+        logging.info( 'Splitting dailyData.{c:s} into buckets...'.format( c=legacyName ) )
+        for item in db[ legacyName ].find():
+            query = { k: item[ k ] for k in keys if k in item }
+            # futures records carry the product both on the contract and main contract records.
+            extraFields = None
+            if 'SecID' in query and 'Product' in query:
+                extraFields = { 'Product': query.pop( 'Product' ) }
+
+            data = codec.decodeFrame( item[ 'Data' ] )
+            apiBase.updateBucketedDailyData( bucketed, query, data, item.get( 'LastModified' ),
+                    extraFields=extraFields )
+
+    logging.info( 'Daily data bucket migration done.' )
+
+
+if __name__ == '__main__':
+    # let's kick off the job
+    main()
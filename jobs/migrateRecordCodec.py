@@ -0,0 +1,109 @@
+'''This job migrates the `Data` field of the dailyData and binData records from
+the legacy JSON strings to the columnar binary format.
+'''
+
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+import logging
+
+# third-party modules
+
+# customized modules
+import data.config         as config
+import data.driver.codec   as codec
+import data.driver.mongodb as mongodb
+
+# customize logging configure
+logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
+
+# databases and collections to migrate
+COLLECTIONS = [ ( 'dailyData', 'stocks' ),
+                ( 'dailyData', 'futures' ),
+                ( 'binData',   'stocks' ),
+                ( 'binData',   'futures' ) ]
+
+# number of records written in one bulk request
+BATCH_SIZE = 500
+
+def migrateCollection( collection, batchSize=BATCH_SIZE ):
+    '''Convert all legacy JSON records in the given collection.
+
+Parameters
+----------
+collection : pymongo.collection.Collection
+    collection to migrate;
+batchSize : int
+    number of records written in one bulk request.
+
+Returns
+-------
+nMigrated : int
+    number of records converted.
+    '''
+    nMigrated = 0
+    requests  = []
+    # only the records still in the JSON format are touched, so the job can be rerun safely.
+    cursor = collection.find( { 'Data': { '$type': 'string' } }, projection=[ 'Data' ] )
+    for item in cursor:
+        data = codec.encodeFrame( codec.decodeFrame( item[ 'Data' ] ) )
+        requests.append( mongodb.pymongo.UpdateOne( { '_id': item[ '_id' ] },
+                { '$set': { 'Data': data } } ) )
+
+        if len( requests ) >= batchSize:
+            collection.bulk_write( requests, ordered=False )
+            nMigrated += len( requests )
+            requests   = []
+            logging.info( '{n:d} records migrated...'.format( n=nMigrated ) )
+
+    if len( requests ) > 0:
+        collection.bulk_write( requests, ordered=False )
+        nMigrated += len( requests )
+
+    return nMigrated
+
+
+def main():
+    '''Entry point of the job.
+    '''
+    username, password = config.MONGODB_CRED
+    for dbname, collectionName in COLLECTIONS:
+        logging.info( 'Migrating {db:s}.{c:s}...'.format( db=dbname, c=collectionName ) )
+        db = mongodb.getAuthenticatedConnection( config.MONGODB_URL,
+                config.MONGODB_PORT, username, password, dbname )
+        nMigrated = migrateCollection( db[ collectionName ] )
+        logging.info( '{n:d} records migrated in {db:s}.{c:s}.'.format( n=nMigrated,
+                db=dbname, c=collectionName ) )
+
+    logging.info( 'Record codec migration done.' )
+
+
+if __name__ == '__main__':
+    # let's kick off the job
+    main()
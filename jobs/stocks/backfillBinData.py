@@ -37,6 +37,9 @@ import logging
 # customized modules
 import data.api.stocks as stockApi
 import data.config     as config
+import data.driver.codec   as codec
+import data.driver.datayes as datayes
+import data.driver.emptycache as emptycache
 import data.driver.mongodb as mongodb
 import data.instrument.trading.stocks as stockTrading
 
@@ -107,6 +110,15 @@ def main():
     # idx = universe.index( '603085.XSHG' )
     universe = universe[ idx : ]
 
+    # responses of the past dates are replayed from disk when the backfill is restarted
+    if config.DATAYES_CACHE_DIR is not None:
+        datayes.enableCache( config.DATAYES_CACHE_DIR )
+
+    # months known to return empty data, e.g. suspended stocks, are skipped except for the recent dates
+    emptyResults = emptycache.EmptyResultStore( config.DATAYES_EMPTY_RESULT_DB )
+    emptyResults.expireRecent( config.DATAYES_EMPTY_RESULT_EXPIRY )
+    endpoint = stockTrading.BIN_DATA_URL
+
     # initialize MongoDB connection
     username, password = config.MONGODB_CRED
     db = mongodb.getAuthenticatedConnection( config.MONGODB_URL,
@@ -115,13 +127,24 @@ def main():
     nStocks = len( universe )
     logging.info( 'Backfill bin volume for {ns:d} stocks in total...'.format( ns=nStocks ) )
 
-    # for bin data backfill, stocks are updated one-by-one and by month
+    # for bin data backfill, stocks are updated one-by-one and the months are fetched concurrently
     for i, s in enumerate( universe ):
-        for startDate, endDate in DATE_RANGE:
-            logging.info( 'Backfilling bin volume for {sec:s} ({idx:d}/{n:d}) from {sd:s} to {ed:s}...'.format( sec=s,
-                idx=i + 1, n=nStocks, sd=str( startDate ), ed=str( endDate ) ) )
-            data = stockTrading.getHistoryBinData( s, startDate=startDate,
-                endDate=endDate )
+        logging.info( 'Backfilling bin volume for {sec:s} ({idx:d}/{n:d}) from {sd:s} to {ed:s}...'.format( sec=s,
+            idx=i + 1, n=nStocks, sd=str( DATE_RANGE[ 0 ][ 0 ] ), ed=str( DATE_RANGE[ -1 ][ 1 ] ) ) )
+        emptyDates = emptyResults.getDates( endpoint, s )
+        dateRange  = [ ( startDate, endDate ) for startDate, endDate in DATE_RANGE
+                       if endDate.strftime( '%Y%m%d' ) not in emptyDates ]
+        frames = datayes.getDataFrames( [ stockTrading.getHistoryBinDataRequest( s,
+                startDate=startDate, endDate=endDate ) for startDate, endDate in dateRange ] )
+
+        for ( startDate, endDate ), data in zip( dateRange, frames ):
+            if len( data ) == 0:
+                # an empty month is keyed by its end date so that a month still in
+                # progress falls within the expiry horizon
+                emptyResults.add( endpoint, s, [ endDate ] )
+                logging.warning( 'Empty data for {sec:s} from {sd:s} to {ed:s}.'.format(
+                    sec=s, sd=str( startDate ), ed=str( endDate ) ) )
+                continue
 
             try:
                 groupedData = data.groupby( [ 'dataDate' ] )
@@ -130,7 +153,7 @@ def main():
                 for dataDate, tData in groupedData:
                     record = { 'SecID': s,
                                'Date':  dt.datetime.strptime( dataDate, '%Y-%m-%d' ),
-                               'Data':  tData.to_json(),
+                               'Data':  codec.encodeFrame( tData ),
                                'Country': 'CN' }
                     records.append( record )
      
@@ -139,6 +162,9 @@ def main():
                 logging.warning( 'Error when updating {sec:s} from {sd:s} to {ed:s}: {msg:s}.'.format(
                     sec=s, sd=str( startDate ), ed=str( endDate ), msg=str( e ) ) )
 
+    logging.info( 'Datayes throttle stats: {s:s}.'.format( s=str( datayes.getThrottleStats() ) ) )
+    logging.info( 'Datayes cache stats: {s:s}.'.format( s=str( datayes.getCacheStats() ) ) )
+    emptyResults.close()
     logging.info( 'Bin data backfill done.' )
 
 
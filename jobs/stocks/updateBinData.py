@@ -37,12 +37,17 @@ import logging
 # customized modules
 import data.api.stocks as stockApi
 import data.config     as config
+import data.driver.codec   as codec
+import data.driver.datayes as datayes
 import data.driver.mongodb as mongodb
 import data.instrument.trading.stocks as stockTrading
 
 # customize logging configure
 logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
 
+# number of stocks fetched concurrently from Datayes
+BATCH_SIZE = 100
+
 def main():
     '''Entry point of the job.
     '''
@@ -61,20 +66,24 @@ def main():
     nStocks = len( universe )
     logging.info( 'Minute bin volume for {ns:d} stocks in total to be updated...'.format( ns=nStocks ) )
 
-    # for bin data, stocks are updated one-by-one
-    for i, stock in enumerate( universe ):
-        logging.info( 'Updating minute bin data for {s:s} ({idx:d}/{n:d})...'.format( s=stock, idx=i + 1, n=nStocks ) )
-
-        data = stockTrading.getBinData( stock, dataDate=asOfDate )
+    # for bin data, stocks are fetched concurrently in batches and stored one-by-one
+    mongoDate = dt.datetime.combine( asOfDate, dt.datetime.min.time() )
+    for index in range( 0, nStocks, BATCH_SIZE ):
+        batch = universe[ index : index + BATCH_SIZE ]
+        logging.info( 'Updating minute bin data for stocks ({idx:d}-{end:d}/{n:d})...'.format(
+            idx=index + 1, end=index + len( batch ), n=nStocks ) )
+        frames = datayes.getDataFrames( [ stockTrading.getBinDataRequest( stock, dataDate=asOfDate )
+                                          for stock in batch ] )
 
-        mongoDate = dt.datetime.combine( asOfDate, dt.datetime.min.time() )
-        record    = { 'SecID': stock,
-                      'Date':  mongoDate,
-                      'Data':  data.to_json(),
-                      'Country': 'CN' }
+        for stock, data in zip( batch, frames ):
+            record    = { 'SecID': stock,
+                          'Date':  mongoDate,
+                          'Data':  codec.encodeFrame( data ),
+                          'Country': 'CN' }
 
-        db.stocks.update( { 'SecID': stock, 'Date': mongoDate, 'Country': 'CN' }, record, upsert=True )
+            db.stocks.update( { 'SecID': stock, 'Date': mongoDate, 'Country': 'CN' }, record, upsert=True )
 
+    logging.info( 'Datayes throttle stats: {s:s}.'.format( s=str( datayes.getThrottleStats() ) ) )
     logging.info( 'All stocks updated.' )
 
 
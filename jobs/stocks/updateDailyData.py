@@ -35,14 +35,19 @@ import logging
 # third-party modules
 
 # customized modules
+import data.api.base   as apiBase
 import data.api.stocks as stockApi
 import data.config     as config
+import data.driver.datayes as datayes
 import data.driver.mongodb as mongodb
 import data.instrument.trading.stocks as stockTrading
 
 # initialize logging level and format
 logging.basicConfig( format='[%(levelname)s] %(message)s', level=logging.INFO )
 
+# number of stocks fetched concurrently from Datayes
+BATCH_SIZE = 100
+
 def main():
     '''Entry point of the job.
     '''
@@ -61,21 +66,20 @@ def main():
     nStocks  = len( universe )
     logging.info( 'Daily volume for {ns:d} stocks in total to be updated...'.format( ns=nStocks ) )
 
-    # for daily data, stocks are updated one by one
-    for i, s in enumerate( universe ):
-        logging.info( 'Updating daily data for {sec:s} ({idx:d}/{n:d})...'.format( sec=s, idx=i + 1,
-            n=nStocks ) )
-        data = stockTrading.getAdjustedDailyData( s )
-
-        # compose record
-        record = { 'SecID': s,
-                   'Data' : data.to_json(),
-                   'LastModified' : mongoDate,
-                   'Country': 'CN' }
+    # for daily data, stocks are fetched concurrently in batches and stored one by one
+    for index in range( 0, nStocks, BATCH_SIZE ):
+        batch = universe[ index : index + BATCH_SIZE ]
+        logging.info( 'Updating daily data for stocks ({idx:d}-{end:d}/{n:d})...'.format(
+            idx=index + 1, end=index + len( batch ), n=nStocks ) )
+        frames = datayes.getDataFrames( [ stockTrading.getAdjustedDailyDataRequest( s )
+                                          for s in batch ] )
 
-        # save data to mongo
-        db.stocks.update( { 'SecID': s, 'Country': 'CN' }, record, upsert=True )
+        for s, data in zip( batch, frames ):
+            # save data to mongo, the adjusted history is merged into the date buckets
+            apiBase.updateBucketedDailyData( db[ stockApi.BUCKETED_DAILY_DATA ],
+                    { 'SecID': s, 'Country': 'CN' }, data, mongoDate )
 
+    logging.info( 'Datayes throttle stats: {s:s}.'.format( s=str( datayes.getThrottleStats() ) ) )
     logging.info( 'Daily data updated done.' )
 
 
@@ -37,6 +37,7 @@ import pandas   as pd
 
 # customized modules
 from data.config   import *
+from data.driver   import datayes
 from data.driver   import mongodb
 from data.universe import stocks
 from data.universe import futures
@@ -90,12 +91,10 @@ Returns
 -------
 None
     '''
-    futData = []
-
-    for exch in futures.FUTURES_EXCHANGES:
-        logging.info( 'Get futures contracts in {e:s}...'.format( e=exch ) )
-        exchFutures = futures.getFuturesContracts( exch )
-        futData.append( exchFutures )
+    logging.info( 'Get futures contracts in {e:s}...'.format(
+            e=', '.join( futures.FUTURES_EXCHANGES ) ) )
+    futData = datayes.getDataFrames( [ futures.getFuturesContractsRequest( exch )
+                                       for exch in futures.FUTURES_EXCHANGES ] )
 
     futData = pd.concat( futData )
     futData.reset_index( drop=True, inplace=True )
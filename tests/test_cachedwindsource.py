@@ -0,0 +1,225 @@
+'''This script checks the block-based reads of `data.api.stocks.CachedWindSource`
+against plain filters and pivots of the same rows, in all its modes.
+'''
+
+'''
+Copyright (c) 2017, WinQuant Information and Technology Co. Ltd.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# built-in modules
+
+# third-party modules
+import numpy  as np
+import pandas as pd
+import pytest
+
+# customized modules
+# the repository is imported as the `data` package along with `util.calendar`
+stocks = pytest.importorskip( 'data.api.stocks' )
+
+SEC_IDS    = [ '000001.SZ', '000002.SZ', '600000.SH', '600519.SH', '300750.SZ' ]
+START_DATE = '20200101'
+END_DATE   = '20200630'
+
+# request ranges moving forward through the backtest, as a strategy does
+REQUEST_RANGES = [ ( '20200102', '20200131' ), ( '20200210', '20200320' ),
+                   ( '20200401', '20200415' ), ( '20200501', '20200630' ) ]
+NUMERIC_FIELDS = [ 'S_DQ_CLOSE', 'S_DQ_OPEN' ]
+
+
+def makeDailyData():
+    '''Make daily data of the securities with some rows missing.
+
+Returns
+-------
+data : pandas.DataFrame
+    rows of ashareeodprices in no particular order.
+    '''
+    rng  = np.random.default_rng( 0 )
+    rows = []
+    for dataDate in pd.bdate_range( START_DATE, END_DATE ).strftime( '%Y%m%d' ):
+        for secId in SEC_IDS:
+            # suspended securities have no row
+            if rng.random() < 0.9:
+                rows.append( ( secId, dataDate, round( rng.uniform( 5, 50 ), 2 ),
+                               round( rng.uniform( 5, 50 ), 2 ), dataDate + '150000' ) )
+
+    data = pd.DataFrame( rows, columns=[ 'S_INFO_WINDCODE', 'TRADE_DT', 'S_DQ_CLOSE',
+                                         'S_DQ_OPEN', 'OPDATE' ] )
+    data[ 'OBJECT_ID' ] = [ '{{{i:08d}-0000}}'.format( i=i ) for i in range( len( data ) ) ]
+
+    return data.sample( frac=1, random_state=1 ).reset_index( drop=True )
+
+
+DAILY_DATA = makeDailyData()
+
+
+class FakeCachedWindSource( stocks.CachedWindSource ):
+    '''CachedWindSource reading the synthetic rows instead of MySQL.
+    '''
+
+    nReads = 0
+
+    def _readWindow( self, tableName, secIds, startDate, endDate ):
+        FakeCachedWindSource.nReads += 1
+        dates = DAILY_DATA.TRADE_DT
+        return DAILY_DATA[ DAILY_DATA.S_INFO_WINDCODE.isin( secIds ) &
+                           ( dates >= startDate ) & ( dates <= endDate ) ]
+
+
+    def _getWatermark( self, startDate, endDate ):
+        return '20200701150000'
+
+
+class FakeCalendar( object ):
+    '''Trading calendar without any date, the sources then load the backtest dates.
+    '''
+
+    def __init__( self, *args, **kwargs ):
+        pass
+
+
+    def prevTradingDate( self, dataDate, n=1 ):
+        raise Exception( 'No trading date.' )
+
+
+    def nextTradingDate( self, dataDate, n=1 ):
+        raise Exception( 'No trading date.' )
+
+
+@pytest.fixture( autouse=True )
+def noWind( monkeypatch ):
+    for name, value in ( ( 'MYSQL_WIND_URL', None ), ( 'MYSQL_WIND_PORT', None ),
+                         ( 'MYSQL_WIND_CRED', ( None, None ) ) ):
+        monkeypatch.setattr( stocks, name, value, raising=False )
+    monkeypatch.setattr( stocks.mysql, 'getAuthenticatedConnection', lambda *args, **kwargs: None )
+    monkeypatch.setattr( stocks.uc, 'AShareTradingCalendar', FakeCalendar )
+
+
+def getExpectedRows( source, startDate, endDate, secIds=None ):
+    '''Filter the rows as the source keeps them.
+    '''
+    data  = source._compact( DAILY_DATA )
+    dates = data.TRADE_DT.astype( str )
+    mask  = ( dates >= startDate ) & ( dates <= endDate )
+    if secIds is not None:
+        mask &= data.S_INFO_WINDCODE.isin( secIds )
+
+    return data[ mask ].sort_values( [ 'TRADE_DT', 'S_INFO_WINDCODE' ] )
+
+
+def toPlainIndex( index ):
+    '''Convert a categorical index, or the categorical levels of a MultiIndex, to their values.
+    '''
+    if isinstance( index, pd.MultiIndex ):
+        return index.set_levels( [ toPlainIndex( level ) for level in index.levels ] )
+    if isinstance( index.dtype, pd.CategoricalDtype ):
+        return index.astype( index.categories.dtype )
+
+    return index
+
+
+def toPlain( data ):
+    '''Convert the categorical columns and axes, e.g. of the shared sources, to their values.
+    '''
+    data = data.copy()
+    for column in data.columns:
+        if isinstance( data[ column ].dtype, pd.CategoricalDtype ):
+            data[ column ] = data[ column ].astype( data[ column ].cat.categories.dtype )
+    data.index   = toPlainIndex( data.index )
+    data.columns = toPlainIndex( data.columns )
+
+    return data
+
+
+def checkSource( source ):
+    '''Check the reads of the source against the plain results.
+    '''
+    secIds = [ SEC_IDS[ 0 ], SEC_IDS[ 2 ], SEC_IDS[ 3 ], '999999.SH' ]
+    for startDate, endDate in REQUEST_RANGES:
+        expected = getExpectedRows( source, startDate, endDate, secIds )
+
+        # numeric fields from the matrices, and a text field through the rows
+        for fields in ( NUMERIC_FIELDS, [ NUMERIC_FIELDS[ 0 ] ], [ 'S_DQ_CLOSE', 'OBJECT_ID' ] ):
+            data = source.getDailyDataWithFields( secIds, fields, startDate, endDate )
+            pd.testing.assert_frame_equal( toPlain( data ),
+                    toPlain( expected.pivot( index='TRADE_DT', columns='S_INFO_WINDCODE' )[ fields ] ),
+                    check_dtype=False, check_index_type=False, check_column_type=False )
+
+        dataDate = expected.TRADE_DT.astype( str ).iloc[ -1 ]
+        onDate   = getExpectedRows( source, dataDate, dataDate, secIds )
+        for fields in ( [ 'TRADE_DT' ] + NUMERIC_FIELDS, [ 'S_DQ_CLOSE', 'OBJECT_ID' ] ):
+            data = source.getDailyDataOnDate( secIds, dataDate, fields=fields )
+            plain = onDate.set_index( 'S_INFO_WINDCODE' )[ data.columns ]
+            pd.testing.assert_frame_equal( toPlain( data.sort_index() ), toPlain( plain.sort_index() ),
+                    check_dtype=False, check_index_type=False )
+
+        data = source.getStockDailyData( SEC_IDS[ 2 ], startDate, endDate, fields=NUMERIC_FIELDS )
+        plain = getExpectedRows( source, startDate, endDate, [ SEC_IDS[ 2 ] ] )[
+                [ 'S_INFO_WINDCODE', 'TRADE_DT' ] + NUMERIC_FIELDS ]
+        pd.testing.assert_frame_equal( toPlain( data ).reset_index( drop=True ),
+                toPlain( plain ).reset_index( drop=True ), check_dtype=False )
+
+
+def testFull():
+    checkSource( FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE ) )
+
+
+def testCompact():
+    source = FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE, compact=True )
+    assert source.data.S_DQ_CLOSE.dtype == np.float32
+    checkSource( source )
+
+
+def testWindowed():
+    with FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE, windowDays=20,
+            lookbackDays=30 ) as source:
+        checkSource( source )
+        # the chunks before the lookback are evicted
+        assert source.data.TRADE_DT.min() > REQUEST_RANGES[ 0 ][ 1 ]
+
+
+def testSnapshot( tmp_path ):
+    checkSource( FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE, snapshotDir=str( tmp_path ) ) )
+
+    # the second source is served by the snapshot
+    FakeCachedWindSource.nReads = 0
+    checkSource( FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE, snapshotDir=str( tmp_path ) ) )
+    assert FakeCachedWindSource.nReads == 0
+
+
+def testShared():
+    owner  = FakeCachedWindSource( SEC_IDS, START_DATE, END_DATE )
+    handle = owner.share()
+    try:
+        # the handle carries no data
+        assert set( handle ) == { 'path', 'columns', 'fields', 'arrays', 'tableName' }
+        worker = stocks.CachedWindSource.attach( handle )
+        assert worker.secIds == SEC_IDS
+        checkSource( worker )
+        checkSource( owner )
+    finally:
+        owner.releaseShared()
@@ -42,6 +42,28 @@ FUTURES_EXCHANGES = [ 'XZCE',    # Zhengzhou Commodity Exchange
                       'XSGE',    # China Shanghai Futures Exchange
                       'XDCE' ]   # Dalian Commodity Exchange
 
+def getFuturesContractsRequest( exch ):
+    '''Compose the Datayes request of the futures contracts, see `getFuturesContracts`.
+
+Parameters
+----------
+exch : str
+    Exchange name. Should be one of XZCE, CCFX, XSGE, and XDCE.
+
+Returns
+-------
+request : tuple
+    ( apiUrl, params ) to feed `datayes.getDataFrame`.
+    '''
+    # read data from the Datayes API in a .csv file
+    futUrl  = 'api/future/getFutu.csv'
+
+    # compose request payload
+    params  = { 'exchangeCD': exch }
+
+    return futUrl, params
+
+
 def getFuturesContracts( exch ):
     '''Get futures contract informaiton from Datayes.
 
@@ -59,12 +81,28 @@ Exceptions
 ----------
     raise Exception when connection errors.
     '''
-    # read data from the Datayes API in a .csv file
-    futUrl  = 'api/future/getFutu.csv'
+    futures = datayes.getDataFrame( *getFuturesContractsRequest( exch ) )
 
-    # compose request payload
-    params  = { 'exchangeCD': exch }
+    return futures
+
+
+async def getFuturesContractsAsync( exch ):
+    '''Asynchronous version of `getFuturesContracts`.
+
+Parameters
+----------
+exch : str
+    Exchange name. Should be one of XZCE, CCFX, XSGE, and XDCE.
 
-    futures = datayes.getDataFrame( futUrl, params )
+Returns
+-------
+futures : pandas.DataFrame
+    Datayes futures contracts in the given exchanges.
+
+Exceptions
+----------
+    raise Exception when connection errors.
+    '''
+    futures = await datayes.getDataFrameAsync( *getFuturesContractsRequest( exch ) )
 
     return futures